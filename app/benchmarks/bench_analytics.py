@@ -0,0 +1,112 @@
+# app/benchmarks/bench_analytics.py
+"""
+Corpus statistics at scale: vectorized AnalysisCorpus vs a loop over records.
+
+Streams synthetic saved-analysis records built from the records in
+data/*.json (each copy gets its own name, age and vital signs) and computes
+the three dashboard statistics two ways:
+
+    loop        one pass over the record dicts with Counters and per-band
+                lists, then sorted-list percentiles
+    columnar    AnalysisCorpus ingest (once), then severity_distribution,
+                top_interactions and vital_percentiles over the columns
+
+Records are generated on the fly, so generation time is measured on its own
+and subtracted from both passes.
+
+Usage:
+    python app/benchmarks/bench_analytics.py [--records 1000000]
+"""
+import argparse
+import collections
+import pathlib
+import random
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.analytics import AGE_BANDS, DEFAULT_PERCENTILES, AnalysisCorpus, age_band_labels  # noqa: E402
+from healthform.vitals import parse_vitals  # noqa: E402
+from healthform.storage import iter_alerts, iter_json_records  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR  # noqa: E402
+
+
+def synthetic_records(templates: list, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(count):
+        template = templates[i % len(templates)]
+        vital_signs = {
+            "blood_pressure": f"{rng.randint(90, 200)} / {rng.randint(55, 120)}",
+            "heart_rate": str(rng.randint(45, 140)),
+            "temperature": f"{rng.uniform(97.0, 102.5):.1f}",
+        }
+        patient_data = dict(template["patient_data"], name=f"Synthetic Patient {i}", age=rng.randint(1, 95),
+                            vital_signs=vital_signs)
+        yield {"timestamp": template.get("timestamp", ""), "patient_data": patient_data,
+               "ai_analysis": template.get("ai_analysis") or {}}
+
+
+def loop_statistics(records) -> tuple:
+    """The three statistics computed record by record, as a dict-based implementation would"""
+    severities = collections.Counter()
+    interactions = collections.Counter()
+    labels = age_band_labels()
+    by_band = {label: collections.defaultdict(list) for label in labels}
+    for record in records:
+        for category, severity, message in iter_alerts(record.get("ai_analysis")):
+            severities[category, severity.strip().lower() or "unspecified"] += 1
+            if category == "drug_interactions":
+                interactions[message.strip()] += 1
+        age = record["patient_data"].get("age") or 0
+        band = sum(1 for bound in AGE_BANDS if bound <= age) - 1
+        if band < 0:
+            continue
+        for vital, value in parse_vitals(record["patient_data"].get("vital_signs")).values().items():
+            by_band[labels[band]][vital].append(value)
+    percentiles = {}
+    for label, vitals in by_band.items():
+        for vital, values in vitals.items():
+            values.sort()
+            percentiles[label, vital] = [values[min(len(values) - 1, int(p / 100 * len(values)))]
+                                         for p in DEFAULT_PERCENTILES]
+    return severities, interactions.most_common(10), percentiles
+
+
+def timed(func) -> tuple:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--records", type=int, default=1000000)
+    args = arg_parser.parse_args()
+
+    templates = [record for _, record in iter_json_records(args.data_dir)]
+    if not templates:
+        sys.exit(f"No patient_form_*.json records found in {args.data_dir}")
+
+    _, generate = timed(lambda: collections.deque(synthetic_records(templates, args.records), maxlen=0))
+    _, loop = timed(lambda: loop_statistics(synthetic_records(templates, args.records)))
+    import pandas  # noqa: F401  (import cost is not part of the statistics)
+    corpus, ingest = timed(lambda: AnalysisCorpus.from_records(synthetic_records(templates, args.records)))
+    _, severity = timed(corpus.severity_distribution)
+    _, interactions = timed(lambda: corpus.top_interactions(10))
+    _, vitals = timed(corpus.vital_percentiles)
+    columnar = severity + interactions + vitals
+
+    print(f"Records: {args.records:,} ({corpus.alert_count:,} findings) from {len(templates)} templates; "
+          f"generation {generate:.2f} s excluded")
+    print(f"  loop pass (all three statistics)   {loop - generate:8.2f} s")
+    print(f"  columnar ingest (once)             {ingest - generate:8.2f} s")
+    print(f"  columnar statistics                {columnar * 1000:8.1f} ms "
+          f"(severity {severity * 1000:.1f}, interactions {interactions * 1000:.1f}, vitals {vitals * 1000:.1f})")
+    print(f"  statistics speedup once loaded     {(loop - generate) / columnar:8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
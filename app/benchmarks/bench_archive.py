@@ -0,0 +1,121 @@
+# app/benchmarks/bench_archive.py
+"""
+Saved-analysis storage: bytes on disk and read throughput per backend.
+
+Builds synthetic saved-analysis records from data/*.json (forms from
+the synthetic.py generator, parsed, paired with a sample record's
+analysis) and writes the same records to each backend in a temporary
+directory:
+
+    json        one indent=2 file per record (the original data/ layout)
+    sqlite      SQLiteAnalysisStore
+    archive     SegmentArchive with gzip, and zstd when installed
+
+Reports bytes on disk, write rate, a sequential pass over every record
+(iter_records) and random lookups by ID (get). Records read back are
+checked against the records written.
+
+Usage:
+    python app/benchmarks/bench_archive.py [--records 10000] [--lookups 5000] [--segment-mb 16]
+"""
+import argparse
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.archive import SegmentArchive, zstd_available  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from healthform.storage import JSONDirectoryStore, SQLiteAnalysisStore, iter_json_records  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+from synthetic import synthetic_forms  # noqa: E402
+
+
+def synthetic_records(data_dir: pathlib.Path, count: int) -> list:
+    samples = [record for _, record in iter_json_records(data_dir)]
+    forms = synthetic_forms(load_forms(data_dir), count)
+    return [(f"record_{i:08d}", {
+        "timestamp": f"20250622_{i // 3600 % 24:02d}{i // 60 % 60:02d}{i % 60:02d}",
+        "patient_data": MedicalFormParser.extract_patient_data(text).to_dict(),
+        "ai_analysis": samples[i % len(samples)].get("ai_analysis") or {},
+        "original_form_text": text,
+    }) for i, text in enumerate(forms)]
+
+
+def disk_bytes(directory: pathlib.Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def measure(name: str, store, directory: pathlib.Path, records: list, lookup_ids: list, expected: dict):
+    start = time.perf_counter()
+    if hasattr(store, "import_records"):
+        store.import_records(iter(records))
+    else:
+        for record_id, record in records:
+            store.save_record(record, record_id)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    seen = sum(1 for _ in store.iter_records())
+    scan_seconds = time.perf_counter() - start
+    if seen != len(records):
+        sys.exit(f"{name}: iter_records returned {seen} of {len(records)} records")
+
+    start = time.perf_counter()
+    for record_id in lookup_ids:
+        record = store.get(record_id)
+    lookup_seconds = time.perf_counter() - start
+    if record != dict(expected[lookup_ids[-1]], id=lookup_ids[-1]):
+        sys.exit(f"{name}: record read back differs from the one written")
+
+    size = disk_bytes(directory)
+    store.close()
+    return size, len(records) / write_seconds, len(records) / scan_seconds, len(lookup_ids) / lookup_seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--records", type=int, default=10000)
+    arg_parser.add_argument("--lookups", type=int, default=5000)
+    arg_parser.add_argument("--segment-mb", type=float, default=16)
+    args = arg_parser.parse_args()
+
+    if not load_forms(args.data_dir):
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    records = synthetic_records(args.data_dir, args.records)
+    expected = dict(records)
+    lookup_ids = random.Random(20).choices(list(expected), k=args.lookups)
+    segment_bytes = int(args.segment_mb * 2**20)
+
+    backends = {
+        "json": lambda path: JSONDirectoryStore(path),
+        "sqlite": lambda path: SQLiteAnalysisStore(path / "analyses.sqlite3"),
+        "archive gzip": lambda path: SegmentArchive(path, codec="gzip", segment_bytes=segment_bytes),
+    }
+    if zstd_available():
+        backends["archive zstd"] = lambda path: SegmentArchive(path, codec="zstd", segment_bytes=segment_bytes)
+
+    print(f"{len(records):,} records, {args.lookups:,} random lookups")
+    print(f"{'backend':<14} {'bytes on disk':>15} {'bytes/record':>13} {'write/sec':>10} "
+          f"{'scan/sec':>10} {'get/sec':>10}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as root:
+        for name, open_backend in backends.items():
+            directory = pathlib.Path(root) / name.replace(" ", "_")
+            directory.mkdir()
+            size, write_rate, scan_rate, lookup_rate = measure(name, open_backend(directory), directory, records,
+                                                               lookup_ids, expected)
+            baseline = baseline or size
+            print(f"{name:<14} {size:>15,} {size / len(records):>13,.0f} {write_rate:>10,.0f} "
+                  f"{scan_rate:>10,.0f} {lookup_rate:>10,.0f}  ({size / baseline:.0%} of json)")
+    if not zstd_available():
+        print("zstandard is not installed; zstd archive skipped")
+
+
+if __name__ == "__main__":
+    main()
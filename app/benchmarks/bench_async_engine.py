@@ -0,0 +1,87 @@
+# app/benchmarks/bench_async_engine.py
+"""
+End-to-end throughput of AsyncClinicalEngine against the local fake server.
+
+Parses the forms in data/*.json, repeats them up to --analyses patients and
+analyzes them all concurrently, reporting analyses/sec, retries, explicit
+failures, server requests and tokens per patient. --batch-size packs that
+many patients into each request.
+
+Usage:
+    python app/benchmarks/bench_async_engine.py --analyses 500 --concurrency 32 --latency 0.2 --rate-limit-rate 0.05
+    python app/benchmarks/bench_async_engine.py --analyses 500 --batch-size 5 --batch-part-failure-rate 0.02
+"""
+import asyncio
+import argparse
+import itertools
+import pathlib
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.parser import MedicalFormParser  # noqa: E402
+from healthform.async_engine import AsyncClinicalEngine, create_async_openai_client  # noqa: E402
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+
+
+async def run(args) -> None:
+    forms = load_forms(args.data_dir)
+    if not forms:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    patients = [MedicalFormParser.extract_patient_data(text)
+                for text in itertools.islice(itertools.cycle(forms), args.analyses)]
+
+    with FakeOpenAIServer(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit_rate,
+                          error_rate=args.error_rate, seed=args.seed,
+                          batch_part_failure_rate=args.batch_part_failure_rate) as server:
+        client = create_async_openai_client(api_key="sk-fake", base_url=server.base_url)
+        engine = AsyncClinicalEngine(client, max_concurrency=args.concurrency, tokens_per_minute=args.tpm,
+                                     base_delay=args.base_delay, max_retries=args.max_retries)
+        start = time.perf_counter()
+        results = await engine.analyze_many(patients, args.batch_size)
+        elapsed = time.perf_counter() - start
+        await client.close()
+
+    succeeded = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    retries = sum(max(r.attempts - 1, 0) for r in results)
+    latencies = sorted(r.latency_seconds for r in succeeded)
+    print(f"Analyses: {len(results)}  concurrency: {args.concurrency}  server requests: {server.requests}")
+    print(f"Succeeded: {len(succeeded)}  failed: {len(failed)}  retries: {retries}")
+    print(f"Throughput: {len(results) / elapsed:,.1f} analyses/sec over {elapsed:.2f}s")
+    tokens = sum(r.prompt_tokens + r.completion_tokens for r in succeeded)
+    if succeeded:
+        print(f"Batch size: {args.batch_size}  requests/patient: {server.requests / len(results):.2f}  "
+              f"tokens/patient: {tokens / len(succeeded):,.0f}  "
+              f"requests/min: {server.requests / elapsed * 60:,.0f}")
+    if latencies:
+        print(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.0f} ms  "
+              f"p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    for result in failed[:5]:
+        print(f"  failure #{result.index}: {result.error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--analyses", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute budget (default: unlimited)")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--base-delay", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--batch-size", type=int, default=1, help="Patients packed into each request")
+    parser.add_argument("--batch-part-failure-rate", type=float, default=0.0,
+                        help="Fraction of patients whose part of a batched reply is unparseable")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# app/benchmarks/bench_columnar.py
+"""
+Memory and serialization cost of PatientTable vs a list of PatientData.
+
+Builds a synthetic population by cycling the parsed forms in data/*.json
+(each copy gets a distinct name, as real patients would) and compares:
+
+    memory       tracemalloc bytes held by each layout after loading it back
+    serialize    json.dumps of to_dict() records vs PatientTable.to_bytes()
+    deserialize  json.loads + PatientData.from_dict vs PatientTable.from_bytes()
+    to_pandas    DataFrame from the records vs PatientTable.to_pandas() (when
+                 pandas is installed)
+
+Usage:
+    python app/benchmarks/bench_columnar.py [--patients 100000]
+"""
+import argparse
+import dataclasses
+import itertools
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.columnar import PatientTable  # noqa: E402
+from healthform.models import PatientData  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+
+
+def population(forms: list, size: int) -> list:
+    templates = [MedicalFormParser.extract_patient_data(text) for text in forms]
+    return [dataclasses.replace(template, name=f"{template.name} #{i}",
+                                medications=list(template.medications), vital_signs=dict(template.vital_signs))
+            for i, template in zip(range(size), itertools.cycle(templates))]
+
+
+def allocated(build) -> tuple:
+    """(result, bytes still allocated after building it)"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def timed(func) -> tuple:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--patients", type=int, default=100000)
+    args = arg_parser.parse_args()
+
+    forms = load_forms(args.data_dir)
+    if not forms:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+
+    patients = population(forms, args.patients)
+    table = PatientTable.from_patients(patients)
+    encoded_json, json_dump = timed(lambda: json.dumps([p.to_dict() for p in patients]).encode("utf-8"))
+    encoded_table, table_dump = timed(table.to_bytes)
+    _, json_load = timed(lambda: [PatientData.from_dict(r) for r in json.loads(encoded_json)])
+    restored, table_load = timed(lambda: PatientTable.from_bytes(encoded_table))
+    if list(restored) != patients:
+        sys.exit("Round trip mismatch")
+
+    # Memory is what each layout holds once loaded back, so neither shares strings with the generator
+    _, objects_bytes = allocated(lambda: [PatientData.from_dict(r) for r in json.loads(encoded_json)])
+    _, table_bytes = allocated(lambda: PatientTable.from_bytes(encoded_table))
+
+    print(f"Patients: {args.patients} (from {len(forms)} forms)")
+    print(f"{'':<12} {'objects/JSON':>14} {'PatientTable':>14}")
+    print(f"{'memory':<12} {objects_bytes / 1e6:>11.1f} MB {table_bytes / 1e6:>11.1f} MB")
+    print(f"{'size':<12} {len(encoded_json) / 1e6:>11.1f} MB {len(encoded_table) / 1e6:>11.1f} MB")
+    print(f"{'serialize':<12} {json_dump * 1000:>11.0f} ms {table_dump * 1000:>11.0f} ms")
+    print(f"{'deserialize':<12} {json_load * 1000:>11.0f} ms {table_load * 1000:>11.0f} ms")
+
+    try:
+        import pandas as pd
+    except ImportError:
+        print("to_pandas    skipped (pandas not installed)")
+        return
+    _, records_frame = timed(lambda: pd.DataFrame.from_records([p.to_dict() for p in patients]))
+    _, table_frame = timed(table.to_pandas)
+    print(f"{'to_pandas':<12} {records_frame * 1000:>11.0f} ms {table_frame * 1000:>11.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# app/benchmarks/bench_decoder.py
+"""
+Reply decoding: AnalysisDecoder vs the old greedy regex + json.loads.
+
+Builds a corpus of model replies with the mistakes seen in practice
+(prose around the JSON, ```json fences, trailing commas, single quotes,
+Python literals, category labels instead of keys, a wrapper object,
+replies cut off at max_tokens) and reports, per kind, how many replies
+each decoder turned into findings rather than the raw-text fallback, and
+the decode rate. Then times both on replies with many unclosed '{',
+where the greedy regex backtracks quadratically.
+
+Usage:
+    python app/benchmarks/bench_decoder.py [--replies 2000]
+"""
+import argparse
+import json
+import pathlib
+import random
+import re
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.clinical_ai import CATEGORY_LABELS  # noqa: E402
+from healthform.decoding import AnalysisDecoder  # noqa: E402
+
+MESSAGES = ["BP 182/112: hypertensive urgency", "Warfarin + Aspirin: bleeding risk", "Allergies not documented",
+            "Recheck potassium in 1 week", "HR 128: tachycardia", "Metformin with eGFR < 30"]
+
+KINDS = {
+    "clean": lambda analysis: json.dumps(analysis),
+    "fenced": lambda analysis: "```json\n" + json.dumps(analysis, indent=2) + "\n```",
+    "prose": lambda analysis: f"Here is the {{structured}} analysis:\n{json.dumps(analysis)}\nHope this helps.",
+    "trailing_commas": lambda analysis: re.sub(r"(?<=[\]}])(?=[\]}])", ",", json.dumps(analysis)),
+    "single_quotes": lambda analysis: str(analysis),
+    "python_literals": lambda analysis: str({**analysis, "reviewed": True, "notes": None}),
+    "labels": lambda analysis: json.dumps({CATEGORY_LABELS[key]: items for key, items in analysis.items()}),
+    "wrapped": lambda analysis: json.dumps({"analysis": analysis}),
+    "truncated": lambda analysis: json.dumps(analysis)[:-30],
+}
+
+
+def legacy_decode(content: str):
+    """The previous decoder: greedy regex, json.loads, raw text on any failure"""
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group())
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def random_analysis(rng: random.Random) -> dict:
+    analysis = {key: [] for key in CATEGORY_LABELS}
+    for key in analysis:
+        for _ in range(rng.randint(0, 3)):
+            analysis[key].append({"severity": rng.choice(("high", "medium", "low")), "message": rng.choice(MESSAGES)})
+    analysis["critical_alerts"].append({"severity": "high", "message": rng.choice(MESSAGES)})
+    return analysis
+
+
+def timed(function, replies: list):
+    start = time.perf_counter()
+    results = [function(reply) for reply in replies]
+    return results, len(replies) / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--replies", type=int, default=2000, help="replies per kind")
+    args = arg_parser.parse_args()
+
+    rng = random.Random(19)
+    decoder = AnalysisDecoder(CATEGORY_LABELS)
+    decoder.validator  # compile outside the timed loop
+
+    print(f"{'kind':<16} {'legacy ok':>10} {'decoder ok':>11} {'legacy/sec':>11} {'decoder/sec':>12}")
+    for kind, render in KINDS.items():
+        replies = [render(random_analysis(rng)) for _ in range(args.replies)]
+        legacy, legacy_rate = timed(legacy_decode, replies)
+        decoded, decoder_rate = timed(decoder.decode, replies)
+        legacy_ok = sum(isinstance(result, dict) and "critical_alerts" in result for result in legacy)
+        # The fallback puts the whole reply in one alert; anything else came from the JSON
+        decoder_ok = sum(result["critical_alerts"][:1] != [{"severity": "medium", "message": reply}]
+                         for result, reply in zip(decoded, replies))
+        print(f"{kind:<16} {legacy_ok / len(replies):>10.0%} {decoder_ok / len(replies):>11.0%} "
+              f"{legacy_rate:>11,.0f} {decoder_rate:>12,.0f}")
+
+    print("\nReplies with n unclosed '{' (e.g. a truncated, deeply nested reply):")
+    for size in (1000, 2000, 4000, 8000):
+        reply = "{" * size
+        start = time.perf_counter()
+        legacy_decode(reply)
+        legacy_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        decoder.decode(reply)
+        decoder_ms = (time.perf_counter() - start) * 1e3
+        print(f"  n={size:<6} legacy {legacy_ms:9.1f} ms   decoder {decoder_ms:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# app/benchmarks/bench_import_time.py
+"""
+Cold import time of the core healthform modules.
+
+Each module is imported in a fresh interpreter (so nothing is cached in
+sys.modules) several times; the median import time is reported together
+with any heavy optional dependency the import dragged in. The core must
+never load streamlit, and openai/pandas/numpy only when a client or a
+DataFrame is actually requested.
+
+Usage:
+    python app/benchmarks/bench_import_time.py [--runs 7] [--module healthform.parser ...]
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+
+DEFAULT_MODULES = (
+    "healthform",
+    "healthform.models",
+    "healthform.parser",
+    "healthform.clinical_ai",
+    "healthform.async_engine",
+    "healthform.batch",
+    "healthform.parallel",
+    "healthform.analytics",
+)
+HEAVY_MODULES = ("streamlit", "openai", "pandas", "numpy", "structlog", "tiktoken")
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(module: str) -> dict:
+    """Import time and heavy dependencies of one module in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=7)
+    arg_parser.add_argument("--module", action="append", help="Module to time (repeatable; default: core modules)")
+    args = arg_parser.parse_args()
+
+    failures = 0
+    print(f"{'module':<26} {'median ms':>10} {'min ms':>8}  heavy dependencies loaded")
+    for module in args.module or DEFAULT_MODULES:
+        results = [probe(module) for _ in range(args.runs)]
+        times = [r["seconds"] * 1000 for r in results]
+        loaded = results[-1]["loaded"]
+        failures += "streamlit" in loaded
+        print(f"{module:<26} {statistics.median(times):>10.1f} {min(times):>8.1f}  {', '.join(loaded) or '-'}")
+    if failures:
+        sys.exit("streamlit was imported by the core package")
+
+
+if __name__ == "__main__":
+    main()
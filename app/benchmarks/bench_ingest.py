@@ -0,0 +1,108 @@
+# app/benchmarks/bench_ingest.py
+"""
+Streaming split of multi-form exports vs reading the whole file first.
+
+Writes exports of increasing size (forms from synthetic.py's
+generator over data/*.json, back to back with the separators clinic
+systems use: blank lines, ===== rules, page breaks) and, for each, splits
+and parses every form two ways:
+
+    whole file   read() the file, then split the string in memory
+    streaming    iter_form_files: read line by line, one form at a time
+
+Reports time to the first parsed form, forms/sec and MB/sec, and peak
+Python memory (tracemalloc, measured in a separate pass), which should
+stay flat for streaming as the file grows. Every form must round-trip to
+the text it was generated from.
+
+Usage:
+    python app/benchmarks/bench_ingest.py [--forms 2000 8000 32000]
+"""
+import argparse
+import io
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.ingest import iter_form_files, iter_forms  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+from synthetic import synthetic_forms  # noqa: E402
+
+SEPARATORS = ["\r\n\r\n", "\r\n" + "=" * 40 + "\r\n", "\r\n\f", "\r\n----- next form -----\r\n"]
+
+
+def write_export(path: pathlib.Path, forms: list, count: int):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i in range(count):
+            f.write(forms[i % len(forms)] + SEPARATORS[i % len(SEPARATORS)])
+
+
+def whole_file(path: pathlib.Path):
+    with open(path, encoding="utf-8", newline="") as f:
+        text = f.read()
+    return iter_forms(io.StringIO(text, newline=""), source=str(path))
+
+
+def streaming(path: pathlib.Path):
+    return iter_form_files([path])
+
+
+def run(split, path: pathlib.Path, expected: list = None):
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for form in split(path):
+        MedicalFormParser.extract_patient_data(form.text)
+        if first is None:
+            first = time.perf_counter() - start
+        if expected is not None and form.text != expected[count % len(expected)]:
+            sys.exit(f"Form {form.source} does not match the text it was generated from")
+        count += 1
+    return count, first, time.perf_counter() - start
+
+
+def peak_memory(split, path: pathlib.Path) -> int:
+    tracemalloc.start()
+    for form in split(path):
+        MedicalFormParser.extract_patient_data(form.text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--forms", type=int, nargs="+", default=[2000, 8000, 32000])
+    args = arg_parser.parse_args()
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    forms = [text.strip() for text in synthetic_forms(templates, 1000)]
+
+    print(f"{'forms':>7} {'MB':>7}  {'method':<11} {'first form ms':>13} {'forms/sec':>10} {'MB/sec':>7} "
+          f"{'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        for count in args.forms:
+            path = pathlib.Path(root) / f"export_{count}.txt"
+            write_export(path, forms, count)
+            megabytes = path.stat().st_size / 2**20
+            for name, split in (("whole file", whole_file), ("streaming", streaming)):
+                parsed, first, seconds = run(split, path, forms)
+                if parsed != count:
+                    sys.exit(f"{name}: split {parsed} forms, expected {count}")
+                peak = peak_memory(split, path) / 2**20
+                print(f"{count:>7,} {megabytes:>7.1f}  {name:<11} {first * 1e3:>13.1f} {count / seconds:>10,.0f} "
+                      f"{megabytes / seconds:>7.1f} {peak:>8.1f}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
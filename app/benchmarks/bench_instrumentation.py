@@ -0,0 +1,114 @@
+# app/benchmarks/bench_instrumentation.py
+"""
+Overhead of the stage instrumentation in each telemetry mode.
+
+Runs the local part of an analysis (parse, rules pre-screen, prompt build,
+decode of a canned model reply, save to a temporary SQLite store) over the
+forms in data/*.json with telemetry "off", "metrics" and "log", and reports
+per-form time and the cost per span relative to "off", plus the cost of an
+empty span in isolation (the pipeline numbers include SQLite write noise).
+In "log" mode events are rendered and written to an in-memory stream so
+terminal I/O is excluded.
+
+Usage:
+    python app/benchmarks/bench_instrumentation.py [--rounds 100] [--repeats 3]
+"""
+import argparse
+import io
+import json
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform import instrumentation  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from healthform.rules import RuleEngine  # noqa: E402
+from healthform.clinical_ai import build_clinical_prompt, parse_ai_response  # noqa: E402
+from healthform.instrumentation import span  # noqa: E402
+from healthform.storage import SQLiteAnalysisStore  # noqa: E402
+from fake_openai_server import CANNED_ANALYSIS  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+
+SPANS_PER_FORM = 5  # parse, rules, prompt, decode, save
+REPLY = json.dumps(CANNED_ANALYSIS)
+
+
+def run_pipeline(forms: list, rounds: int, store, rules: RuleEngine) -> float:
+    """Seconds per form for the instrumented local pipeline"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in forms:
+            patient_data = MedicalFormParser.extract_patient_data(text)
+            with span("rules"):
+                screen = rules.screen(patient_data)
+            with span("prompt"):
+                build_clinical_prompt(patient_data, screen.focus or None)
+            with span("decode"):
+                analysis = parse_ai_response(REPLY)
+            store.save(patient_data, analysis, text)
+    return (time.perf_counter() - start) / (rounds * len(forms))
+
+
+def empty_span_cost(count: int = 100000) -> float:
+    """Seconds per empty ``with span(...)`` block in the current mode"""
+    start = time.perf_counter()
+    for _ in range(count):
+        with span("empty"):
+            pass
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--rounds", type=int, default=100)
+    arg_parser.add_argument("--repeats", type=int, default=3, help="Best of this many runs per mode")
+    args = arg_parser.parse_args()
+
+    forms = load_forms(args.data_dir)
+    if not forms:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+
+    sink = io.StringIO()
+    handler = logging.StreamHandler(sink)
+    instrumentation.event_logger.addHandler(handler)
+    instrumentation.event_logger.setLevel(logging.INFO)
+    instrumentation.event_logger.propagate = False
+
+    rules = RuleEngine()
+    results = {mode: [] for mode in instrumentation.MODES}
+    span_costs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Modes take turns on fresh stores so store growth and warm-up do not favour any of them
+        for repeat in range(args.repeats):
+            for mode in instrumentation.MODES:
+                store = SQLiteAnalysisStore(pathlib.Path(tmp) / f"{mode}-{repeat}.sqlite3")
+                instrumentation.configure(mode)
+                instrumentation.telemetry.reset()
+                results[mode].append(run_pipeline(forms, args.rounds, store, rules))
+                store.close()
+                sink.seek(0)
+                sink.truncate()
+    results = {mode: min(times) for mode, times in results.items()}
+    for mode in instrumentation.MODES:
+        instrumentation.configure(mode)
+        span_costs[mode] = empty_span_cost()
+        sink.seek(0)
+        sink.truncate()
+
+    baseline = results[instrumentation.MODE_OFF]
+    print(f"Corpus: {len(forms)} forms x {args.rounds} rounds (best of {args.repeats}), {SPANS_PER_FORM} spans per form")
+    for mode, seconds in results.items():
+        overhead = (seconds - baseline) / SPANS_PER_FORM
+        print(f"  {mode:<8} {seconds * 1e6:8.1f} µs/form  overhead {overhead * 1e6:6.2f} µs/span "
+              f"({(seconds / baseline - 1) * 100:+.1f}%)  empty span {span_costs[mode] * 1e6:5.2f} µs")
+    instrumentation.configure(instrumentation.MODE_METRICS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# app/benchmarks/bench_interactions.py
+"""
+Throughput benchmark for drug-interaction checks on long medication lists.
+
+Compares InteractionIndex (normalized names, one hash lookup per pair of
+known drugs) against the previous approach scaled to the same table: join
+the medication list into one lowercase string and substring-test both
+drugs of every table row. Patients carry 15 or more medications drawn
+from the reference table plus unrelated fillers, and the table can be
+padded with synthetic pairs to show how each approach scales with size.
+
+Usage:
+    python app/benchmarks/bench_interactions.py [--patients 2000] [--meds 15 20 30] [--extra-pairs 5000]
+"""
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.medications import InteractionIndex, default_interaction_index  # noqa: E402
+
+DOSES = ("5mg", "10 mg", "20mg", "81mg", "500mg", "1 tablet", "2 puffs")
+FREQUENCIES = ("Daily", "Twice daily", "At bedtime", "As needed", "Every 8 hours")
+
+
+def build_table(extra_pairs: int, seed: int) -> list:
+    """Reference rows plus synthetic pairs between made-up drug names"""
+    rows = [(a, b, severity, message) for (a, b), (severity, message) in default_interaction_index().pairs.items()]
+    rng = random.Random(seed)
+    synthetic = [f"synthdrug{i:05d}" for i in range(max(2, extra_pairs // 4))]
+    for _ in range(extra_pairs):
+        a, b = rng.sample(synthetic, 2)
+        rows.append((a, b, "medium", f"{a} + {b} synthetic interaction"))
+    return rows
+
+
+def build_patients(rows: list, count: int, med_count: int, seed: int) -> list:
+    """Medication lists mixing table drugs with fillers that interact with nothing"""
+    rng = random.Random(seed)
+    drugs = sorted({name for row in rows for name in row[:2]})
+    patients = []
+    for _ in range(count):
+        names = rng.sample(drugs, med_count // 2)
+        names += [f"filler{rng.randrange(10000)}" for _ in range(med_count - len(names))]
+        patients.append([f"{name.title()} {rng.choice(DOSES)} {rng.choice(FREQUENCIES)}" for name in names])
+    return patients
+
+
+def text_scan_check(rows: list, medications: list) -> list:
+    """Previous approach: substring test of every table row against the joined list"""
+    med_text = " ".join(medications).lower()
+    return [{"severity": severity, "message": message}
+            for a, b, severity, message in rows if a in med_text and b in med_text]
+
+
+def time_checks(check, patients: list) -> float:
+    """Return patients checked per second"""
+    start = time.perf_counter()
+    for medications in patients:
+        check(medications)
+    return len(patients) / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--patients", type=int, default=2000)
+    arg_parser.add_argument("--meds", type=int, nargs="+", default=[15, 20, 30])
+    arg_parser.add_argument("--extra-pairs", type=int, default=5000, help="Synthetic pairs added to the table")
+    arg_parser.add_argument("--seed", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    rows = build_table(args.extra_pairs, args.seed)
+    start = time.perf_counter()
+    index = InteractionIndex.from_rows(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Interaction table: {len(index):,} pairs over {len(index.known_drugs):,} drugs (index built in {build_ms:.1f} ms)")
+
+    for med_count in args.meds:
+        patients = build_patients(rows, args.patients, med_count, args.seed)
+        # Substring matching can only over-report, so every indexed hit must also be a scan hit
+        missed = sum(
+            not {a["message"] for a in index.check(meds)} <= {a["message"] for a in text_scan_check(rows, meds)}
+            for meds in patients[:200]
+        )
+        scan_rate = time_checks(lambda meds: text_scan_check(rows, meds), patients)
+        index_rate = time_checks(index.check, patients)
+        print(f"\n{med_count} medications x {args.patients} patients (index-only hits: {missed})")
+        print(f"  Text scan over table: {scan_rate:,.0f} patients/sec")
+        print(f"  Pair index:           {index_rate:,.0f} patients/sec")
+        print(f"  Speedup: {index_rate / scan_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# app/benchmarks/bench_jobs.py
+"""
+Job queue under many simultaneous clinicians.
+
+Each simulated clinician is a thread that submits a form, then polls for
+its result as the UI does (JobQueue.wait with a one-second timeout per
+rerun). Forms come from the synthetic.py generator over data/*.json;
+a share of clinicians submit a form someone else has in flight, as when a
+form is double-submitted or reopened in another tab. The handler parses
+the form for real and sleeps for the simulated model latency.
+
+Reports submit latency (how long the UI is blocked before it can render
+again), time to result, model calls made vs forms submitted (coalescing)
+and how many handler calls ran at once (never more than --workers).
+
+Usage:
+    python app/benchmarks/bench_jobs.py [--clinicians 150] [--workers 8] [--latency 0.5] [--duplicates 0.3]
+"""
+import argparse
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.jobs import JobQueue, WorkerPool  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+from synthetic import synthetic_forms  # noqa: E402
+
+
+def percentile_ms(samples: list, pct: int) -> float:
+    return statistics.quantiles(samples, n=100)[pct - 1] * 1e3
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--clinicians", type=int, default=150)
+    arg_parser.add_argument("--workers", type=int, default=8)
+    arg_parser.add_argument("--latency", type=float, default=0.5, help="Simulated model call seconds")
+    arg_parser.add_argument("--duplicates", type=float, default=0.3, help="Share of submissions of an in-flight form")
+    args = arg_parser.parse_args()
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    rng = random.Random(21)
+    unique = synthetic_forms(templates, args.clinicians)
+    forms = [rng.choice(unique[:max(1, i)]) if rng.random() < args.duplicates else unique[i]
+             for i in range(args.clinicians)]
+
+    running = peak = calls = 0
+    lock = threading.Lock()
+
+    def handler(payload, report):
+        nonlocal running, peak, calls
+        with lock:
+            running += 1
+            calls += 1
+            peak = max(peak, running)
+        patient_data = MedicalFormParser.extract_patient_data(payload["form_text"])
+        time.sleep(args.latency)
+        with lock:
+            running -= 1
+        return {"patient_data": patient_data.to_dict()}
+
+    submit_times, result_times = [], []
+
+    def clinician(form_text: str, barrier: threading.Barrier):
+        barrier.wait()
+        start = time.perf_counter()
+        job_id = queue.submit(form_text)
+        submit_times.append(time.perf_counter() - start)
+        job = queue.wait(job_id, timeout=1.0)
+        while not job.finished:
+            job = queue.wait(job_id, timeout=1.0)
+        result_times.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as root:
+        queue = JobQueue(pathlib.Path(root) / "jobs.sqlite3")
+        pool = WorkerPool(queue, handler, workers=args.workers).start()
+        barrier = threading.Barrier(args.clinicians)
+        threads = [threading.Thread(target=clinician, args=(form_text, barrier)) for form_text in forms]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        pool.stop()
+        counts = queue.counts()
+        queue.close()
+
+    print(f"{args.clinicians} clinicians submitting at once, {args.workers} workers, "
+          f"{args.latency:.2f}s simulated model latency")
+    print(f"Submit:          p50 {percentile_ms(submit_times, 50):8.1f} ms  p99 {percentile_ms(submit_times, 99):8.1f} ms")
+    print(f"Time to result:  p50 {percentile_ms(result_times, 50):8.0f} ms  p99 {percentile_ms(result_times, 99):8.0f} ms")
+    print(f"Model calls: {calls} for {len(forms)} submissions ({queue.coalesced} coalesced); "
+          f"peak concurrent {peak}; jobs {counts}")
+    print(f"Throughput: {len(forms) / elapsed:.1f} submissions/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# app/benchmarks/bench_near_duplicates.py
+"""
+Near-duplicate lookup: LSH buckets vs comparing against every entry.
+
+Indexes the parsed synthetic corpus (the synthetic.py generator over
+data/*.json, with each patient's medications and allergies redrawn from the
+pool seen in the samples so that patients differ in more than name and
+vitals) as if each form had been analyzed, then looks up simulated
+follow-up visits: a sampled indexed patient with heart rate and blood
+pressure moved by a few points. Reports the reuse rate (follow-ups whose
+vitals stayed inside the same threshold band should be reused; the rest
+must not be), and lookup latency through the LSH index vs a linear scan
+over every entry's signature.
+
+Usage:
+    python app/benchmarks/bench_near_duplicates.py [--forms 5000] [--follow-ups 1000]
+"""
+import argparse
+import dataclasses
+import pathlib
+import random
+import statistics
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.near_duplicates import (NearDuplicateIndex, minhash, outcome_key, shingles,  # noqa: E402
+                                        signature_similarity)
+from healthform.parser import MedicalFormParser  # noqa: E402
+from healthform.rules import RuleEngine  # noqa: E402
+from healthform.vitals import parse_blood_pressure, parse_heart_rate  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+from synthetic import synthetic_forms  # noqa: E402
+
+MODEL_ANALYSIS = {"critical_alerts": [], "drug_interactions": [], "missing_info": [],
+                  "recommendations": [{"severity": "low", "message": "Follow up in 4 weeks"}]}
+
+
+def diversify(patients: list, rng: random.Random) -> list:
+    """Give every patient its own medication list and allergy, drawn from the corpus' pools"""
+    medications = sorted({entry for patient in patients for entry in patient.medications})
+    allergies = sorted({patient.allergies for patient in patients if patient.allergies})
+    return [dataclasses.replace(patient, medications=rng.sample(medications, rng.randint(1, min(6, len(medications)))),
+                                allergies=rng.choice(allergies) if allergies else "")
+            for patient in patients]
+
+
+def follow_up(patient, rng: random.Random):
+    """The same patient a few weeks later: vitals moved a little"""
+    vitals = dict(patient.vital_signs or {})
+    systolic, diastolic = parse_blood_pressure(vitals.get("blood_pressure", ""))
+    if systolic:
+        vitals["blood_pressure"] = f"{systolic + rng.randint(-4, 4)}/{diastolic + rng.randint(-3, 3)}"
+    heart_rate = parse_heart_rate(vitals.get("heart_rate", ""))
+    if heart_rate:
+        vitals["heart_rate"] = str(heart_rate + rng.randint(-3, 3))
+    return dataclasses.replace(patient, vital_signs=vitals, medications=list(patient.medications))
+
+
+def percentile_us(samples: list, pct: int) -> float:
+    return statistics.quantiles(samples, n=100)[pct - 1] * 1e6
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--forms", type=int, default=5000)
+    arg_parser.add_argument("--follow-ups", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    rules = RuleEngine()
+    rng = random.Random(5)
+    patients = diversify([MedicalFormParser.extract_patient_data(text)
+                          for text in synthetic_forms(templates, args.forms)], rng)
+    index = NearDuplicateIndex(max_entries=len(patients))
+
+    start = time.perf_counter()
+    screens = []
+    for position, patient in enumerate(patients):
+        screen = rules.screen(patient)
+        screens.append(screen)
+        index.add(patient, screen, MODEL_ANALYSIS, source=str(position))
+    add_seconds = time.perf_counter() - start
+    signatures = [(outcome_key(p, s), minhash(shingles(p))) for p, s in zip(patients, screens)]
+
+    lsh_times, scan_times = [], []
+    reused = same_outcome = disagreements = 0
+    for _ in range(args.follow_ups):
+        original = rng.randrange(len(patients))
+        patient = follow_up(patients[original], rng)
+        screen = rules.screen(patient)
+        expected = outcome_key(patient, screen) == signatures[original][0]
+        same_outcome += expected
+
+        start = time.perf_counter()
+        match = index.find(patient, screen)
+        lsh_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        outcome, signature = outcome_key(patient, screen), minhash(shingles(patient))
+        scan = max((signature_similarity(signature, candidate) for key, candidate in signatures if key == outcome),
+                   default=0.0)
+        scan_times.append(time.perf_counter() - start)
+
+        reused += match is not None
+        disagreements += (match is not None) != (scan >= index.threshold)
+        if match is not None and not expected and match.source == str(original):
+            sys.exit("Reused an analysis across a change in rule outcome")
+
+    print(f"Index: {len(index):,} analyses, {add_seconds / len(patients) * 1e6:.0f} us per add")
+    print(f"Follow-ups: {args.follow_ups:,}, {same_outcome:,} kept their rule outcome, {reused:,} reused "
+          f"({reused / args.follow_ups:.0%}); LSH vs full scan disagreements: {disagreements}")
+    print(f"Lookup through LSH:  p50 {percentile_us(lsh_times, 50):8.0f} us  p95 {percentile_us(lsh_times, 95):8.0f} us")
+    print(f"Linear scan:         p50 {percentile_us(scan_times, 50):8.0f} us  p95 {percentile_us(scan_times, 95):8.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# app/benchmarks/bench_parallel_parser.py
+"""
+Scaling of ParallelParser across 1, 2, 4 and 8 worker processes.
+
+Builds a synthetic corpus from the original_form_text samples in
+data/*.json: each copy gets its own patient name, age and vital signs, so
+no two forms are identical. Every worker count parses the whole corpus;
+the output is checked against a plain serial loop (same patients, same
+order) before any number is reported. Also prints the size of one chunk's
+result as a PatientTable buffer vs a pickled list of PatientData.
+
+Scaling is bounded by the cores available; the core count is printed.
+
+Usage:
+    python app/benchmarks/bench_parallel_parser.py [--forms 20000] [--workers 1 2 4 8] [--chunk-size 256]
+"""
+import argparse
+import os
+import pickle
+import pathlib
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform import instrumentation  # noqa: E402
+from healthform.columnar import PatientTable  # noqa: E402
+from healthform.parallel import DEFAULT_CHUNK_SIZE, ParallelParser  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+from synthetic import synthetic_forms  # noqa: E402
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--forms", type=int, default=20000)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    arg_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = arg_parser.parse_args()
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    forms = synthetic_forms(templates, args.forms)
+    instrumentation.configure(instrumentation.MODE_OFF)
+
+    start = time.perf_counter()
+    expected = [MedicalFormParser.extract_patient_data(text) for text in forms]
+    serial = time.perf_counter() - start
+
+    chunk = expected[:args.chunk_size]
+    print(f"Corpus: {len(forms):,} synthetic forms from {len(templates)} samples; {os.cpu_count()} CPU cores")
+    print(f"Result transfer per {len(chunk)}-form chunk: pickled PatientData list "
+          f"{len(pickle.dumps(chunk)) / 1024:.0f} KiB, PatientTable buffer "
+          f"{len(PatientTable.from_patients(chunk).to_bytes()) / 1024:.0f} KiB")
+    print(f"  serial loop  {len(forms) / serial:10,.0f} forms/sec")
+
+    baseline = None
+    for workers in args.workers:
+        with ParallelParser(workers=workers, chunk_size=args.chunk_size) as parser:
+            # Start the pool outside the timed region; its spawn cost is paid once per process lifetime
+            list(parser.parse_texts(forms[:workers * args.chunk_size]))
+            start = time.perf_counter()
+            parsed = list(parser.parse_texts(forms))
+            elapsed = time.perf_counter() - start
+        if parsed != expected:
+            sys.exit(f"{workers} workers: output differs from the serial parse")
+        rate = len(forms) / elapsed
+        baseline = baseline or rate
+        print(f"  {workers} worker{'s' if workers > 1 else ' '}    {rate:10,.0f} forms/sec  "
+              f"speedup {rate / baseline:4.2f}x  efficiency {rate / baseline / workers * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# app/benchmarks/bench_parser.py
+"""
+Throughput benchmark for MedicalFormParser.extract_patient_data.
+
+Compares the single-pass extractor against the previous implementation
+(one uncompiled re.search per field plus the debug line loop) on the
+original form text stored in data/*.json. The baseline's debug prints
+are captured in memory, so its numbers exclude terminal I/O cost.
+
+Usage:
+    python app/benchmarks/bench_parser.py [--data-dir data] [--rounds 200]
+"""
+import argparse
+import contextlib
+import io
+import json
+import pathlib
+import re
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.models import PatientData  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+
+DEFAULT_DATA_DIR = pathlib.Path(__file__).resolve().parents[2] / "data"
+
+
+def legacy_extract_patient_data(form_text: str) -> PatientData:
+    """Previous extract_patient_data, kept verbatim as the comparison baseline"""
+    data = PatientData()
+
+    name_match = re.search(r'Patient Name:\s*([^\n\r]+)', form_text)
+    if name_match:
+        data.name = name_match.group(1).strip()
+
+    age_match = re.search(r'Age:\s*(\d+)', form_text)
+    if age_match:
+        data.age = int(age_match.group(1))
+
+    gender_match = re.search(r'Gender:\s*([MF])', form_text)
+    if gender_match:
+        data.gender = "Male" if gender_match.group(1) == "M" else "Female"
+
+    weight_match = re.search(r'Weight:\s*([^\n\r]+)', form_text)
+    if weight_match:
+        data.weight = weight_match.group(1).strip()
+
+    complaint_match = re.search(r'Primary reason for today\'s visit:\s*\n([^-\n]+(?:\n[^-\n]+)*)', form_text, re.DOTALL)
+    if complaint_match:
+        data.chief_complaint = complaint_match.group(1).strip()
+
+    medications = []
+    print("--- Checking for Medication Header ---")
+    med_header = "Medication Name | Dosage | Frequency | Prescribing Doctor"
+    print(f"REPR OF HEADER: {repr(med_header)}")
+    lines = form_text.strip().splitlines()
+
+    header_found = False
+    for i, line in enumerate(lines):
+        print(f"Line {i}: {repr(line.strip())}")
+        if line.strip() == med_header:
+            print(f"SUCCESS: Header found on line {i}")
+            header_found = True
+            break
+
+    if not header_found:
+        print("ERROR: Medication header was NOT found in the text.")
+
+    try:
+        header_index = lines.index(med_header)
+    except ValueError:
+        header_index = -1
+
+    if header_index != -1:
+        for line in lines[header_index + 1:]:
+            if not line.strip() or '|' not in line:
+                break
+            parts = [part.strip() for part in line.split('|')]
+            if len(parts) == 4 and parts[0]:
+                medications.append(f"{parts[0]} {parts[1]} {parts[2]}".strip())
+    print(medications)
+    data.medications = medications
+
+    allergy_match = re.search(r'Drug Allergies:\s*\n([^\n\r]+)', form_text)
+    if allergy_match:
+        data.allergies = allergy_match.group(1).strip()
+
+    bp_match = re.search(r'Blood Pressure:\s*(\d+\s*/\s*\d+)', form_text)
+    hr_match = re.search(r'Heart Rate:\s*(\d+)', form_text)
+    temp_match = re.search(r'Temperature:\s*([^\s\n]+)', form_text)
+
+    if bp_match or hr_match or temp_match:
+        data.vital_signs = {
+            'blood_pressure': bp_match.group(1) if bp_match else '',
+            'heart_rate': hr_match.group(1) if hr_match else '',
+            'temperature': temp_match.group(1) if temp_match else ''
+        }
+
+    history_match = re.search(r'Chronic Conditions:\s*\n([^\n\r]+)', form_text)
+    if history_match:
+        data.medical_history = history_match.group(1).strip()
+
+    return data
+
+
+def load_forms(data_dir: pathlib.Path) -> list:
+    """Load original_form_text from every saved analysis"""
+    forms = []
+    for path in sorted(data_dir.glob("patient_form_*.json")):
+        with open(path) as f:
+            text = json.load(f).get("original_form_text")
+        if text:
+            forms.append(text)
+    return forms
+
+
+def time_parser(extract, forms: list, rounds: int) -> float:
+    """Return forms per second for an extract function over the corpus"""
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in forms:
+                extract(text)
+            sink.seek(0)
+            sink.truncate()
+        elapsed = time.perf_counter() - start
+    return (len(forms) * rounds) / elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--rounds", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    forms = load_forms(args.data_dir)
+    if not forms:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+
+    # Both implementations must agree before their speed means anything
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        mismatches = sum(
+            legacy_extract_patient_data(text) != MedicalFormParser.extract_patient_data(text)
+            for text in forms
+        )
+
+    legacy_rate = time_parser(legacy_extract_patient_data, forms, args.rounds)
+    single_pass_rate = time_parser(MedicalFormParser.extract_patient_data, forms, args.rounds)
+
+    print(f"Corpus: {len(forms)} forms x {args.rounds} rounds")
+    print(f"Output mismatches: {mismatches}")
+    print(f"Legacy per-field re.search: {legacy_rate:,.0f} forms/sec")
+    print(f"Single-pass extractor:      {single_pass_rate:,.0f} forms/sec")
+    print(f"Speedup: {single_pass_rate / legacy_rate:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
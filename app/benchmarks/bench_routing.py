@@ -0,0 +1,148 @@
+# app/benchmarks/bench_routing.py
+"""
+Model-tier routing vs sending every form to one model.
+
+Parses synthetic.varied_forms over data/*.json, a corpus that mixes
+routine visits with polypharmacy, abnormal vitals and red-flag
+complaints. Every patient is analyzed three ways through ClinicalAI with
+a simulated chat client:
+
+    fast only   every model call to the fast model (the old behaviour)
+    large only  every model call to the escalation model
+    routed      TierRouter: rules, then fast, escalating flagged forms
+
+The simulated models sleep a per-model latency, report token usage, and
+the fast model hedges or truncates its reply on a share of calls. Reports
+model calls, escalation rate and reasons, estimated cost and
+time-to-analysis per mode. It also counts the screen-flagged forms that
+the routed run answered below the large model, which should be none.
+
+Usage:
+    python app/benchmarks/bench_routing.py [--forms 400] [--fast-latency 0.04] [--large-latency 0.12]
+    python app/benchmarks/bench_routing.py --polypharmacy 7 --abnormal-vitals 2   # try other thresholds
+"""
+import argparse
+import json
+import pathlib
+import random
+import statistics
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.clinical_ai import ClinicalAI  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from healthform.routing import (ESCALATION_MODEL, FAST_MODEL, TIER_ESCALATED, RoutingPolicy,  # noqa: E402
+                                TierRouter, format_routing_summary)
+from synthetic import DEFAULT_DATA_DIR, load_forms, varied_forms  # noqa: E402
+
+REPLY = {
+    "critical_alerts": [],
+    "drug_interactions": [{"severity": "medium", "message": "Review NSAID use with current antihypertensives"}],
+    "missing_info": [{"severity": "low", "message": "Last metabolic panel date not documented"}],
+    "recommendations": [{"severity": "low", "message": "Recheck blood pressure at next visit"}],
+}
+HEDGED_REPLY = dict(REPLY, drug_interactions=[
+    {"severity": "medium", "message": "Interaction risk is unclear without dosing information"}])
+
+
+class SimulatedModels:
+    """chat.completions.create stand-in: per-model latency, token usage, and a flaky fast model"""
+
+    def __init__(self, latency: dict, hedge_rate: float, truncate_rate: float, seed: int = 23):
+        self.latency = latency
+        self.hedge_rate = hedge_rate
+        self.truncate_rate = truncate_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, model, messages, max_tokens, temperature, **kwargs):
+        with self.lock:
+            draw = self.rng.random()
+        content = json.dumps(REPLY)
+        if model == FAST_MODEL and draw < self.hedge_rate:
+            content = json.dumps(HEDGED_REPLY)
+        elif model == FAST_MODEL and draw < self.hedge_rate + self.truncate_rate:
+            content = content[:len(content) * 2 // 3]
+        time.sleep(self.latency.get(model, 0.0))
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+            usage=types.SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(content) // 4),
+        )
+
+
+def run(name: str, router: TierRouter, client, patients: list, concurrency: int) -> tuple:
+    clinical_ai = ClinicalAI(client, router=router)
+
+    def analyze(patient):
+        start = time.perf_counter()
+        analysis = clinical_ai.analyze_patient_data(patient)
+        return analysis, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(analyze, patients))
+    elapsed = time.perf_counter() - start
+    stats = router.stats.summary()
+    model_seconds = [seconds for analysis, seconds in results if "routing" in analysis]
+    calls = sum(tier["calls"] for tier in stats["tiers"].values())
+    print(f"{name:<11} {calls:>6} {stats['escalation_rate']:>10.1%} {stats['cost_usd']:>10.4f} "
+          f"{stats['cost_usd'] / len(patients) * 1000:>11.4f} {statistics.median(model_seconds) * 1e3:>8.0f} "
+          f"{statistics.quantiles(model_seconds, n=20)[18] * 1e3:>8.0f} {elapsed:>7.1f}")
+    return results, stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--forms", type=int, default=400)
+    arg_parser.add_argument("--concurrency", type=int, default=16)
+    arg_parser.add_argument("--fast-latency", type=float, default=0.04, help="Simulated fast model seconds")
+    arg_parser.add_argument("--large-latency", type=float, default=0.12, help="Simulated large model seconds")
+    arg_parser.add_argument("--hedge-rate", type=float, default=0.08, help="Share of fast replies that hedge")
+    arg_parser.add_argument("--truncate-rate", type=float, default=0.03, help="Share of fast replies cut off")
+    arg_parser.add_argument("--polypharmacy", type=int, default=RoutingPolicy.polypharmacy,
+                            help="Medications that send a form straight to the large model")
+    arg_parser.add_argument("--abnormal-vitals", type=int, default=RoutingPolicy.abnormal_vitals,
+                            help="Abnormal vitals that send a form straight to the large model (0 to ignore)")
+    args = arg_parser.parse_args()
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    patients = [MedicalFormParser.extract_patient_data(text) for text in varied_forms(templates, args.forms)]
+
+    def client():
+        return SimulatedModels({FAST_MODEL: args.fast_latency, ESCALATION_MODEL: args.large_latency},
+                               args.hedge_rate, args.truncate_rate)
+
+    print(f"{len(patients)} forms, {args.concurrency} concurrent; fast {FAST_MODEL} {args.fast_latency * 1e3:.0f} ms, "
+          f"large {ESCALATION_MODEL} {args.large_latency * 1e3:.0f} ms; fast replies hedge {args.hedge_rate:.0%}, "
+          f"truncated {args.truncate_rate:.0%}")
+    print(f"{'mode':<11} {'calls':>6} {'escalated':>10} {'cost $':>10} {'$/1k forms':>11} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'wall s':>7}")
+    run("fast only", TierRouter.single(FAST_MODEL), client(), patients, args.concurrency)
+    run("large only", TierRouter.single(ESCALATION_MODEL), client(), patients, args.concurrency)
+    router = TierRouter(policy=RoutingPolicy(polypharmacy=args.polypharmacy, abnormal_vitals=args.abnormal_vitals))
+    results, stats = run("routed", router, client(), patients, args.concurrency)
+    print()
+    print(format_routing_summary(stats))
+
+    # Every form the screen flags must reach the large model, whatever happened to the fast tier
+    missed = 0
+    for patient, (analysis, _) in zip(patients, results):
+        screen = ClinicalAI(None, router=router).rules.screen(patient)
+        if screen.needs_llm and router.screen_reasons(screen) and analysis["routing"]["tier"] != TIER_ESCALATED:
+            missed += 1
+    print(f"Flagged forms answered below the large model: {missed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# app/benchmarks/bench_search.py
+"""
+Search index build rate, size and query latency at archive scale.
+
+Builds a SearchIndex in a temporary directory from synthetic saved
+analyses. Patients come from synthetic.varied_forms over data/*.json,
+parsed, and each record gets its own patient name; analyses rotate
+through the sample records' analyses. Reports:
+
+    build      documents indexed per second (bulk, 1000 per transaction),
+               bytes on disk and bytes per document
+    add        latency of indexing one record on save (one transaction each)
+    queries    p50/p95 latency and hit count of typical queries, newest first
+               and by relevance
+
+Usage:
+    python app/benchmarks/bench_search.py [--records 200000] [--repeat 20]
+    python app/benchmarks/bench_search.py --records 1000000   # a million records, about two minutes to build
+"""
+import argparse
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.parser import MedicalFormParser  # noqa: E402
+from healthform.search import SearchIndex  # noqa: E402
+from healthform.storage import iter_json_records  # noqa: E402
+from synthetic import DEFAULT_DATA_DIR, load_forms, varied_forms  # noqa: E402
+
+# Distinct patients drawn from the corpus; records reuse them under their own names
+PATIENT_POOL = 2000
+
+
+def queries(records: int) -> list:
+    return [
+        f'name:"Synthetic Patient {records // 2}"',
+        "interactions:warfarin",
+        "medications:coumadin",
+        "alerts:bleed*",
+        "aspirin -warfarin",
+        "complaint:chest severity:critical",
+        "missing:allergy recommendations:monitor",
+        "anticoagulation",
+    ]
+
+
+def synthetic_records(data_dir: pathlib.Path, count: int, start: int = 0):
+    samples = [record.get("ai_analysis") or {} for _, record in iter_json_records(data_dir)]
+    patients = [MedicalFormParser.extract_patient_data(text).to_dict()
+                for text in varied_forms(load_forms(data_dir), PATIENT_POOL)]
+    for i in range(start, start + count):
+        yield f"record_{i:08d}", {
+            "timestamp": f"2025{i // 86400 % 12 + 1:02d}01_{i // 3600 % 24:02d}{i // 60 % 60:02d}{i % 60:02d}",
+            "patient_data": dict(patients[i % len(patients)], name=f"Synthetic Patient {i}"),
+            "ai_analysis": samples[i % len(samples)],
+        }
+
+
+def disk_bytes(directory: pathlib.Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def time_query(index: SearchIndex, query: str, order: str, repeat: int) -> tuple:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = index.search(query, limit=50, order=order)
+        seconds.append(time.perf_counter() - start)
+    seconds.sort()
+    return len(hits), statistics.median(seconds), seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--records", type=int, default=200000)
+    arg_parser.add_argument("--adds", type=int, default=1000, help="Records indexed one at a time after the build")
+    arg_parser.add_argument("--repeat", type=int, default=20, help="Runs of each query")
+    args = arg_parser.parse_args()
+
+    if not load_forms(args.data_dir):
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+
+    with tempfile.TemporaryDirectory() as root:
+        index = SearchIndex(pathlib.Path(root) / "search.sqlite3")
+        start = time.perf_counter()
+        added = index.add_many(synthetic_records(args.data_dir, args.records))
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index.optimize()
+        optimize_seconds = time.perf_counter() - start
+        size = disk_bytes(pathlib.Path(root))
+        print(f"build: {added:,} documents in {build_seconds:.1f} s ({added / build_seconds:,.0f}/s), "
+              f"optimize {optimize_seconds:.1f} s; {size:,} bytes on disk ({size / added:,.0f} bytes/document)")
+
+        add_seconds = []
+        for record_id, record in synthetic_records(args.data_dir, args.adds, start=args.records):
+            start = time.perf_counter()
+            index.add(record_id, record)
+            add_seconds.append(time.perf_counter() - start)
+        print(f"add:   {len(add_seconds):,} single-record saves, p50 {statistics.median(add_seconds) * 1e3:.2f} ms, "
+              f"p95 {statistics.quantiles(add_seconds, n=20)[18] * 1e3:.2f} ms")
+
+        print()
+        print(f"{'query':<42} {'hits':>5} {'newest p50 ms':>14} {'p95 ms':>8} {'relevance p50 ms':>17} {'p95 ms':>8}")
+        for query in queries(args.records):
+            hits, p50, p95 = time_query(index, query, "newest", args.repeat)
+            _, rank_p50, rank_p95 = time_query(index, query, "relevance", args.repeat)
+            print(f"{query:<42} {hits:>5} {p50 * 1e3:>14.2f} {p95 * 1e3:>8.2f} {rank_p50 * 1e3:>17.2f} "
+                  f"{rank_p95 * 1e3:>8.2f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# app/benchmarks/bench_streaming.py
+"""
+Time-to-first-alert of streamed vs blocking analyses against the fake server.
+
+Runs each form through ClinicalAI.analyze_patient_data (the first alert is
+visible only when the whole completion has arrived) and through
+ClinicalAI.stream_patient_data (the first model alert is visible as soon as
+its JSON object closes). The fake server streams its canned analysis in
+small chunks with a fixed delay, standing in for token generation time.
+The rule pre-screen is off so only model output is timed.
+
+Usage:
+    python app/benchmarks/bench_streaming.py [--forms 20] [--latency 0.3] [--chunk-chars 8] [--chunk-delay 0.02]
+"""
+import argparse
+import itertools
+import pathlib
+import statistics
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+import openai  # noqa: E402
+
+from healthform import ClinicalAI, MedicalFormParser  # noqa: E402
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+
+
+def time_blocking(clinical_ai: ClinicalAI, patient_data) -> tuple:
+    """(first alert, complete) seconds for the blocking call; both are the full round trip"""
+    start = time.perf_counter()
+    clinical_ai.analyze_patient_data(patient_data)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def time_streaming(clinical_ai: ClinicalAI, patient_data) -> tuple:
+    """(first alert, complete) seconds for the streamed call"""
+    start = time.perf_counter()
+    first = None
+    for event in clinical_ai.stream_patient_data(patient_data):
+        if first is None and event.kind == "item":
+            first = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    return (first if first is not None else elapsed), elapsed
+
+
+def summarize(label: str, timings: list):
+    first = [t[0] * 1000 for t in timings]
+    total = [t[1] * 1000 for t in timings]
+    print(f"{label:<10} first alert p50 {statistics.median(first):7.0f} ms  max {max(first):7.0f} ms  |  "
+          f"complete p50 {statistics.median(total):7.0f} ms")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--forms", type=int, default=20)
+    arg_parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the first chunk")
+    arg_parser.add_argument("--chunk-chars", type=int, default=8)
+    arg_parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between chunks")
+    args = arg_parser.parse_args()
+
+    forms = load_forms(args.data_dir)
+    if not forms:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    patients = [MedicalFormParser.extract_patient_data(text)
+                for text in itertools.islice(itertools.cycle(forms), args.forms)]
+
+    with FakeOpenAIServer(latency=args.latency, stream_chunk_chars=args.chunk_chars,
+                          stream_chunk_delay=args.chunk_delay) as server:
+        client = openai.OpenAI(api_key="sk-fake", base_url=server.base_url, max_retries=0)
+        clinical_ai = ClinicalAI(client, prescreen=False)
+        # The blocking response is sent in one piece, so give it the same total generation time
+        server.latency = args.latency + args.chunk_delay * (len(server.content) // args.chunk_chars)
+        blocking = [time_blocking(clinical_ai, p) for p in patients]
+        server.latency = args.latency
+        streaming = [time_streaming(clinical_ai, p) for p in patients]
+
+    print(f"Forms: {len(patients)}  first-chunk latency: {args.latency * 1000:.0f} ms  "
+          f"chunks: {args.chunk_chars} chars every {args.chunk_delay * 1000:.0f} ms")
+    summarize("Blocking", blocking)
+    summarize("Streaming", streaming)
+    speedup = statistics.median(t[0] for t in blocking) / statistics.median(t[0] for t in streaming)
+    print(f"Time-to-first-alert speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# app/benchmarks/bench_templates.py
+"""
+Template dispatch vs the generic extractor.
+
+Parses a synthetic corpus (built from the data/*.json samples as in
+synthetic.py) three ways: the generic label-routing pass alone,
+fingerprinting only, and full registry dispatch (fingerprint + the
+template's single compiled match, generic fallback otherwise). Outputs of
+the generic and dispatched paths must be identical before any rate is
+reported. Also prints which template handled how many forms.
+
+Usage:
+    python app/benchmarks/bench_templates.py [--forms 20000]
+"""
+import argparse
+import collections
+import pathlib
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.parser import extract_generic  # noqa: E402
+from healthform.templates import default_registry, fingerprint  # noqa: E402
+from bench_parser import DEFAULT_DATA_DIR, load_forms  # noqa: E402
+from synthetic import synthetic_forms  # noqa: E402
+
+
+def rate(function, forms: list) -> float:
+    start = time.perf_counter()
+    for text in forms:
+        function(text)
+    return len(forms) / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--forms", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    forms = synthetic_forms(templates, args.forms)
+    registry = default_registry()
+
+    handled = collections.Counter()
+    for text in forms:
+        data, template = registry.extract(text)
+        if data != extract_generic(text):
+            sys.exit(f"Template {template!r} output differs from the generic extractor")
+        handled[template] += 1
+
+    generic = rate(extract_generic, forms)
+    fingerprint_only = rate(fingerprint, forms)
+    dispatched = rate(registry.extract, forms)
+
+    print(f"Corpus: {len(forms):,} synthetic forms from {len(templates)} samples; "
+          f"{len(registry)} registered templates")
+    for template, count in handled.most_common():
+        print(f"  {template:<24} {count:>8,} forms")
+    print(f"Generic extractor:  {generic:10,.0f} forms/sec")
+    print(f"Fingerprint only:   {fingerprint_only:10,.0f} forms/sec")
+    print(f"Template dispatch:  {dispatched:10,.0f} forms/sec  ({dispatched / generic:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# app/benchmarks/fake_openai_server.py
+"""
+Local fake of the OpenAI chat completions endpoint.
+
+Serves POST /v1/chat/completions with a canned clinical analysis, with
+configurable latency and injected rate-limit (429), server (500) and
+timeout failures. Requests with ``"stream": true`` get the same content as
+server-sent chat.completion.chunk events, ``stream_chunk_chars`` characters
+at a time with ``stream_chunk_delay`` seconds between them. Multi-patient
+prompts ('### Patient <ID>' sections) get one canned analysis per ID, and
+``batch_part_failure_rate`` of those parts come back unparseable. Point
+any OpenAI client at ``server.base_url``.
+
+Usage:
+    python app/benchmarks/fake_openai_server.py --port 8765 --latency 0.2 --rate-limit-rate 0.1
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from typing import Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANALYSIS = {
+    "critical_alerts": [
+        {"severity": "high", "message": "Blood pressure in hypertensive crisis range requires immediate attention"}
+    ],
+    "drug_interactions": [
+        {"severity": "high", "message": "Warfarin + Aspirin combination increases bleeding risk"}
+    ],
+    "missing_info": [
+        {"severity": "medium", "message": "No recent INR result documented"}
+    ],
+    "recommendations": [
+        {"severity": "low", "message": "Complete medication reconciliation recommended"}
+    ],
+}
+
+
+_BATCH_ID_RE = re.compile(r"^### Patient (\S+)$", re.MULTILINE)
+
+
+class FakeOpenAIServer:
+    """
+    Threaded fake chat completions server for local load and failure testing.
+
+    Each request sleeps ``latency`` seconds (plus up to ``jitter``), then fails
+    with probability ``rate_limit_rate`` (429), ``error_rate`` (500) or
+    ``timeout_rate`` (sleeps ``timeout_seconds`` before answering). For
+    streamed requests ``latency`` is the time to the first chunk.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit_rate: float = 0.0, error_rate: float = 0.0, timeout_rate: float = 0.0,
+                 timeout_seconds: float = 30.0, retry_after: Optional[float] = None, content: Optional[str] = None,
+                 seed: Optional[int] = None, stream_chunk_chars: int = 16, stream_chunk_delay: float = 0.0,
+                 batch_part_failure_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.retry_after = retry_after
+        self.content = content if content is not None else json.dumps(CANNED_ANALYSIS)
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self.stream_chunk_delay = stream_chunk_delay
+        self.batch_part_failure_rate = batch_part_failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _draw_outcome(self) -> Tuple[str, float]:
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        for outcome, rate in (("rate_limit", self.rate_limit_rate), ("error", self.error_rate),
+                              ("timeout", self.timeout_rate)):
+            if roll < rate:
+                with self._lock:
+                    self.failures += 1
+                return outcome, delay
+            roll -= rate
+        return "ok", delay
+
+    def _content_for(self, request: dict) -> str:
+        """Canned reply; one part per patient ID for multi-patient prompts"""
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        ids = _BATCH_ID_RE.findall(prompt)
+        if not ids:
+            return self.content
+        parts = []
+        for pid in ids:
+            with self._lock:
+                broken = self._random.random() < self.batch_part_failure_rate
+            parts.append(f'"{pid}": ' + ('"unparseable"' if broken else self.content))
+        return '{"patients": {' + ", ".join(parts) + "}}"
+
+    def _completion_body(self, request: dict, content: Optional[str] = None) -> dict:
+        content = self._content_for(request) if content is None else content
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        prompt_tokens = max(1, prompt_chars // 4)
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _stream_chunks(self, request: dict):
+        """chat.completion.chunk bodies carrying the content a few characters at a time"""
+        base = {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+        }
+        content = self._content_for(request)
+        yield dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for start in range(0, len(content), self.stream_chunk_chars):
+            piece = content[start:start + self.stream_chunk_chars]
+            yield dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            yield dict(base, choices=[], usage=self._completion_body(request, content)["usage"])
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: dict = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_stream(self, request: dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, chunk in enumerate(server._stream_chunks(request)):
+                    if i > 1 and server.stream_chunk_delay:
+                        time.sleep(server.stream_chunk_delay)
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+                    return
+
+                outcome, delay = server._draw_outcome()
+                time.sleep(delay)
+                if outcome == "rate_limit":
+                    headers = {"Retry-After": str(server.retry_after)} if server.retry_after is not None else {}
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                                    headers)
+                elif outcome == "error":
+                    self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                else:
+                    if outcome == "timeout":
+                        time.sleep(server.timeout_seconds)
+                    if request.get("stream"):
+                        self._send_stream(request)
+                    else:
+                        self._send_json(200, server._completion_body(request))
+
+        return Handler
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that stall")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="How long stalled requests hang")
+    parser.add_argument("--stream-chunk-chars", type=int, default=16, help="Characters per streamed chunk")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--batch-part-failure-rate", type=float, default=0.0,
+                        help="Fraction of patients in a multi-patient reply whose part is unparseable")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency, args.jitter, args.rate_limit_rate,
+                              args.error_rate, args.timeout_rate, args.timeout_seconds,
+                              stream_chunk_chars=args.stream_chunk_chars, stream_chunk_delay=args.stream_chunk_delay,
+                              batch_part_failure_rate=args.batch_part_failure_rate)
+    print(f"Fake OpenAI server listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
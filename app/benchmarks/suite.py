@@ -0,0 +1,321 @@
+# app/benchmarks/suite.py
+"""
+Benchmark suite with machine-readable results, for tracking regressions between versions.
+
+Times every pipeline stage on the same deterministic corpus
+(synthetic.varied_forms over data/*.json):
+
+    parse       MedicalFormParser.extract_patient_data
+    prompt      build_clinical_prompt + build_messages (focus from the rule screen)
+    decode      AnalysisDecoder over every reply shape bench_decoder generates
+    store       save, then load by ID, through the sqlite, json and archive backends
+    search      SearchIndex bulk build, single-record adds and bench_search's queries
+    end_to_end  parse + ClinicalAI analysis of each form against the fake
+                chat-completions server, with its latency and injected 429/500
+                errors, several forms in flight
+
+CPU-bound cases keep the fastest of --repeat runs. Each case reports
+rates and per-item latency percentiles. The results are one JSON
+document holding the environment (git commit, Python, platform, cores),
+the parameters, and a flat list of metrics, each with its unit and
+whether higher or lower is better. With --baseline, the run is compared
+metric by metric with an earlier document. The exit status is 1 when
+any metric got worse by more than --tolerance. end_to_end needs the
+openai package; without it the case is reported as skipped.
+
+Usage:
+    python app/benchmarks/suite.py -o results.json
+    python app/benchmarks/suite.py --quick --only parse decode
+    python app/benchmarks/suite.py --baseline main.json --tolerance 0.15 -o results.json
+    python app/benchmarks/suite.py --only end_to_end --latency 0.2 --error-rate 0.05 --rate-limit-rate 0.05
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from healthform.clinical_ai import CATEGORY_LABELS, ClinicalAI, build_clinical_prompt, build_messages  # noqa: E402
+from healthform.decoding import AnalysisDecoder  # noqa: E402
+from healthform.parser import MedicalFormParser  # noqa: E402
+from healthform.rules import ROUTE_FOCUSED, RuleEngine  # noqa: E402
+from healthform.search import SearchIndex  # noqa: E402
+from healthform.storage import open_store  # noqa: E402
+from healthform.tokens import count_tokens  # noqa: E402
+from bench_decoder import KINDS, random_analysis  # noqa: E402
+from bench_search import queries, synthetic_records  # noqa: E402
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from synthetic import DEFAULT_DATA_DIR, load_forms, varied_forms  # noqa: E402
+
+SCHEMA_VERSION = 1
+CASES = ("parse", "prompt", "decode", "store", "search", "end_to_end")
+STORE_BACKENDS = ("sqlite", "json", "archive")
+
+# (forms, replies, store records, search documents, end-to-end forms) for a full and a --quick run
+SIZES = {"full": (5000, 5000, 2000, 50000, 300), "quick": (1000, 1000, 300, 10000, 60)}
+SEARCH_ADDS = 200
+
+
+class SkipCase(Exception):
+    """A case that cannot run in this environment"""
+
+
+def metric(name: str, value: float, unit: str, better: str) -> dict:
+    return {"name": name, "value": round(value, 4), "unit": unit, "better": better}
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_metrics(prefix: str, samples: list, scale: float = 1e6, unit: str = "us") -> list:
+    return [metric(f"{prefix}.p50_{unit}", percentile(samples, 0.50) * scale, unit, "lower"),
+            metric(f"{prefix}.p95_{unit}", percentile(samples, 0.95) * scale, unit, "lower")]
+
+
+def fastest(function, items: list, repeat: int) -> list:
+    """Per-item seconds of the fastest of ``repeat`` passes over items"""
+    best = None
+    for _ in range(repeat):
+        durations = []
+        for item in items:
+            start = time.perf_counter()
+            function(item)
+            durations.append(time.perf_counter() - start)
+        if best is None or sum(durations) < sum(best):
+            best = durations
+    return best
+
+
+def case_parse(forms: list, args) -> list:
+    durations = fastest(MedicalFormParser.extract_patient_data, forms, args.repeat)
+    return [metric("parse.forms_per_second", len(forms) / sum(durations), "forms/s", "higher"),
+            *latency_metrics("parse", durations)]
+
+
+def case_prompt(forms: list, args) -> list:
+    engine = RuleEngine()
+    jobs = []
+    for text in forms:
+        patient = MedicalFormParser.extract_patient_data(text)
+        screen = engine.screen(patient)
+        jobs.append((patient, screen.focus if screen.route == ROUTE_FOCUSED else None))
+    durations = fastest(lambda job: build_messages(build_clinical_prompt(*job)), jobs, args.repeat)
+    tokens = [count_tokens(build_clinical_prompt(*job)) for job in jobs]
+    return [metric("prompt.prompts_per_second", len(jobs) / sum(durations), "prompts/s", "higher"),
+            *latency_metrics("prompt", durations),
+            metric("prompt.mean_tokens", sum(tokens) / len(tokens), "tokens", "lower")]
+
+
+def case_decode(count: int, args) -> list:
+    rng = random.Random(19)
+    kinds = list(KINDS.values())
+    replies = [kinds[i % len(kinds)](random_analysis(rng)) for i in range(count)]
+    decoder = AnalysisDecoder(CATEGORY_LABELS)
+    decoder.validator  # compile outside the timed loop
+    durations = fastest(decoder.decode, replies, args.repeat)
+    fallbacks = sum("no JSON analysis" in decoder.decode_checked(reply)[1] for reply in replies)
+    return [metric("decode.replies_per_second", len(replies) / sum(durations), "replies/s", "higher"),
+            *latency_metrics("decode", durations),
+            metric("decode.fallback_rate", fallbacks / len(replies), "ratio", "lower")]
+
+
+def case_store(forms: list, args) -> list:
+    rng = random.Random(20)
+    records = [(MedicalFormParser.extract_patient_data(text), random_analysis(rng), text) for text in forms]
+    metrics = []
+    for backend in STORE_BACKENDS:
+        with tempfile.TemporaryDirectory() as root:
+            spec = str(pathlib.Path(root) / "analyses.sqlite3") if backend == "sqlite" else f"{backend}:{root}"
+            store = open_store(spec)
+            ids, saves = [], []
+            for patient, analysis, text in records:
+                start = time.perf_counter()
+                ids.append(store.save(patient, analysis, text))
+                saves.append(time.perf_counter() - start)
+            loads = fastest(store.get, ids, args.repeat)
+            if store.get(ids[-1])["original_form_text"] != records[-1][2]:
+                sys.exit(f"store: {backend} read back a different record than it saved")
+            store.close()
+        metrics += [metric(f"store.{backend}.saves_per_second", len(ids) / sum(saves), "records/s", "higher"),
+                    metric(f"store.{backend}.loads_per_second", len(ids) / sum(loads), "records/s", "higher"),
+                    *latency_metrics(f"store.{backend}.save", saves)]
+    return metrics
+
+
+def case_search(count: int, args) -> list:
+    records = list(synthetic_records(args.data_dir, count + SEARCH_ADDS))
+    with tempfile.TemporaryDirectory() as root:
+        index = SearchIndex(pathlib.Path(root) / "search.sqlite3")
+        start = time.perf_counter()
+        index.add_many(records[:count])
+        build_seconds = time.perf_counter() - start
+        index.optimize()
+        adds = []
+        for record_id, record in records[count:]:
+            start = time.perf_counter()
+            index.add(record_id, record)
+            adds.append(time.perf_counter() - start)
+        newest = fastest(index.search, queries(count), args.repeat)
+        relevance = fastest(lambda query: index.search(query, order="relevance"), queries(count), args.repeat)
+        if not index.search(queries(count)[0]):
+            sys.exit("search: the patient name query found nothing")
+        index.close()
+    return [metric("search.index_per_second", count / build_seconds, "documents/s", "higher"),
+            *latency_metrics("search.add", adds),
+            *latency_metrics("search.query", newest),
+            *latency_metrics("search.relevance_query", relevance)]
+
+
+def case_end_to_end(forms: list, args) -> list:
+    try:
+        import openai
+    except ImportError:
+        raise SkipCase("openai package not installed")
+    with FakeOpenAIServer(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit_rate,
+                          error_rate=args.error_rate, retry_after=0, seed=7) as server:
+        client = openai.OpenAI(api_key="sk-fake", base_url=server.base_url, max_retries=args.retries)
+        clinical_ai = ClinicalAI(client)
+
+        def analyze(text):
+            start = time.perf_counter()
+            clinical_ai.analyze_patient_data(MedicalFormParser.extract_patient_data(text))
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            durations = list(pool.map(analyze, forms))
+        elapsed = time.perf_counter() - start
+        requests = server.requests
+    routing = clinical_ai.router.stats.summary()
+    # Every form is answered by some tier unless the model call failed and the rules stood in
+    fallbacks = len(forms) - sum(routing["forms"].values())
+    return [metric("end_to_end.analyses_per_second", len(forms) / elapsed, "analyses/s", "higher"),
+            *latency_metrics("end_to_end", durations, 1e3, "ms"),
+            metric("end_to_end.requests_per_form", requests / len(forms), "requests", "lower"),
+            metric("end_to_end.fallback_rate", fallbacks / len(forms), "ratio", "lower"),
+            metric("end_to_end.escalation_rate", routing["escalation_rate"], "ratio", "lower")]
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=pathlib.Path(__file__).resolve().parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print each shared metric's change against the baseline; returns the names that regressed"""
+    before = {m["name"]: m for m in baseline.get("metrics", [])}
+    regressions = []
+    sys.stderr.write(f"\nAgainst baseline {baseline.get('environment', {}).get('git_commit') or '?'} "
+                     f"(tolerance {tolerance:.0%}):\n")
+    for current in results["metrics"]:
+        old = before.get(current["name"])
+        if old is None or old["unit"] != current["unit"] or not old["value"]:
+            continue
+        change = (current["value"] - old["value"]) / old["value"]
+        worse = change < -tolerance if current["better"] == "higher" else change > tolerance
+        if worse:
+            regressions.append(current["name"])
+        sys.stderr.write(f"  {current['name']:<38} {old['value']:>12.4g} -> {current['value']:>12.4g} "
+                         f"{change:>+8.1%}{'  REGRESSION' if worse else ''}\n")
+    return regressions
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("-o", "--output", default="-", help="Results JSON file ('-' for stdout)")
+    arg_parser.add_argument("--only", nargs="+", choices=CASES, help="Run only these cases")
+    arg_parser.add_argument("--quick", action="store_true", help="Smaller corpus, for CI and local checks")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Passes per CPU-bound case; the fastest is kept")
+    arg_parser.add_argument("--baseline", type=pathlib.Path, help="Earlier results JSON to compare against")
+    arg_parser.add_argument("--tolerance", type=float, default=0.10,
+                            help="Relative change in the worse direction that counts as a regression")
+    end_to_end = arg_parser.add_argument_group("end_to_end (fake chat-completions server)")
+    end_to_end.add_argument("--latency", type=float, default=0.05, help="Seconds per model response")
+    end_to_end.add_argument("--jitter", type=float, default=0.02, help="Extra random latency, up to this many seconds")
+    end_to_end.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    end_to_end.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    end_to_end.add_argument("--retries", type=int, default=2, help="OpenAI client retries per request")
+    end_to_end.add_argument("--concurrency", type=int, default=8, help="Forms analyzed at once")
+    args = arg_parser.parse_args(argv)
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    form_count, reply_count, record_count, search_count, e2e_count = SIZES["quick" if args.quick else "full"]
+    forms = varied_forms(templates, form_count)
+    runners = {
+        "parse": lambda: case_parse(forms, args),
+        "prompt": lambda: case_prompt(forms, args),
+        "decode": lambda: case_decode(reply_count, args),
+        "store": lambda: case_store(forms[:record_count], args),
+        "search": lambda: case_search(search_count, args),
+        "end_to_end": lambda: case_end_to_end(forms[:e2e_count], args),
+    }
+
+    results = {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "parameters": {"quick": args.quick, "repeat": args.repeat, "forms": form_count, "replies": reply_count,
+                       "store_records": record_count, "search_documents": search_count,
+                       "end_to_end_forms": e2e_count, "latency": args.latency,
+                       "jitter": args.jitter, "rate_limit_rate": args.rate_limit_rate, "error_rate": args.error_rate,
+                       "retries": args.retries, "concurrency": args.concurrency},
+        "cases": {},
+        "metrics": [],
+    }
+    for name in args.only or CASES:
+        start = time.perf_counter()
+        try:
+            metrics = runners[name]()
+        except SkipCase as e:
+            results["cases"][name] = {"status": "skipped", "reason": str(e)}
+            sys.stderr.write(f"{name:<11} skipped: {e}\n")
+            continue
+        seconds = time.perf_counter() - start
+        results["cases"][name] = {"status": "ok", "seconds": round(seconds, 3)}
+        results["metrics"] += metrics
+        for m in metrics:
+            sys.stderr.write(f"{m['name']:<38} {m['value']:>14,.2f} {m['unit']}\n")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+
+    document = json.dumps(results, indent=2) + "\n"
+    if args.output == "-":
+        sys.stdout.write(document)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(document)
+    if regressions:
+        sys.stderr.write(f"{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
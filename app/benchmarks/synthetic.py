@@ -0,0 +1,127 @@
+# app/benchmarks/synthetic.py
+"""
+Synthetic intake forms seeded from the original_form_text samples in data/*.json.
+
+synthetic_forms keeps each sample's layout and text and gives every copy
+its own patient name, age, blood pressure and heart rate, so no two forms
+are identical. It is the corpus the parser and storage benchmarks time.
+
+varied_forms also redraws what the rules and model routing react to, so
+a corpus mixes routine visits with flagged ones (the samples alone are
+all high-risk):
+  - a medication table of 0-8 rows drawn from every row in the samples;
+  - a complaint drawn from the samples or a list of routine visits;
+  - normal vitals on most forms, and sampled vitals otherwise.
+
+Both are deterministic for a given seed, so runs of different versions
+time the same forms.
+
+Usage:
+    from synthetic import load_forms, synthetic_forms, varied_forms
+    forms = varied_forms(load_forms(DEFAULT_DATA_DIR), 1000)
+
+    python app/benchmarks/synthetic.py --forms 5 --varied   # print forms
+"""
+import argparse
+import pathlib
+import random
+import re
+import sys
+
+from bench_parser import DEFAULT_DATA_DIR, load_forms
+
+__all__ = ["DEFAULT_DATA_DIR", "load_forms", "synthetic_forms", "varied_forms"]
+
+ROUTINE_COMPLAINTS = [
+    "Annual physical, no current concerns.", "Medication refill.", "Knee pain after running for two weeks.",
+    "Seasonal allergies, itchy eyes and sneezing.", "Follow-up for hypertension.", "Mild cough for three days.",
+    "Rash on right forearm.", "Low back pain after lifting boxes.",
+]
+# Share of varied forms with a complaint from the samples (all of them red-flag) and with sampled vitals
+SAMPLE_COMPLAINT_SHARE = 0.2
+SAMPLE_VITALS_SHARE = 0.4
+MEDICATION_COUNTS = (0, 1, 1, 2, 2, 3, 4, 5, 6, 8)
+
+_NAME_RE = re.compile(r"(Patient Name:[ \t]*)[^\r\n]+")
+_AGE_RE = re.compile(r"(Age:[ \t]*)\d+")
+_BP_RE = re.compile(r"(Blood Pressure:[ \t]*)\d+\s*/\s*\d+")
+_HR_RE = re.compile(r"(Heart Rate:[ \t]*)\d+")
+_TEMPERATURE_RE = re.compile(r"(Temperature:[ \t]*)\d+(?:\.\d+)?")
+# The complaint runs until a blank line or the next "Label:" line
+_COMPLAINT_RE = re.compile(r"(Primary reason for today's visit:[ \t]*\r?\n)(?:[^\r\n:]+(?:\r?\n|\Z))+")
+# Medication table: the header row and every "a | b | c" row after it
+_MEDICATION_TABLE_RE = re.compile(r"(Medication Name \|[^\r\n]*\r?\n)((?:[^\r\n|]+\|[^\r\n]*(?:\r?\n|\Z))*)")
+
+
+def synthetic_forms(templates: list, count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    forms = []
+    for i in range(count):
+        text = templates[i % len(templates)]
+        text = _NAME_RE.sub(lambda m: f"{m.group(1)}Synthetic Patient {i}", text, count=1)
+        text = _AGE_RE.sub(lambda m: f"{m.group(1)}{rng.randint(18, 95)}", text, count=1)
+        text = _BP_RE.sub(lambda m: f"{m.group(1)}{rng.randint(95, 200)}/{rng.randint(55, 120)}", text, count=1)
+        text = _HR_RE.sub(lambda m: f"{m.group(1)}{rng.randint(45, 140)}", text, count=1)
+        forms.append(text)
+    return forms
+
+
+def medication_rows(templates: list) -> list:
+    """Every distinct medication table row in the samples, without line endings"""
+    rows = {}
+    for text in templates:
+        for match in _MEDICATION_TABLE_RE.finditer(text):
+            for row in match.group(2).splitlines():
+                rows.setdefault(row.split("|", 1)[0].strip().lower(), row.strip())
+    return [rows[name] for name in sorted(rows)]
+
+
+def complaints(templates: list) -> list:
+    """The complaint paragraph of every sample that has one, on one line"""
+    found = []
+    for text in templates:
+        match = _COMPLAINT_RE.search(text)
+        if match:
+            found.append(" ".join(match.group(0)[len(match.group(1)):].split()))
+    return found
+
+
+def varied_forms(templates: list, count: int, seed: int = 13) -> list:
+    rng = random.Random(seed)
+    pool = medication_rows(templates)
+    sample_complaints = complaints(templates) or ROUTINE_COMPLAINTS
+    forms = []
+    for i, text in enumerate(synthetic_forms(templates, count, seed)):
+        newline = "\r\n" if "\r\n" in text else "\n"
+        rows = rng.sample(pool, min(rng.choice(MEDICATION_COUNTS), len(pool)))
+        text = _MEDICATION_TABLE_RE.sub(lambda m: m.group(1) + "".join(row + newline for row in rows), text, count=1)
+        complaint = (rng.choice(sample_complaints) if rng.random() < SAMPLE_COMPLAINT_SHARE
+                     else rng.choice(ROUTINE_COMPLAINTS))
+        text = _COMPLAINT_RE.sub(lambda m: m.group(1) + complaint + newline, text, count=1)
+        if rng.random() >= SAMPLE_VITALS_SHARE:
+            text = _BP_RE.sub(lambda m: f"{m.group(1)}{rng.randint(105, 132)}/{rng.randint(65, 84)}", text, count=1)
+            text = _HR_RE.sub(lambda m: f"{m.group(1)}{rng.randint(58, 92)}", text, count=1)
+            text = _TEMPERATURE_RE.sub(lambda m: f"{m.group(1)}{rng.uniform(97.6, 99.1):.1f}", text, count=1)
+        forms.append(text)
+    return forms
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data-dir", type=pathlib.Path, default=DEFAULT_DATA_DIR)
+    arg_parser.add_argument("--forms", type=int, default=5)
+    arg_parser.add_argument("--varied", action="store_true", help="Also redraw medications, complaint and vitals")
+    arg_parser.add_argument("--seed", type=int)
+    args = arg_parser.parse_args()
+
+    templates = load_forms(args.data_dir)
+    if not templates:
+        sys.exit(f"No forms with original_form_text found in {args.data_dir}")
+    generate = varied_forms if args.varied else synthetic_forms
+    forms = generate(templates, args.forms) if args.seed is None else generate(templates, args.forms, args.seed)
+    for form in forms:
+        sys.stdout.write(form.replace("\r\n", "\n").strip() + "\n\n" + "=" * 40 + "\n\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Core form parsing and clinical analysis engine for HealthForm AI Validator."""
+from importlib import import_module
+
+__all__ = ["PatientData", "MedicalFormParser", "ClinicalAI"]
+
+# Exports load on first use, so importing one submodule (say healthform.parser
+# in a worker process) does not pull in the AI engine and its dependencies
+_EXPORTS = {
+    "PatientData": ".models",
+    "MedicalFormParser": ".parser",
+    "ClinicalAI": ".clinical_ai",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
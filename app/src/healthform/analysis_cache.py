@@ -0,0 +1,141 @@
+# app/src/healthform/analysis_cache.py
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import pathlib
+import threading
+from typing import Dict, Optional
+
+from .models import PatientData
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_value(value):
+    """Collapse whitespace in strings so cosmetic form differences hash identically"""
+    if isinstance(value, str):
+        return _WHITESPACE_RE.sub(" ", value).strip()
+    if isinstance(value, list):
+        return [_normalize_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize_value(item) for key, item in value.items()}
+    return value
+
+
+def analysis_cache_key(patient_data: PatientData, prompt: str, model: str, temperature: float,
+                       max_tokens: int) -> str:
+    """Stable content hash of everything that determines an analysis result"""
+    payload = {
+        "patient_data": _normalize_value(patient_data.to_dict()),
+        "prompt": prompt,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Persistent content-addressed cache of AI analysis results.
+
+    Entries live in a local SQLite file and are evicted when they are older
+    than ``max_age_seconds`` or, least recently used first, when the cache
+    holds more than ``max_entries``. Safe to share between threads.
+    """
+
+    def __init__(self, path, max_entries: int = 10000, max_age_seconds: Optional[float] = 7 * 24 * 3600):
+        self.path = pathlib.Path(path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_cache (
+                   key TEXT PRIMARY KEY,
+                   analysis TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   accessed_at REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache (created_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached analysis for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analysis, created_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            analysis, created_at = row
+            if self.max_age_seconds is not None and now - created_at > self.max_age_seconds:
+                self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(analysis)
+
+    def put(self, key: str, analysis: Dict):
+        """Store an analysis and evict expired and least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, analysis, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(analysis), now, now),
+            )
+            if self.max_age_seconds is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.max_age_seconds,)
+                )
+                self.evictions += cursor.rowcount
+            if self.max_entries is not None:
+                cursor = self._conn.execute(
+                    """DELETE FROM analysis_cache WHERE key IN (
+                           SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                       )""",
+                    (self.max_entries,),
+                )
+                self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached analysis"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters for this process plus the current entry count"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
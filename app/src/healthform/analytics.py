@@ -0,0 +1,164 @@
+# app/src/healthform/analytics.py
+"""
+Aggregate statistics over the saved-analysis corpus.
+
+AnalysisCorpus reads each record once into columns: a PatientTable for the
+patients and one row per alert (record row, category, severity, message)
+as dictionary-encoded arrays. Every statistic is then a numpy/pandas
+operation over whole columns rather than a loop over record dicts:
+
+    severity_distribution  alert counts by category and severity level
+    top_interactions       most frequent drug-interaction messages
+    vital_percentiles      blood pressure, heart rate and temperature percentiles
+                           by age band
+
+numpy and pandas are imported when a statistic is computed, not on import.
+
+Usage:
+    from healthform.analytics import AnalysisCorpus
+    from healthform.storage import open_store
+    corpus = AnalysisCorpus.from_store(open_store("data/analyses.sqlite3"))
+    print(corpus.severity_distribution())
+"""
+from array import array
+from typing import Dict, Iterable, Sequence
+
+from .columnar import NUMERIC_VITALS, PatientTable, StringColumn
+from .models import PatientData
+from .severity import normalize_severity, severity_rank
+from .storage import AnalysisStore, iter_alerts, iter_json_records
+
+# Lower bounds of the age bands; a patient belongs to the last bound not above their age.
+# Unrecorded ages are MISSING (-1) in the patient table and fall below every band.
+AGE_BANDS = (0, 18, 40, 65, 80)
+DEFAULT_PERCENTILES = (5, 50, 95)
+UNSPECIFIED = "unspecified"
+
+
+def age_band_labels(bands: Sequence[int] = AGE_BANDS):
+    """Labels such as '18-39' and '80+' for consecutive band bounds"""
+    labels = [f"{low}-{high - 1}" for low, high in zip(bands, bands[1:])]
+    return labels + [f"{bands[-1]}+"]
+
+
+class AnalysisCorpus:
+    """Saved analyses in columnar form, one patient row per record"""
+
+    def __init__(self):
+        self.patients = PatientTable()
+        self.alert_rows = array("I")
+        self.alert_category = StringColumn()
+        self.alert_severity = StringColumn()
+        self.alert_message = StringColumn()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "AnalysisCorpus":
+        corpus = cls()
+        corpus.extend(records)
+        return corpus
+
+    @classmethod
+    def from_store(cls, store: AnalysisStore) -> "AnalysisCorpus":
+        return cls.from_records(store.iter_records())
+
+    @classmethod
+    def from_json_directory(cls, data_dir) -> "AnalysisCorpus":
+        """Corpus of the data/patient_form_*.json files"""
+        return cls.from_records(record for _, record in iter_json_records(data_dir))
+
+    def __len__(self) -> int:
+        return len(self.patients)
+
+    @property
+    def alert_count(self) -> int:
+        return len(self.alert_rows)
+
+    def append(self, record: Dict):
+        row = len(self.patients)
+        self.patients.append(PatientData.from_dict(record.get("patient_data") or {}))
+        alerts = list(iter_alerts(record.get("ai_analysis")))
+        if not alerts:
+            return
+        self.alert_rows.extend([row] * len(alerts))
+        for category, severity, message in alerts:
+            self.alert_category.append(category)
+            # "Severe", "HIGH" and "urgent" count as one level; unknown words keep their own column
+            self.alert_severity.append(normalize_severity(severity) or severity.strip().lower() or UNSPECIFIED)
+            self.alert_message.append(message.strip())
+
+    def extend(self, records: Iterable[Dict]):
+        for record in records:
+            self.append(record)
+
+    def alerts_frame(self):
+        """One row per alert: record row, category, severity and message (codes are not copied)"""
+        import numpy as np
+        import pandas as pd
+
+        return pd.DataFrame({
+            "record": np.frombuffer(self.alert_rows, dtype=np.uintc),
+            "category": self.alert_category.to_categorical(),
+            "severity": self.alert_severity.to_categorical(),
+            "message": self.alert_message.to_categorical(),
+        }, copy=False)
+
+    def severity_distribution(self):
+        """Alert counts with one row per category and one column per severity, most severe first"""
+        import numpy as np
+        import pandas as pd
+
+        categories = self.alert_category.values
+        severities = self.alert_severity.values
+        category_codes = np.frombuffer(self.alert_category.codes, dtype=np.intc)
+        severity_codes = np.frombuffer(self.alert_severity.codes, dtype=np.intc)
+        counts = np.bincount(category_codes * len(severities) + severity_codes,
+                             minlength=len(categories) * len(severities))
+        table = pd.DataFrame(counts.reshape(len(categories), len(severities)),
+                             index=pd.Index(categories, name="category"),
+                             columns=pd.Index(severities, name="severity"))
+        order = sorted(severities, key=lambda severity: (-severity_rank(severity), severity))
+        return table[order]
+
+    def top_interactions(self, limit: int = 10):
+        """The most frequent drug-interaction messages with their counts"""
+        import numpy as np
+        import pandas as pd
+
+        messages = self.alert_message.values
+        try:
+            interaction_code = self.alert_category.values.index("drug_interactions")
+        except ValueError:
+            return pd.DataFrame({"message": pd.Series(dtype=object), "count": pd.Series(dtype=np.int64)})
+        category_codes = np.frombuffer(self.alert_category.codes, dtype=np.intc)
+        message_codes = np.frombuffer(self.alert_message.codes, dtype=np.intc)
+        counts = np.bincount(message_codes[category_codes == interaction_code], minlength=len(messages))
+        top = np.argsort(-counts, kind="stable")[:limit]
+        top = top[counts[top] > 0]
+        return pd.DataFrame({"message": [messages[code] for code in top], "count": counts[top]})
+
+    def vital_percentiles(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                          bands: Sequence[int] = AGE_BANDS):
+        """
+        Percentiles of systolic, diastolic, heart rate and temperature (°C) per age band.
+
+        Rows are age bands; columns are (vital, percentile) pairs. Patients
+        with no recorded age and vitals that could not be read are left
+        out, so each cell has its own sample size (see the count columns).
+        """
+        import numpy as np
+        import pandas as pd
+
+        ages = np.frombuffer(self.patients.age, dtype=np.intc)
+        labels = age_band_labels(bands)
+        band = pd.Categorical.from_codes(np.searchsorted(bands, ages, side="right") - 1, categories=labels)
+        frame = pd.DataFrame({vital: self.patients.vital_values(vital) for vital in NUMERIC_VITALS})
+        groups = frame.groupby(band, observed=False)
+        quantiles = groups.quantile([p / 100 for p in percentiles]).unstack()
+        quantiles.columns = pd.MultiIndex.from_tuples([(vital, f"p{q * 100:g}") for vital, q in quantiles.columns])
+        counts = groups.count()
+        counts.columns = pd.MultiIndex.from_tuples([(vital, "count") for vital in counts.columns])
+        result = pd.concat([counts, quantiles], axis=1)
+        result = result[[column for vital in NUMERIC_VITALS for column in result.columns if column[0] == vital]]
+        result.index.name = "age_band"
+        return result
+
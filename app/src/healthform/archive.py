@@ -0,0 +1,393 @@
+# app/src/healthform/archive.py
+"""
+Append-only compressed segment archive for saved analyses.
+
+A pretty-printed JSON file per analysis spends most of its ~5 KB on the
+original form text and indentation. SegmentArchive appends each record,
+compact JSON compressed on its own, to a segment file instead:
+
+    segment_000001.hfa   header (magic, version, codec), then frames of
+                         <length:u32><crc32:u32><compressed record>
+    segment_000001.idx   one line per frame: id, offset, length,
+                         timestamp, max severity, patient name
+
+A segment is sealed and the next one started once it would grow past
+``segment_bytes``. Lookups by ID go through the in-memory index to a slice
+of the segment's memory map, so only that record is read and
+decompressed; iter_records streams segments front to back without the
+index. Records are never rewritten: an ID that is already stored is not
+saved again. A frame left half-written by a crash is cut off, and frames
+missing from the sidecar index are re-indexed, when the archive is opened.
+
+Records are compressed with zstd when the optional ``zstandard`` package
+is installed and gzip otherwise; each segment records its codec, so
+archives written either way stay readable.
+
+Usage:
+    archive = SegmentArchive("data/archive")
+    record_id = archive.save(patient_data, analysis, original_text)
+    record = archive.get(record_id)
+
+One-time conversion of existing data/*.json files:
+    cd app/src
+    python -m healthform.archive convert-json ../../data --archive ../../data/archive
+"""
+import os
+import sys
+import json
+import mmap
+import zlib
+import heapq
+import struct
+import pathlib
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .storage import AnalysisStore, iter_alerts, iter_json_records, new_record_id, severity_rank
+
+MAGIC = b"HFSA"
+FORMAT_VERSION = 1
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+SEGMENT_SUFFIX = ".hfa"
+INDEX_SUFFIX = ".idx"
+
+_HEADER = struct.Struct("<4sBB")  # magic, version, codec id
+_FRAME = struct.Struct("<II")  # compressed length, crc32 of the compressed bytes
+
+CODEC_IDS = {"gzip": 1, "zstd": 2}
+_CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 9}
+
+
+def zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_codec() -> str:
+    """zstd when the zstandard package is installed, gzip otherwise"""
+    return "zstd" if zstd_available() else "gzip"
+
+
+class _Codec:
+    """Per-record compression for one codec and level"""
+
+    def __init__(self, name: str, level: Optional[int] = None):
+        if name not in CODEC_IDS:
+            raise ValueError(f"Unknown codec {name!r}; expected one of {', '.join(CODEC_IDS)}")
+        self.name = name
+        self.id = CODEC_IDS[name]
+        self.level = DEFAULT_LEVELS[name] if level is None else level
+        if name == "zstd":
+            import zstandard
+            self._zstd = zstandard
+            self._local = threading.local()  # zstandard (de)compressors are not thread-safe
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "gzip":
+            return zlib.compress(data, self.level, wbits=31)
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = self._zstd.ZstdCompressor(level=self.level)
+        return compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.name == "gzip":
+            return zlib.decompress(data, wbits=31)
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = self._zstd.ZstdDecompressor()
+        return decompressor.decompress(data)
+
+
+@dataclass(frozen=True, slots=True)
+class IndexEntry:
+    """Where a record lives, plus the summary fields list_recent needs"""
+    record_id: str
+    segment: int
+    offset: int
+    length: int
+    timestamp: str
+    max_severity: int
+    patient_name: str
+
+    def to_line(self) -> str:
+        return "\t".join((self.record_id, str(self.offset), str(self.length), self.timestamp,
+                          str(self.max_severity), self.patient_name)) + "\n"
+
+    @classmethod
+    def from_line(cls, segment: int, line: str) -> "IndexEntry":
+        record_id, offset, length, timestamp, max_severity, patient_name = line.rstrip("\n").split("\t")
+        return cls(record_id, segment, int(offset), int(length), timestamp, int(max_severity), patient_name)
+
+    def summary(self) -> Dict:
+        return {"id": self.record_id, "timestamp": self.timestamp, "patient_name": self.patient_name,
+                "max_severity": self.max_severity}
+
+
+def _field(value) -> str:
+    # Index lines are tab-separated, one per record: fold all whitespace runs to a space
+    return " ".join(str(value or "").split())
+
+
+def _summary_fields(record: Dict) -> Tuple[str, int, str]:
+    """(timestamp, max_severity, patient_name) as indexed for a record"""
+    max_severity = max((severity_rank(severity) for _, severity, _ in iter_alerts(record.get("ai_analysis"))),
+                       default=0)
+    return _field(record.get("timestamp", "")), max_severity, _field((record.get("patient_data") or {}).get("name", ""))
+
+
+class _Segment:
+    """One segment file: its codec, size and (lazily) a read-only memory map"""
+
+    def __init__(self, number: int, path: pathlib.Path, codec: _Codec, size: int):
+        self.number = number
+        self.path = path
+        self.codec = codec
+        self.size = size
+        self.records = 0
+        self._map: Optional[mmap.mmap] = None
+
+    @property
+    def index_path(self) -> pathlib.Path:
+        return self.path.with_suffix(INDEX_SUFFIX)
+
+    def view(self, end: int) -> mmap.mmap:
+        """Memory map covering at least the first ``end`` bytes (remapped as the active segment grows)"""
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _read_header(f: BinaryIO, path) -> _Codec:
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"{path}: truncated segment header")
+    magic, version, codec_id = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not an analysis archive segment")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported segment format version {version}")
+    if codec_id not in _CODEC_NAMES:
+        raise ValueError(f"{path}: unknown codec id {codec_id}")
+    return _Codec(_CODEC_NAMES[codec_id])
+
+
+def _iter_frames(f: BinaryIO, offset: int, end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """(offset, compressed payload) of each complete, checksum-valid frame from offset; stops at the first bad one"""
+    f.seek(offset)
+    while end is None or offset < end:
+        head = f.read(_FRAME.size)
+        if len(head) < _FRAME.size:
+            return
+        length, crc = _FRAME.unpack(head)
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        yield offset, payload
+        offset += _FRAME.size + length
+
+
+class SegmentArchive(AnalysisStore):
+    """Append-only archive of compressed records in size-rotated segments; safe to share between threads"""
+
+    def __init__(self, directory, codec: Optional[str] = None, level: Optional[int] = None,
+                 segment_bytes: int = DEFAULT_SEGMENT_BYTES, fsync: bool = False):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.codec = _Codec(codec or default_codec(), level)
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._index: Dict[str, IndexEntry] = {}
+        self._segments: Dict[int, _Segment] = {}
+        self._writer: Optional[BinaryIO] = None
+        self._index_writer = None
+        for path in sorted(self.directory.glob(f"segment_*{SEGMENT_SUFFIX}")):
+            number = int(path.stem[len("segment_"):])
+            self._segments[number] = self._open_segment(number, path)
+
+    def _open_segment(self, number: int, path: pathlib.Path) -> _Segment:
+        """Load a segment's index, re-indexing frames the sidecar is missing and cutting off a torn tail"""
+        with open(path, "r+b") as f:
+            codec = _read_header(f, path)
+            segment = _Segment(number, path, codec, os.fstat(f.fileno()).st_size)
+            indexed_end = _HEADER.size
+            index_path = segment.index_path
+            index_path.touch()
+            with open(index_path, "r+b") as index_file:
+                data = index_file.read()
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    index_file.truncate(complete)  # torn last line; its frame is re-indexed below
+                for line in data[:complete].decode("utf-8").splitlines():
+                    entry = IndexEntry.from_line(number, line)
+                    self._index[entry.record_id] = entry
+                    indexed_end = max(indexed_end, entry.offset + _FRAME.size + entry.length)
+                    segment.records += 1
+            if indexed_end < segment.size:
+                good_end = indexed_end
+                with open(index_path, "a", encoding="utf-8", newline="\n") as index_file:
+                    for offset, payload in _iter_frames(f, indexed_end):
+                        record = json.loads(codec.decompress(payload))
+                        entry = IndexEntry(record["id"], number, offset, len(payload), *_summary_fields(record))
+                        index_file.write(entry.to_line())
+                        self._index[entry.record_id] = entry
+                        good_end = offset + _FRAME.size + len(payload)
+                        segment.records += 1
+                if good_end < segment.size:
+                    f.truncate(good_end)
+                    segment.size = good_end
+        return segment
+
+    def _new_segment(self) -> _Segment:
+        number = max(self._segments, default=0) + 1
+        path = self.directory / f"segment_{number:06d}{SEGMENT_SUFFIX}"
+        with open(path, "xb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.codec.id))
+        path.with_suffix(INDEX_SUFFIX).touch()
+        segment = _Segment(number, path, self.codec, _HEADER.size)
+        self._segments[number] = segment
+        return segment
+
+    def _close_writers(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._index_writer.close()
+            self._writer = self._index_writer = None
+
+    def _active_segment(self, frame_size: int) -> _Segment:
+        """Segment the next frame goes to: the last one, unless it is full or uses another codec"""
+        segment = self._segments[max(self._segments)] if self._segments else None
+        if (segment is None or segment.codec.id != self.codec.id
+                or (segment.records and segment.size + frame_size > self.segment_bytes)):
+            self._close_writers()
+            segment = self._new_segment()
+        if self._writer is None:
+            self._writer = open(segment.path, "ab")
+            self._index_writer = open(segment.index_path, "a", encoding="utf-8", newline="\n")
+        return segment
+
+    def _append(self, record: Dict, record_id: str) -> bool:
+        if record_id in self._index:
+            return False
+        if "\t" in record_id or "\n" in record_id:
+            raise ValueError(f"Record ID may not contain tabs or newlines: {record_id!r}")
+        payload = self.codec.compress(json.dumps(dict(record, id=record_id), separators=(",", ":")).encode("utf-8"))
+        segment = self._active_segment(_FRAME.size + len(payload))
+        entry = IndexEntry(record_id, segment.number, segment.size, len(payload), *_summary_fields(record))
+        # Frame first, index line second: a crash in between is repaired by re-indexing on open
+        self._writer.write(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._writer.flush()
+        if self.fsync:
+            os.fsync(self._writer.fileno())
+        self._index_writer.write(entry.to_line())
+        self._index_writer.flush()
+        segment.size += _FRAME.size + len(payload)
+        segment.records += 1
+        self._index[record_id] = entry
+        return True
+
+    def save_record(self, record: Dict, record_id: Optional[str] = None) -> str:
+        record_id = record_id or new_record_id()
+        with self._lock:
+            self._append(record, record_id)
+        return record_id
+
+    def import_records(self, records: Iterator[Tuple[str, Dict]]) -> int:
+        """Append (record_id, record) pairs; IDs already archived are skipped. Returns records added"""
+        added = 0
+        for record_id, record in records:
+            with self._lock:
+                added += self._append(record, record_id)
+        return added
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._index.get(record_id)
+            if entry is None:
+                return None
+            segment = self._segments[entry.segment]
+            start = entry.offset + _FRAME.size
+            payload = segment.view(start + entry.length)[start:start + entry.length]
+        return json.loads(segment.codec.decompress(payload))
+
+    def list_recent(self, limit: int = 5) -> List[Dict]:
+        with self._lock:
+            entries = heapq.nlargest(limit, self._index.values(), key=lambda e: (e.timestamp, e.record_id))
+        return [entry.summary() for entry in entries]
+
+    def count(self) -> int:
+        return len(self._index)
+
+    def iter_records(self) -> Iterator[Dict]:
+        # Sequential buffered reads, segment by segment; the active segment only up to its size right now
+        with self._lock:
+            segments = [(segment.path, segment.codec, segment.size) for segment in self._segments.values()]
+        for path, codec, size in segments:
+            with open(path, "rb", buffering=1024 * 1024) as f:
+                for _, payload in _iter_frames(f, _HEADER.size, size):
+                    yield json.loads(codec.decompress(payload))
+
+    def segments(self) -> List[Dict]:
+        """Per-segment file name, codec, record count and bytes on disk"""
+        with self._lock:
+            return [{"segment": segment.path.name, "codec": segment.codec.name, "records": segment.records,
+                     "bytes": segment.size + segment.index_path.stat().st_size}
+                    for segment in self._segments.values()]
+
+    def close(self):
+        with self._lock:
+            self._close_writers()
+            for segment in self._segments.values():
+                segment.close()
+
+
+def convert_json_directory(archive: SegmentArchive, data_dir) -> int:
+    """Append every data/patient_form_*.json file to the archive; returns the number of new records"""
+    return archive.import_records(iter_json_records(data_dir))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m healthform.archive", description="Manage analysis archives")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    convert_cmd = subcommands.add_parser("convert-json", help="Append data/patient_form_*.json files to an archive")
+    convert_cmd.add_argument("data_dir", help="Directory holding patient_form_*.json files")
+    info_cmd = subcommands.add_parser("info", help="Show an archive's segments")
+    for command in (convert_cmd, info_cmd):
+        command.add_argument("--archive", default=os.path.join("data", "archive"), help="Archive directory")
+    convert_cmd.add_argument("--codec", choices=sorted(CODEC_IDS), help="Default: zstd if installed, else gzip")
+    convert_cmd.add_argument("--level", type=int, help="Compression level")
+    convert_cmd.add_argument("--segment-mb", type=float, default=DEFAULT_SEGMENT_BYTES / 2**20,
+                             help="Rotate segments at this size")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert-json":
+        archive = SegmentArchive(args.archive, codec=args.codec, level=args.level,
+                                 segment_bytes=int(args.segment_mb * 2**20))
+        added = convert_json_directory(archive, args.data_dir)
+        print(f"Archived {added} analyses into {args.archive} ({archive.count()} total)")
+    else:
+        archive = SegmentArchive(args.archive)
+        for segment in archive.segments():
+            print(f"{segment['segment']}  {segment['codec']:<5} {segment['records']:>8,} records "
+                  f"{segment['bytes']:>14,} bytes")
+    archive.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
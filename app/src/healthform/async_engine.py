@@ -0,0 +1,357 @@
+# app/src/healthform/async_engine.py
+"""
+Asyncio analysis engine for running many patient analyses concurrently.
+
+Unlike ClinicalAI.analyze_patient_data, failures are never replaced with
+mock output: every analysis comes back as an AnalysisResult that either
+carries the parsed analysis or the error that stopped it.
+"""
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .models import PatientData
+from .analysis_cache import AnalysisCache, analysis_cache_key
+from .tokens import count_tokens
+from .instrumentation import event, record_tokens, span
+from .batching import batch_completion_limit, build_batch_messages, build_batch_prompt, split_batch_response
+from .clinical_ai import (MODEL, TEMPERATURE, build_clinical_prompt, build_messages, completion_token_limit,
+                          parse_ai_response, response_usage)
+
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and transient server errors
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class AnalysisError(Exception):
+    """Raised when an analysis fails after exhausting its retries"""
+
+    def __init__(self, message: str, attempts: int = 0, retryable: bool = False):
+        super().__init__(message)
+        self.attempts = attempts
+        self.retryable = retryable
+
+
+@dataclass
+class AnalysisResult:
+    """Outcome of one patient analysis"""
+    index: int
+    analysis: Optional[Dict] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_seconds: float = 0.0
+    cached: bool = False
+    batch_size: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def create_async_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None,
+                               timeout: float = 60.0) -> "openai.AsyncOpenAI":
+    """Async OpenAI client with SDK-level retries disabled so the engine owns retry policy"""
+    import openai
+
+    return openai.AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate-limit, timeout and transient connection or server errors"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested delay from a Retry-After header, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBudget:
+    """
+    Token bucket enforcing a tokens-per-minute limit.
+
+    Callers reserve their estimated token cost before sending a request and
+    settle the difference once the real usage is known.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> int:
+        """Wait until ``tokens`` fit in the budget and reserve them; returns the amount reserved"""
+        tokens = min(tokens, int(self.capacity))
+        async with self._lock:
+            self._refill()
+            while self._available < tokens:
+                await asyncio.sleep((tokens - self._available) / self.rate)
+                self._refill()
+            self._available -= tokens
+        return tokens
+
+    def settle(self, reserved: int, used: int):
+        """Return over-reserved tokens to the budget, or charge the shortfall"""
+        self._refill()
+        self._available = min(self.capacity, self._available + reserved - used)
+
+
+class AsyncClinicalEngine:
+    """
+    Concurrency- and rate-limited clinical analysis over an async OpenAI client.
+
+    ``max_concurrency`` bounds requests in flight, ``tokens_per_minute``
+    bounds token throughput, and rate-limit or timeout errors are retried
+    with full-jitter exponential backoff up to ``max_retries`` times.
+    """
+
+    def __init__(self, client, max_concurrency: int = 8, tokens_per_minute: Optional[int] = 90000,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 request_timeout: float = 60.0, cache: Optional[AnalysisCache] = None,
+                 model: str = MODEL):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_timeout = request_timeout
+        self.cache = cache
+        self.model = model
+        self.budget = TokenBudget(tokens_per_minute) if tokens_per_minute else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int) -> "openai.types.chat.ChatCompletion":
+        return await asyncio.wait_for(
+            self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=TEMPERATURE,
+            ),
+            timeout=self.request_timeout,
+        )
+
+    async def _request(self, messages: List[Dict[str, str]], max_tokens: int, label: str):
+        """
+        Send one completion request with retries; returns (response, attempts, reserved tokens).
+
+        Raises AnalysisError once the error is not retryable or retries run out.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        estimated = sum(count_tokens(m["content"], self.model) for m in messages) + max_tokens
+        attempt = 0
+        while True:
+            attempt += 1
+            error = None
+            async with self._semaphore:
+                reserved = await self.budget.acquire(estimated) if self.budget else 0
+                try:
+                    with span("llm", model=self.model, attempt=attempt):
+                        response = await self._complete(messages, max_tokens)
+                except Exception as e:
+                    error = e
+                    if self.budget:
+                        self.budget.settle(reserved, 0)
+            if error is None:
+                return response, attempt, reserved
+            if not is_retryable(error):
+                raise AnalysisError(f"{type(error).__name__}: {error}", attempts=attempt) from error
+            if attempt > self.max_retries:
+                raise AnalysisError(f"Gave up after {attempt} attempts: {type(error).__name__}: {error}",
+                                    attempts=attempt, retryable=True) from error
+            # Back off outside the semaphore so other analyses keep the slots busy
+            delay = self._backoff_delay(attempt, error)
+            event("llm_retry", error=type(error).__name__)
+            logger.info("Retrying %s after %s (attempt %d, %.2fs)", label, type(error).__name__, attempt, delay)
+            await asyncio.sleep(delay)
+
+    def _settle_usage(self, response, messages: List[Dict[str, str]], reserved: int) -> Tuple[str, Dict]:
+        ai_content = response.choices[0].message.content or ""
+        usage = response_usage(response, messages, ai_content)
+        if self.budget:
+            self.budget.settle(reserved, usage["prompt_tokens"] + usage["completion_tokens"])
+        record_tokens(usage)
+        return ai_content, usage
+
+    def _cache_key(self, patient_data: PatientData, prompt: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return analysis_cache_key(patient_data, prompt, self.model, TEMPERATURE, completion_token_limit())
+
+    def _cached_result(self, cache_key: Optional[str], index: int) -> Optional[AnalysisResult]:
+        if cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            event("cache_miss")
+            return None
+        event("cache_hit")
+        return AnalysisResult(index=index, analysis=cached, cached=True)
+
+    async def analyze(self, patient_data: PatientData, index: int = 0) -> AnalysisResult:
+        """Analyze one patient; raises AnalysisError if every attempt fails"""
+        with span("prompt"):
+            prompt = build_clinical_prompt(patient_data)
+        messages = build_messages(prompt)
+        cache_key = self._cache_key(patient_data, prompt)
+        cached = self._cached_result(cache_key, index)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        response, attempts, reserved = await self._request(messages, completion_token_limit(), f"analysis {index}")
+        ai_content, usage = self._settle_usage(response, messages, reserved)
+        if not ai_content:
+            raise AnalysisError("Model returned an empty response", attempts=attempts)
+        with span("decode"):
+            analysis = parse_ai_response(ai_content)
+        analysis["usage"] = usage
+        if cache_key is not None:
+            self.cache.put(cache_key, analysis)
+
+        return AnalysisResult(
+            index=index,
+            analysis=analysis,
+            attempts=attempts,
+            prompt_tokens=usage["prompt_tokens"],
+            completion_tokens=usage["completion_tokens"],
+            latency_seconds=time.perf_counter() - start,
+        )
+
+    async def _analyze_reporting(self, patient_data: PatientData, index: int) -> AnalysisResult:
+        try:
+            return await self.analyze(patient_data, index)
+        except AnalysisError as e:
+            logger.warning("Analysis %d failed: %s", index, e)
+            return AnalysisResult(index=index, error=str(e), attempts=e.attempts)
+        except Exception as e:
+            # Anything else (a decoding or cache bug) fails this form only, not the forms gathered with it
+            logger.exception("Analysis %d failed", index)
+            event("analysis_error", reason=type(e).__name__)
+            return AnalysisResult(index=index, error=f"{type(e).__name__}: {e}")
+
+    async def analyze_group(self, group: Sequence[Tuple[int, PatientData]]) -> List[AnalysisResult]:
+        """
+        Analyze several patients in one request; never raises.
+
+        Cached patients are answered locally and the rest share one prompt.
+        Patients whose part of the reply is missing or unparseable are
+        retried on their own, as are all of them if the batch request is
+        rejected outright (e.g. too long); a batch that exhausts its
+        rate-limit retries reports the error for every patient instead of
+        multiplying the load.
+        """
+        results = []
+        pending = []
+        for index, patient_data in group:
+            with span("prompt"):
+                cache_key = self._cache_key(patient_data, build_clinical_prompt(patient_data))
+            cached = self._cached_result(cache_key, index)
+            if cached is not None:
+                results.append(cached)
+            else:
+                pending.append((index, patient_data, cache_key))
+        if len(pending) <= 1:
+            results.extend([await self._analyze_reporting(p, i) for i, p, _ in pending])
+            return results
+
+        with span("prompt", batch_size=len(pending)):
+            prompt, ids = build_batch_prompt([p for _, p, _ in pending])
+        messages = build_batch_messages(prompt)
+        label = f"batch of {len(pending)} (analyses {', '.join(str(i) for i, _, _ in pending)})"
+        start = time.perf_counter()
+        try:
+            response, attempts, reserved = await self._request(messages, batch_completion_limit(len(pending)), label)
+        except AnalysisError as e:
+            if e.retryable:
+                logger.warning("%s failed: %s", label, e)
+                return results + [AnalysisResult(index=i, error=str(e), attempts=e.attempts) for i, _, _ in pending]
+            logger.info("%s rejected (%s); analyzing individually", label, e)
+            event("batch_fallback", count=len(pending))
+            return results + list(await asyncio.gather(*(self._analyze_reporting(p, i) for i, p, _ in pending)))
+
+        ai_content, usage = self._settle_usage(response, messages, reserved)
+        with span("decode", batch_size=len(pending)):
+            try:
+                parts = split_batch_response(ai_content, ids)
+            except Exception:
+                logger.exception("%s: reply could not be split", label)
+                parts = dict.fromkeys(ids)
+        latency = time.perf_counter() - start
+        # Tokens are shared evenly; the per-patient cost is what batching is meant to lower
+        share = {key: usage[key] // len(pending) for key in ("prompt_tokens", "completion_tokens")}
+
+        retry = []
+        for pid, (index, patient_data, cache_key) in zip(ids, pending):
+            analysis = parts[pid]
+            if analysis is None:
+                retry.append((index, patient_data))
+                continue
+            analysis["usage"] = dict(share, source=usage["source"], batch_size=len(pending))
+            if cache_key is not None:
+                self.cache.put(cache_key, analysis)
+            results.append(AnalysisResult(index=index, analysis=analysis, attempts=attempts,
+                                          prompt_tokens=share["prompt_tokens"],
+                                          completion_tokens=share["completion_tokens"],
+                                          latency_seconds=latency, batch_size=len(pending)))
+        if retry:
+            logger.info("%s: retrying %d unparsed patient(s) individually", label, len(retry))
+            event("batch_part_retry", count=len(retry))
+            results.extend(await asyncio.gather(*(self._analyze_reporting(p, i) for i, p in retry)))
+        return results
+
+    async def analyze_many(self, patients: Sequence[PatientData], batch_size: int = 1) -> List[AnalysisResult]:
+        """
+        Analyze all patients concurrently; results keep input order and carry explicit errors.
+
+        With ``batch_size`` > 1, patients are packed that many to a request.
+        """
+        if batch_size <= 1:
+            return await asyncio.gather(*(self._analyze_reporting(p, i) for i, p in enumerate(patients)))
+        indexed = list(enumerate(patients))
+        groups = [indexed[i:i + batch_size] for i in range(0, len(indexed), batch_size)]
+        grouped = await asyncio.gather(*(self.analyze_group(group) for group in groups))
+        return sorted((result for results in grouped for result in results), key=lambda r: r.index)
+
+
+def analyze_all(client, patients: Sequence[PatientData], batch_size: int = 1,
+                **engine_options) -> List[AnalysisResult]:
+    """Synchronous entry point: run a batch through a fresh engine and event loop"""
+    engine = AsyncClinicalEngine(client, **engine_options)
+    return asyncio.run(engine.analyze_many(patients, batch_size))
@@ -0,0 +1,377 @@
+# app/src/healthform/batch.py
+"""
+Headless batch validation of medical intake forms.
+
+Parses every form text file matched by the given directories or glob
+patterns, runs the clinical analysis on it and streams one JSON line per
+form to the output sink as soon as it completes.
+
+Usage:
+    cd app/src
+    python -m healthform.batch ../../forms/ "intake/*.txt" -o results.jsonl --workers 8
+    python -m healthform.batch ../../backfill/ -o results.jsonl --batch-size 5   # several patients per request
+    python -m healthform.batch ../../archive/ --parse-only --processes 8 -o patients.jsonl
+    python -m healthform.batch ../../exports/batch.txt --split -o results.jsonl   # many forms per file
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import pathlib
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+from .models import PatientData
+from .parser import MedicalFormParser
+from .rules import RuleEngine
+from .batching import DEFAULT_BATCH_SIZE, max_batch_size
+from .clinical_ai import ClinicalAI, attach_triage
+from .analysis_cache import AnalysisCache
+from .near_duplicates import NearDuplicateIndex
+from .routing import TierRouter, format_routing_summary
+from .parallel import DEFAULT_CHUNK_SIZE, ParallelParser
+from .ingest import SplitForm, iter_form_files
+from . import instrumentation
+
+
+def iter_form_paths(sources: Iterable[str], pattern: str = "*.txt") -> Iterator[pathlib.Path]:
+    """Yield form files from directories, glob patterns or plain file paths"""
+    for source in sources:
+        path = pathlib.Path(source)
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob(pattern) if p.is_file())
+        elif path.is_file():
+            yield path
+        else:
+            yield from (pathlib.Path(p) for p in sorted(glob.iglob(source, recursive=True)) if os.path.isfile(p))
+
+
+def parse_form(item: Union[pathlib.Path, SplitForm]) -> Tuple[Dict, Optional[PatientData]]:
+    """
+    Parse a form file, or a form split from a multi-form file, into an
+    output record (patient data is None on failure)
+    """
+    if isinstance(item, SplitForm):
+        record = {"source": item.source}
+    else:
+        record = {"source": str(item)}
+    try:
+        form_text = item.text if isinstance(item, SplitForm) else item.read_text(encoding="utf-8")
+        patient_data = MedicalFormParser.extract_patient_data(form_text)
+    except Exception as e:
+        record["error"] = str(e)
+        return record, None
+    record["patient_data"] = patient_data.to_dict()
+    return record, patient_data
+
+
+def analysis_outcome(record: Dict) -> Optional[str]:
+    """
+    How a record's analysis was produced: "fallback" (rule findings
+    standing in for a failed model call), "local" (triaged by the rules),
+    "model", or None when it has no analysis
+    """
+    analysis = record.get("ai_analysis")
+    if analysis is None:
+        return None
+    if "fallback" in analysis:
+        return "fallback"
+    if (analysis.get("triage") or {}).get("route") == "local":
+        return "local"
+    return "model"
+
+
+def process_form(item: Union[pathlib.Path, SplitForm], clinical_ai: Optional[ClinicalAI]) -> Dict:
+    """Parse and analyze a single form into an output record"""
+    record, patient_data = parse_form(item)
+    if patient_data is not None and clinical_ai is not None:
+        try:
+            record["ai_analysis"] = clinical_ai.analyze_patient_data(patient_data)
+        except Exception as e:
+            record["error"] = str(e)
+    return record
+
+
+def run_batch(paths: Iterable[pathlib.Path], clinical_ai: Optional[ClinicalAI], sink: TextIO,
+              workers: int = 4, progress_every: int = 100, progress: TextIO = sys.stderr) -> Dict:
+    """
+    Process forms with a bounded number in flight and stream records to sink.
+
+    At most ``workers * 2`` forms are queued at a time, so memory stays flat
+    no matter how many paths are supplied. Records are written in completion
+    order. Returns a summary with counts and throughput; ``degraded``
+    counts forms whose model call failed and got rule findings only, and
+    ``model_answered`` those the model did answer.
+    """
+    max_in_flight = workers * 2
+    completed = failed = degraded = answered = 0
+    start = time.perf_counter()
+
+    def drain(pending, return_when):
+        nonlocal completed, failed, degraded, answered
+        done, pending = wait(pending, return_when=return_when)
+        for future in done:
+            record = future.result()
+            sink.write(json.dumps(record) + "\n")
+            completed += 1
+            if "error" in record:
+                failed += 1
+            outcome = analysis_outcome(record)
+            degraded += outcome == "fallback"
+            answered += outcome == "model"
+            if progress_every and completed % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                progress.write(f"[batch] {completed} forms processed ({completed / elapsed:.1f} forms/sec)\n")
+        return pending
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for path in paths:
+            pending.add(executor.submit(process_form, path, clinical_ai))
+            if len(pending) >= max_in_flight:
+                pending = drain(pending, FIRST_COMPLETED)
+        while pending:
+            pending = drain(pending, FIRST_COMPLETED)
+
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    return {
+        "forms": completed,
+        "failed": failed,
+        "degraded": degraded,
+        "model_answered": answered,
+        "elapsed_seconds": round(elapsed, 3),
+        "forms_per_second": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def run_parse_only(paths: Iterable[Union[pathlib.Path, SplitForm]], sink: TextIO, processes: int = 1,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, progress_every: int = 100,
+                   progress: TextIO = sys.stderr, split: bool = False) -> Dict:
+    """
+    Extract patient data only, parsing chunks of forms across ``processes`` processes.
+
+    With ``split``, paths are forms split from multi-form files rather than
+    form files. Records are written in input order. Returns the same
+    summary as run_batch.
+    """
+    completed = failed = 0
+    start = time.perf_counter()
+    with ParallelParser(workers=processes, chunk_size=chunk_size) as parser:
+        if split:
+            results = parser.parse_sources((form.source, form.text) for form in paths)
+        else:
+            results = parser.parse_files(paths)
+        for source, patient_data, error in results:
+            record = {"source": source}
+            if error is None:
+                record["patient_data"] = patient_data.to_dict()
+            else:
+                record["error"] = error
+                failed += 1
+            sink.write(json.dumps(record) + "\n")
+            completed += 1
+            if progress_every and completed % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                progress.write(f"[batch] {completed} forms processed ({completed / elapsed:.1f} forms/sec)\n")
+
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    return {
+        "forms": completed,
+        "failed": failed,
+        "elapsed_seconds": round(elapsed, 3),
+        "forms_per_second": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def run_batched(paths: Iterable[pathlib.Path], engine, sink: TextIO, batch_size: int = DEFAULT_BATCH_SIZE,
+                progress_every: int = 100, progress: TextIO = sys.stderr) -> Dict:
+    """
+    Backfill mode: analyze forms several to a request through an AsyncClinicalEngine.
+
+    Forms are read a window at a time (enough to fill every concurrent
+    request), screened by the local rules like ClinicalAI does, and the
+    rest packed ``batch_size`` patients per prompt. Records are written in
+    input order. Returns the same summary as run_batch plus request stats.
+    """
+    import asyncio  # only backfill mode needs an event loop; keeps CLI startup light
+
+    rules = RuleEngine()
+    window = batch_size * engine.max_concurrency
+    totals = {"forms": 0, "failed": 0, "model_patients": 0, "batched": 0, "tokens": 0}
+    start = time.perf_counter()
+
+    async def analyze_window(window_paths):
+        records, queued = [], []
+        for path in window_paths:
+            record, patient_data = parse_form(path)
+            records.append(record)
+            if patient_data is None:
+                continue
+            screen = rules.screen(patient_data)
+            if screen.needs_llm:
+                queued.append((record, patient_data, screen))
+            else:
+                record["ai_analysis"] = attach_triage(screen.analysis, screen)
+
+        results = await engine.analyze_many([patient_data for _, patient_data, _ in queued], batch_size)
+        for (record, _, screen), result in zip(queued, results):
+            if result.ok:
+                record["ai_analysis"] = attach_triage(result.analysis, screen, result.analysis.get("usage"))
+                totals["batched"] += result.batch_size > 1
+                totals["tokens"] += result.prompt_tokens + result.completion_tokens
+            else:
+                record["error"] = result.error
+        totals["model_patients"] += len(queued)
+
+        for record in records:
+            sink.write(json.dumps(record) + "\n")
+            totals["forms"] += 1
+            totals["failed"] += "error" in record
+            if progress_every and totals["forms"] % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                progress.write(f"[batch] {totals['forms']} forms processed ({totals['forms'] / elapsed:.1f} forms/sec)\n")
+
+    async def run():
+        path_iter = iter(paths)
+        while True:
+            window_paths = list(itertools.islice(path_iter, window))
+            if not window_paths:
+                break
+            await analyze_window(window_paths)
+
+    asyncio.run(run())
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    return {
+        "forms": totals["forms"],
+        "failed": totals["failed"],
+        "elapsed_seconds": round(elapsed, 3),
+        "forms_per_second": round(totals["forms"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "model_patients": totals["model_patients"],
+        "batched_patients": totals["batched"],
+        "tokens_per_patient": round(totals["tokens"] / totals["model_patients"], 1) if totals["model_patients"] else 0.0,
+    }
+
+
+def load_api_key() -> str:
+    """OpenAI API key from the environment or .env"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise SystemExit("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
+    return api_key
+
+
+def create_openai_client():
+    """Initialize OpenAI client with API key from environment or .env"""
+    import openai
+
+    return openai.OpenAI(api_key=load_api_key())
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m healthform.batch",
+        description="Validate medical intake forms in bulk without the Streamlit UI.",
+    )
+    parser.add_argument("sources", nargs="+", help="Form files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file ('-' for stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Forms processed concurrently")
+    parser.add_argument("--pattern", default="*.txt", help="File pattern used when a source is a directory")
+    parser.add_argument("--split", action="store_true",
+                        help="Files hold many forms each (clinic exports): stream them and split on form boundaries")
+    parser.add_argument("--parse-only", action="store_true", help="Extract patient data without AI analysis")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Parser processes for --parse-only (parsing is CPU-bound; use up to one per core)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help=f"Patients per model request (backfill mode; {DEFAULT_BATCH_SIZE} is a good start)")
+    parser.add_argument("--cache", metavar="PATH", help="Reuse and store analyses in this SQLite cache file")
+    parser.add_argument("--reuse-similar", action="store_true",
+                        help="Reuse the analysis of a near-identical earlier form of the same patient (follow-up visits)")
+    parser.add_argument("--single-model", metavar="MODEL",
+                        help="Send every model call to this model instead of routing fast/escalated tiers")
+    parser.add_argument("--progress-every", type=int, default=100, help="Report progress every N forms (0 to disable)")
+    parser.add_argument("--telemetry", choices=instrumentation.MODES,
+                        help="Stage timing mode (default: HEALTHFORM_TELEMETRY or 'metrics'); 'log' emits structured events")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    if args.workers < 1:
+        raise SystemExit("--workers must be at least 1")
+    if args.telemetry:
+        instrumentation.configure(args.telemetry)
+    if instrumentation.telemetry.mode == instrumentation.MODE_LOG:
+        handler = logging.StreamHandler(sys.stderr)
+        instrumentation.event_logger.addHandler(handler)
+        instrumentation.event_logger.setLevel(logging.INFO)
+
+    if args.processes < 1:
+        raise SystemExit("--processes must be at least 1")
+    if args.batch_size < 1:
+        raise SystemExit("--batch-size must be at least 1")
+    if args.batch_size > max_batch_size():
+        raise SystemExit(f"--batch-size can be at most {max_batch_size()} (model output limit)")
+
+    clinical_ai = cache = engine = near_duplicates = None
+    if not args.parse_only:
+        cache = AnalysisCache(args.cache) if args.cache else None
+        if args.batch_size > 1:
+            from .async_engine import AsyncClinicalEngine, create_async_openai_client
+            engine = AsyncClinicalEngine(create_async_openai_client(api_key=load_api_key()),
+                                         max_concurrency=args.workers, cache=cache)
+        else:
+            near_duplicates = NearDuplicateIndex() if args.reuse_similar else None
+            router = TierRouter.single(args.single_model) if args.single_model else None
+            clinical_ai = ClinicalAI(create_openai_client(), cache=cache, near_duplicates=near_duplicates,
+                                     router=router)
+    paths = iter_form_paths(args.sources, args.pattern)
+    if args.split:
+        paths = iter_form_files(paths)
+
+    def run(sink):
+        if args.parse_only:
+            return run_parse_only(paths, sink, args.processes, progress_every=args.progress_every, split=args.split)
+        if engine is not None:
+            return run_batched(paths, engine, sink, args.batch_size, args.progress_every)
+        return run_batch(paths, clinical_ai, sink, args.workers, args.progress_every)
+
+    if args.output == "-":
+        summary = run(sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8") as sink:
+            summary = run(sink)
+
+    degraded = summary.get("degraded", 0)
+    sys.stderr.write(
+        f"[batch] done: {summary['forms']} forms, {summary['failed']} failed, "
+        + (f"{degraded} degraded to rule findings (model call failed), " if degraded else "")
+        + f"{summary['elapsed_seconds']}s, {summary['forms_per_second']} forms/sec\n"
+    )
+    if engine is not None:
+        sys.stderr.write(f"[batch] model patients: {summary['model_patients']}, batched: {summary['batched_patients']}, "
+                         f"{summary['tokens_per_patient']} tokens/patient\n")
+    if cache is not None:
+        sys.stderr.write(f"[batch] analysis cache: {cache.stats()}\n")
+    if near_duplicates is not None:
+        sys.stderr.write(f"[batch] near-duplicate reuse: {near_duplicates.stats()}\n")
+    if clinical_ai is not None:
+        sys.stderr.write(format_routing_summary(clinical_ai.router.stats.summary()) + "\n")
+    if instrumentation.telemetry.enabled:
+        sys.stderr.write(instrumentation.format_summary() + "\n")
+    # Every model call falling back means the run never reached the model (bad key, outage)
+    all_degraded = degraded and not summary.get("model_answered")
+    return 1 if summary["failed"] or all_degraded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
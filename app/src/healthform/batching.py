@@ -0,0 +1,105 @@
+# app/src/healthform/batching.py
+"""
+Multi-patient prompts for batch backfills.
+
+Several patients share one request: the static batch system prompt is
+paid once and one round trip covers the whole group. Each patient gets a
+short ID (P1, P2, ...) and the model answers with one analysis object per
+ID. Parts are split out independently, so a reply that is cut off or
+malformed for one patient still yields the others; callers retry only
+the IDs that come back as None.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .models import PatientData
+from .clinical_ai import ANALYSIS_INSTRUCTIONS, CATEGORY_LABELS, ITEM_FORMAT, MAX_TOKENS, build_clinical_prompt
+from .decoding import AnalysisDecoder, iter_objects, loads_lenient, object_end
+
+DEFAULT_BATCH_SIZE = 5
+# Completion allowance per patient in a batch, and the model's output ceiling for the whole reply
+COMPLETION_TOKENS_PER_PATIENT = 600
+MAX_BATCH_COMPLETION_TOKENS = 4096
+
+BATCH_SYSTEM_PROMPT = (
+    ANALYSIS_INSTRUCTIONS
+    + "Several patients follow, each under a '### Patient <ID>' heading. Reply with only a JSON object "
+    'of the form {"patients": {"<ID>": {...}}} holding one object per patient ID with these four keys. '
+    + ITEM_FORMAT
+)
+
+_PATIENT_HEADING = "### Patient "
+_decoder = AnalysisDecoder(CATEGORY_LABELS)
+
+
+def patient_id(position: int) -> str:
+    """Short per-request ID for the patient at a position in its batch"""
+    return f"P{position + 1}"
+
+
+def build_batch_prompt(patients: Sequence[PatientData]) -> Tuple[str, List[str]]:
+    """User message holding every patient's compact prompt under its ID; returns (prompt, ids)"""
+    ids = [patient_id(i) for i in range(len(patients))]
+    sections = [f"{_PATIENT_HEADING}{pid}\n{build_clinical_prompt(data)}" for pid, data in zip(ids, patients)]
+    return "\n\n".join(sections), ids
+
+
+def build_batch_messages(prompt: str) -> List[Dict[str, str]]:
+    return [{"role": "system", "content": BATCH_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
+
+def batch_completion_limit(size: int) -> int:
+    """max_tokens for a batch of ``size`` patients"""
+    return min(MAX_BATCH_COMPLETION_TOKENS, max(MAX_TOKENS, COMPLETION_TOKENS_PER_PATIENT * size))
+
+
+def max_batch_size() -> int:
+    """Largest batch whose per-patient allowance fits in the output ceiling"""
+    return max(1, MAX_BATCH_COMPLETION_TOKENS // COMPLETION_TOKENS_PER_PATIENT)
+
+
+def _valid_part(part) -> Optional[Dict]:
+    if not isinstance(part, dict) or not any(_decoder.category_for(key) for key in part):
+        return None
+    return _decoder.clean(_decoder.normalize(part))[0]
+
+
+def split_batch_response(content: str, ids: Sequence[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Analysis per patient ID, or None for IDs whose part is missing or unparseable.
+
+    A well-formed (or repairable) reply is read in one pass. Otherwise each
+    ID's object is located and decoded on its own, which recovers every
+    complete part of a truncated or partly malformed reply.
+    """
+    parts: Dict[str, Optional[Dict]] = {pid: None for pid in ids}
+    whole = None
+    for start, end in iter_objects(content):
+        if end >= 0:
+            try:
+                whole, _ = loads_lenient(content[start:end])
+            except ValueError:
+                whole = None
+        break
+    if isinstance(whole, dict):
+        patients = whole.get("patients", whole)
+        if isinstance(patients, list):
+            patients = {str(p.get("id")): p for p in patients if isinstance(p, dict)}
+        if isinstance(patients, dict):
+            for pid in ids:
+                parts[pid] = _valid_part(patients.get(pid))
+            return parts
+
+    for pid in ids:
+        match = re.search(r'"' + re.escape(pid) + r'"\s*:\s*\{', content)
+        if not match:
+            continue
+        object_start = match.end() - 1
+        end = object_end(content, object_start)
+        if end < 0:
+            continue
+        try:
+            parts[pid] = _valid_part(loads_lenient(content[object_start:end])[0])
+        except ValueError:
+            continue
+    return parts
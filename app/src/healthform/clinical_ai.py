@@ -0,0 +1,477 @@
+# app/src/healthform/clinical_ai.py
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from .models import PatientData
+from .analysis_cache import AnalysisCache, analysis_cache_key
+from .decoding import CATEGORY_LABELS, AnalysisDecoder
+from .near_duplicates import NearDuplicateIndex
+from .routing import TIER_RULES, ModelTier, TierRouter, routing_record
+from .rules import ROUTE_FOCUSED, PreScreenResult, RuleEngine, merge_analyses
+from .tokens import count_tokens, truncate_to_tokens
+from .instrumentation import event, observe, record_tokens, span
+from .streaming import DONE, ITEM, IncrementalAnalysisParser, StreamEvent, delta_content, iter_analysis_items
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-3.5-turbo"  # Using gpt-3.5-turbo for better compatibility
+TEMPERATURE = 0.1
+MAX_TOKENS = 1200  # completion ceiling for a full four-category analysis
+
+# Token budget for the per-patient part of the prompt; long free text is truncated to fit
+PROMPT_TOKEN_BUDGET = 700
+# Free-text fields that may be shortened, most expendable first, and the least each keeps
+TRUNCATABLE_FIELDS = ("medical_history", "chief_complaint", "allergies")
+MIN_FIELD_TOKENS = 40
+# Completion allowance: fixed overhead plus a share per requested category
+COMPLETION_BASE_TOKENS = 100
+COMPLETION_TOKENS_PER_CATEGORY = 275
+
+# What the prompt asks for in each analysis category
+CATEGORY_REQUESTS = {
+    "critical_alerts": "Immediate safety concerns or critical alerts",
+    "drug_interactions": "Drug-drug interactions or contraindications",
+    "missing_info": "Missing critical information for safe care",
+    "recommendations": "Clinical recommendations and next steps",
+}
+
+# Static instructions, identical for every request so provider prefix caching can reuse them.
+# Everything patient-specific (including a narrowed focus) goes in the user message after it.
+ANALYSIS_INSTRUCTIONS = (
+    "You are a clinical decision support AI. Analyze the patient data for:\n"
+    + "".join(f"{i}. {key}: {CATEGORY_REQUESTS[key]}\n" for i, key in enumerate(CATEGORY_REQUESTS, 1))
+    + "Focus on patient safety, medication interactions, and clinical decision support.\n"
+)
+ITEM_FORMAT = 'Each is an array of objects with "severity" ("high", "medium" or "low") and "message" fields.'
+SYSTEM_PROMPT = ANALYSIS_INSTRUCTIONS + "Reply with only a JSON object with these four keys. " + ITEM_FORMAT
+
+_decoder = AnalysisDecoder(CATEGORY_LABELS)
+
+
+def _clean_streamed(analysis: Dict) -> Dict:
+    """Items a stream parsed before it broke off, coerced and checked like a decoded reply"""
+    return _decoder.clean(_decoder.normalize(analysis))[0]
+
+
+def _focused_request(focus: List[str]) -> str:
+    """Analysis request limited to the categories the rule pre-screen could not settle"""
+    return f"Only analyze: {', '.join(focus)}. Return empty arrays for the other keys."
+
+
+def _prompt_fields(data: PatientData) -> Dict[str, str]:
+    return {
+        "medical_history": data.medical_history or "Not provided",
+        "chief_complaint": data.chief_complaint or "Not provided",
+        "allergies": data.allergies or "None known",
+    }
+
+
+def _render_prompt(data: PatientData, fields: Dict[str, str], focus: Optional[List[str]]) -> str:
+    vitals = "; ".join(f"{key}={value}" for key, value in (data.vital_signs or {}).items() if value)
+    lines = [
+        f"Name: {data.name}",
+        f"Age: {data.age}",
+        f"Gender: {data.gender}",
+        f"Weight: {data.weight}",
+        f"Chief complaint: {fields['chief_complaint']}",
+        f"Medications: {'; '.join(data.medications) if data.medications else 'None listed'}",
+        f"Allergies: {fields['allergies']}",
+        f"Vitals: {vitals or 'Not provided'}",
+        f"History: {fields['medical_history']}",
+    ]
+    if focus:
+        lines.append(_focused_request(focus))
+    return "\n".join(lines)
+
+
+def build_clinical_prompt(data: PatientData, focus: Optional[List[str]] = None,
+                          budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """
+    Compact per-patient prompt, optionally limited to some categories.
+
+    If the prompt exceeds ``budget`` tokens, free-text fields are truncated
+    (most expendable first, never below MIN_FIELD_TOKENS each). Medications
+    and vitals are never cut, so a very long medication list can still
+    exceed the budget.
+    """
+    fields = _prompt_fields(data)
+    prompt = _render_prompt(data, fields, focus)
+    excess = count_tokens(prompt, MODEL) - budget
+    if excess <= 0:
+        return prompt
+    for name in TRUNCATABLE_FIELDS:
+        if excess <= 0:
+            break
+        tokens = count_tokens(fields[name], MODEL)
+        keep = max(MIN_FIELD_TOKENS, tokens - excess)
+        if keep < tokens:
+            fields[name] = truncate_to_tokens(fields[name], keep, MODEL)
+            excess -= tokens - count_tokens(fields[name], MODEL)
+            logger.debug("Truncated %s from %d to %d tokens to fit the prompt budget", name, tokens, keep)
+    return _render_prompt(data, fields, focus)
+
+
+def build_messages(prompt: str) -> List[Dict[str, str]]:
+    """Chat messages for a patient prompt: the shared static system prompt first"""
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
+
+def completion_token_limit(focus: Optional[List[str]] = None, ceiling: int = MAX_TOKENS) -> int:
+    """max_tokens for a request: smaller when only some categories are asked for"""
+    categories = len(focus) if focus else len(CATEGORY_LABELS)
+    return min(ceiling, COMPLETION_BASE_TOKENS + COMPLETION_TOKENS_PER_CATEGORY * categories)
+
+
+def response_usage(response, prompt_messages: List[Dict[str, str]], completion: str) -> Dict:
+    """Prompt and completion token counts, from the API response when it reports them"""
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if isinstance(usage, dict):
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    else:
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is not None and completion_tokens is not None:
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "source": "api"}
+    return {
+        "prompt_tokens": sum(count_tokens(m["content"], MODEL) for m in prompt_messages),
+        "completion_tokens": count_tokens(completion, MODEL),
+        "source": "local",
+    }
+
+
+def parse_text_response(text: str) -> Dict:
+    """Parse non-JSON AI response into structured format"""
+    return _decoder.text_analysis(text)
+
+
+def parse_ai_response(ai_content: str) -> Dict:
+    """Decode the analysis JSON in model output (see AnalysisDecoder), falling back to a text alert"""
+    return _decoder.decode(ai_content)
+
+
+def attach_triage(analysis: Dict, screen, usage: Optional[Dict] = None) -> Dict:
+    """Merge rule findings into a model analysis, recording routing and token usage"""
+    if screen is not None:
+        if analysis is not screen.analysis:
+            analysis = merge_analyses(analysis, screen.analysis)
+        analysis["triage"] = {"route": screen.route, "reasons": screen.reasons}
+    if usage is not None:
+        analysis["usage"] = usage
+    return analysis
+
+
+@dataclass
+class _Plan:
+    """What _prepare decided for one form: the model tier and prompt, or an analysis that is already done"""
+    screen: Optional[PreScreenResult]
+    prompt: Optional[str] = None
+    focus: Optional[List[str]] = None
+    tier: Optional[ModelTier] = None
+    reasons: List[str] = field(default_factory=list)
+    cache_key: Optional[str] = None
+    ready: Optional[Dict] = None
+
+
+class ClinicalAI:
+    """AI-powered clinical decision support"""
+
+    def __init__(self, client, cache: Optional[AnalysisCache] = None, prescreen: bool = True,
+                 near_duplicates: Optional[NearDuplicateIndex] = None, router: Optional[TierRouter] = None):
+        self.client = client
+        self.cache = cache
+        self.near_duplicates = near_duplicates
+        self.prescreen = prescreen
+        self.rules = RuleEngine()
+        self.router = router or TierRouter()
+
+    def _prepare(self, patient_data: PatientData) -> _Plan:
+        """Rule screen, tier choice, prompt and cache lookup shared by the blocking and streaming paths"""
+        logger.debug("Analyzing patient data: name=%s age=%s medications=%s vital_signs=%s",
+                     patient_data.name, patient_data.age, patient_data.medications, patient_data.vital_signs)
+
+        # Deterministic rules first: routine forms never reach the model
+        screen = None
+        if self.prescreen:
+            with span("rules"):
+                screen = self.rules.screen(patient_data)
+        if screen is not None and not screen.needs_llm:
+            logger.debug("Triaged locally: %s", screen.reasons)
+            event("triaged_locally")
+            self.router.stats.record_form(TIER_RULES)
+            return _Plan(screen, ready=attach_triage(screen.analysis, screen))
+
+        # Construct clinical analysis prompt for the cheapest tier the screen allows
+        focus = screen.focus if screen is not None and screen.route == ROUTE_FOCUSED else None
+        tier, reasons = self.router.initial(screen)
+        with span("prompt"):
+            prompt = build_clinical_prompt(patient_data, focus)
+        plan = _Plan(screen, prompt, focus, tier, reasons)
+        logger.debug("Prompt being sent to AI (%s tier): %s", tier.name, prompt)
+
+        # Identical inputs were already analyzed - skip the API call
+        if self.cache is not None:
+            plan.cache_key = analysis_cache_key(patient_data, prompt, tier.model, TEMPERATURE,
+                                                completion_token_limit(focus, tier.max_tokens))
+            cached = self.cache.get(plan.cache_key)
+            if cached is not None:
+                logger.debug("Analysis cache hit: %s", plan.cache_key)
+                event("cache_hit")
+                plan.ready = cached
+                return plan
+            event("cache_miss")
+
+        # A recent analysis of a near-identical form (needs the rule screen to compare outcomes)
+        if self.near_duplicates is not None and screen is not None:
+            match = self.near_duplicates.find(patient_data, screen)
+            if match is not None:
+                logger.debug("Reusing analysis %s (similarity %.2f, changed: %s)",
+                             match.source, match.similarity, match.changed)
+                event("near_duplicate_hit")
+                analysis = attach_triage(match.analysis, screen)
+                analysis["reused"] = {"source": match.source, "similarity": match.similarity,
+                                      "changed": match.changed}
+                plan.ready = analysis
+                return plan
+            event("near_duplicate_miss")
+        return plan
+
+    def _remember(self, patient_data: PatientData, screen, model_analysis: Dict):
+        """Index fresh model findings for near-duplicate reuse"""
+        if self.near_duplicates is not None and screen is not None:
+            self.near_duplicates.add(patient_data, screen, model_analysis)
+
+    def _complete(self, tier: ModelTier, messages: List[Dict[str, str]], max_tokens: int):
+        """(reply text, response) from the tier's model, or None when the client cannot do chat completions"""
+        # Check if we have the new client or old client
+        if hasattr(self.client, 'chat') and hasattr(self.client.chat, 'completions'):
+            # New OpenAI client (v1.0+)
+            create = self.client.chat.completions.create
+        elif hasattr(self.client, 'ChatCompletion'):
+            # Old OpenAI client (v0.x)
+            create = self.client.ChatCompletion.create
+        else:
+            return None
+        with span("llm", model=tier.model, tier=tier.name):
+            response = create(model=tier.model, messages=messages, max_tokens=max_tokens, temperature=TEMPERATURE)
+        return response.choices[0].message.content, response
+
+    def _ask(self, tier: ModelTier, messages: List[Dict[str, str]], focus: Optional[List[str]]):
+        """One model call on a tier: (model analysis, usage, decode issues), or None if the client cannot chat"""
+        start = time.perf_counter()
+        try:
+            reply = self._complete(tier, messages, completion_token_limit(focus, tier.max_tokens))
+        except Exception:
+            self.router.stats.record_call(tier, time.perf_counter() - start, ok=False)
+            raise
+        if reply is None:
+            return None
+        ai_content, response = reply
+        logger.debug("AI raw response (%s): %s", tier.model, ai_content)
+        usage = response_usage(response, messages, ai_content)
+        self.router.stats.record_call(tier, time.perf_counter() - start, usage)
+        record_tokens(usage)
+        with span("decode"):
+            model_analysis, issues = _decoder.decode_checked(ai_content)
+        return model_analysis, usage, issues
+
+    def analyze_patient_data(self, patient_data: PatientData) -> Dict:
+        """Analyze patient data and provide clinical insights"""
+        plan = self._prepare(patient_data)
+        if plan.ready is not None:
+            return plan.ready
+        messages = build_messages(plan.prompt)
+        cache_key = plan.cache_key
+
+        try:
+            reply = self._ask(plan.tier, messages, plan.focus)
+            if reply is None:
+                # Fallback - create mock analysis for demo
+                event("mock_fallback", reason="unsupported client")
+                return self._fallback_analysis(patient_data, "unsupported client")
+            model_analysis, usage, issues = reply
+            tier, reasons = plan.tier, plan.reasons
+            cost = tier.cost(usage)
+            escalation = "screen" if reasons else None
+
+            # An ambiguous fast reply goes on to the larger model, which answers instead
+            review = self.router.review(tier, plan.screen, model_analysis, issues)
+            if review:
+                try:
+                    reply = self._ask(self.router.escalated, messages, plan.focus)
+                except Exception as e:
+                    logger.debug("Escalation failed, keeping the %s tier analysis: %s", tier.name, e)
+                    reply = None
+                if reply is None:
+                    # Kept for this request only: the next identical form gets another try at escalating
+                    escalation, reasons, cache_key = "failed", review, None
+                else:
+                    model_analysis, usage, issues = reply
+                    tier, reasons, escalation = self.router.escalated, review, "reply"
+                    cost += tier.cost(usage)
+
+            analysis = attach_triage(model_analysis, plan.screen, usage)
+            analysis["routing"] = routing_record(tier, reasons, cost,
+                                                 self.router.fast.name if escalation == "reply" else None)
+            self.router.stats.record_form(tier.name, escalation, reasons)
+            self._remember(patient_data, plan.screen, model_analysis)
+
+        except Exception as e:
+            # Create mock analysis if API fails
+            logger.debug("Analysis failed, using rule-based analysis: %s", e)
+            event("mock_fallback", reason=type(e).__name__)
+            return self._fallback_analysis(patient_data, f"{type(e).__name__}: {e}")
+
+        # Only real model output is cached, never the mock fallback
+        if cache_key is not None:
+            self.cache.put(cache_key, analysis)
+        return analysis
+
+    def _create_stream(self, tier: ModelTier, messages: List[Dict[str, str]], max_tokens: int):
+        """Chat completion chunk iterator, or None when the client cannot stream"""
+        if hasattr(self.client, 'chat') and hasattr(self.client.chat, 'completions'):
+            # The final chunk then carries the request's token usage
+            return self.client.chat.completions.create(
+                model=tier.model, messages=messages, max_tokens=max_tokens, temperature=TEMPERATURE, stream=True,
+                stream_options={"include_usage": True}
+            )
+        if hasattr(self.client, 'ChatCompletion'):
+            return self.client.ChatCompletion.create(
+                model=tier.model, messages=messages, max_tokens=max_tokens, temperature=TEMPERATURE, stream=True
+            )
+        return None
+
+    def _stream_reply(self, tier: ModelTier, messages: List[Dict[str, str]], focus: Optional[List[str]],
+                      parser: IncrementalAnalysisParser, unseen):
+        """
+        Stream one model call on a tier, yielding each new item as its JSON
+        object closes; returns (model analysis, usage, decode issues).
+        """
+        # Timed by hand: a span would also count the time the consumer spends on each yielded item
+        start = time.perf_counter()
+        waiting = 0.0
+        try:
+            chunks = self._create_stream(tier, messages, completion_token_limit(focus, tier.max_tokens))
+            if chunks is None:
+                raise RuntimeError("Client does not support chat completions")
+            parts = []
+            chunk = None
+            first_item = None
+            for chunk in chunks:
+                text = delta_content(chunk)
+                if text:
+                    parts.append(text)
+                    for item_event in unseen(parser.feed(text)):
+                        if first_item is None:
+                            first_item = time.perf_counter() - start
+                            observe("llm_first_item", first_item, model=tier.model, tier=tier.name)
+                        paused = time.perf_counter()
+                        yield item_event
+                        waiting += time.perf_counter() - paused
+        except Exception:
+            self.router.stats.record_call(tier, time.perf_counter() - start - waiting, ok=False)
+            raise
+        elapsed = time.perf_counter() - start - waiting
+        observe("llm", elapsed, model=tier.model, tier=tier.name, stream=True)
+        ai_content = "".join(parts)
+        logger.debug("AI raw response (%s): %s", tier.model, ai_content)
+        usage = response_usage(chunk, messages, ai_content)
+        self.router.stats.record_call(tier, elapsed, usage)
+        record_tokens(usage)
+        with span("decode"):
+            model_analysis, issues = _decoder.decode_checked(ai_content)
+        return model_analysis, usage, issues
+
+    def stream_patient_data(self, patient_data: PatientData) -> Iterator[StreamEvent]:
+        """
+        Analyze patient data, yielding each finding as soon as it is known.
+
+        Rule findings come first (they need no model call), then every model
+        item the moment its JSON object is complete, then a final DONE event
+        carrying the same analysis analyze_patient_data would have returned.
+        Items are never repeated, and nothing already yielded is dropped from
+        the final analysis even when the stream fails part way through. When
+        an ambiguous fast reply is escalated, the larger model's items follow
+        the fast items already shown, and both stay in the final analysis.
+        """
+        shown = set()
+
+        def unseen(items):
+            for category, item in items:
+                marker = (category, str(item.get("message", "")).lower())
+                if marker not in shown:
+                    shown.add(marker)
+                    yield StreamEvent(ITEM, category, item)
+
+        plan = self._prepare(patient_data)
+        if plan.screen is not None:
+            yield from unseen(iter_analysis_items(plan.screen.analysis, CATEGORY_LABELS))
+        if plan.ready is not None:
+            yield from unseen(iter_analysis_items(plan.ready, CATEGORY_LABELS))
+            yield StreamEvent(DONE, analysis=plan.ready)
+            return
+
+        parser = IncrementalAnalysisParser(CATEGORY_LABELS)
+        cache_key = plan.cache_key
+        try:
+            messages = build_messages(plan.prompt)
+            model_analysis, usage, issues = yield from self._stream_reply(plan.tier, messages, plan.focus,
+                                                                          parser, unseen)
+            tier, reasons = plan.tier, plan.reasons
+            cost = tier.cost(usage)
+            escalation = "screen" if reasons else None
+
+            review = self.router.review(tier, plan.screen, model_analysis, issues)
+            if review:
+                escalated_parser = IncrementalAnalysisParser(CATEGORY_LABELS)
+                try:
+                    escalated_analysis, usage, issues = yield from self._stream_reply(
+                        self.router.escalated, messages, plan.focus, escalated_parser, unseen)
+                    tier, reasons, escalation = self.router.escalated, review, "reply"
+                    cost += tier.cost(usage)
+                    # Fast items are already on screen, so they stay
+                    model_analysis = merge_analyses(escalated_analysis, model_analysis)
+                except Exception as e:
+                    logger.debug("Escalation failed, keeping the %s tier analysis: %s", tier.name, e)
+                    model_analysis = merge_analyses(model_analysis, _clean_streamed(escalated_parser.analysis))
+                    escalation, reasons = "failed", review
+                    cache_key = None
+
+            analysis = attach_triage(model_analysis, plan.screen, usage)
+            analysis["routing"] = routing_record(tier, reasons, cost,
+                                                 self.router.fast.name if escalation == "reply" else None)
+            self.router.stats.record_form(tier.name, escalation, reasons)
+            self._remember(patient_data, plan.screen, model_analysis)
+        except Exception as e:
+            logger.debug("Streaming analysis failed, using rule-based analysis: %s", e)
+            event("mock_fallback", reason=type(e).__name__)
+            analysis = merge_analyses(_clean_streamed(parser.analysis), self._create_mock_analysis(patient_data))
+            analysis["fallback"] = f"{type(e).__name__}: {e}"
+            cache_key = None
+
+        if cache_key is not None:
+            self.cache.put(cache_key, analysis)
+        # Non-JSON responses only become items once the whole text is in
+        yield from unseen(iter_analysis_items(analysis, CATEGORY_LABELS))
+        yield StreamEvent(DONE, analysis=analysis)
+
+    def _create_mock_analysis(self, patient_data: PatientData) -> Dict:
+        """Create rule-based analysis for demo purposes when API fails"""
+        return self.rules.screen(patient_data).analysis
+
+    def _fallback_analysis(self, patient_data: PatientData, reason: str) -> Dict:
+        """Rule-based analysis standing in for the model's, tagged with why in analysis["fallback"]"""
+        analysis = self._create_mock_analysis(patient_data)
+        analysis["fallback"] = reason
+        return analysis
+    
+    def _build_clinical_prompt(self, data: PatientData) -> str:
+        """Build comprehensive clinical analysis prompt"""
+        return build_clinical_prompt(data)
+    
+    def _parse_text_response(self, text: str) -> Dict:
+        """Parse non-JSON AI response into structured format"""
+        return parse_text_response(text)
@@ -0,0 +1,278 @@
+# app/src/healthform/columnar.py
+"""
+Columnar storage for many patients at once.
+
+A list of PatientData objects costs one object, one list, one dict and a
+string per field for every patient, most of which repeat ("M", "Penicillin",
+"Metformin 500mg twice daily"). PatientTable stores each field as one
+column instead:
+
+    age, systolic, diastolic, heart_rate   int32 arrays (MISSING = -1)
+    temperature_c                          float32 array (NaN = missing)
+    name, gender, weight, ... and vitals   int32 codes into a vocabulary of
+                                           interned strings (-1 = absent)
+    medications                            flat int32 codes plus per-patient
+                                           offsets into them
+
+to_pandas() wraps the arrays with numpy.frombuffer and
+pandas.Categorical.from_codes, so numeric and code columns share memory
+with the table rather than being copied. to_bytes()/from_bytes() write the
+raw buffers behind a small JSON header of vocabularies and buffer sizes.
+
+PatientData has no age of 0 of its own: 0 is what the parser leaves when
+the form gives no age. The age column stores that as MISSING, so
+analytics never counts an unrecorded age as a newborn's.
+
+Usage:
+    from healthform.columnar import PatientTable
+    table = PatientTable.from_patients(patients)
+    frame = table.to_pandas()
+    restored = PatientTable.from_bytes(table.to_bytes())
+"""
+import sys
+import json
+import struct
+import pathlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .models import PatientData
+from .vitals import parse_vitals
+
+MAGIC = b"HFPT"
+FORMAT_VERSION = 3
+MISSING = -1
+
+TEXT_FIELDS = ("name", "gender", "weight", "chief_complaint", "allergies", "medical_history", "social_history")
+# Typed vitals stored per patient and their array typecodes
+NUMERIC_VITALS = ("systolic", "diastolic", "heart_rate", "temperature_c")
+_NUMERIC_TYPECODES = {"systolic": "i", "diastolic": "i", "heart_rate": "i", "temperature_c": "f"}
+
+_HEADER = struct.Struct("<4sBI")  # magic, version, JSON header length
+
+
+class StringColumn:
+    """Dictionary-encoded strings: int32 codes into a list of interned values"""
+    __slots__ = ("codes", "values", "_index")
+
+    def __init__(self, values: Iterable[str] = (), codes: Optional[array] = None):
+        self.values: List[str] = [sys.intern(value) for value in values]
+        self._index: Dict[str, int] = {value: code for code, value in enumerate(self.values)}
+        self.codes = codes if codes is not None else array("i")
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, position: int) -> Optional[str]:
+        code = self.codes[position]
+        return None if code < 0 else self.values[code]
+
+    def encode(self, value: Optional[str]) -> int:
+        """Code for value, adding it to the vocabulary when new; -1 for None"""
+        if value is None:
+            return MISSING
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def append(self, value: Optional[str]):
+        # Known values are the common case: one dict lookup, no method call
+        code = self._index.get(value)
+        self.codes.append(self.encode(value) if code is None else code)
+
+    def to_categorical(self):
+        """pandas Categorical over the codes buffer (not copied); absent values are NaN"""
+        import numpy as np
+        import pandas as pd
+
+        return pd.Categorical.from_codes(np.frombuffer(self.codes, dtype=np.intc), categories=self.values)
+
+
+class PatientTable:
+    """Columnar container of patients; rows come back as PatientData on indexing"""
+
+    def __init__(self):
+        self.age = array("i")
+        self.text: Dict[str, StringColumn] = {field: StringColumn() for field in TEXT_FIELDS}
+        self.vitals: Dict[str, StringColumn] = {}
+        self.numeric: Dict[str, array] = {vital: array(_NUMERIC_TYPECODES[vital]) for vital in NUMERIC_VITALS}
+        self.medications = StringColumn()
+        self.medication_offsets = array("I", [0])
+
+    @classmethod
+    def from_patients(cls, patients: Iterable[PatientData]) -> "PatientTable":
+        table = cls()
+        table.extend(patients)
+        return table
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "PatientTable":
+        """Table of the patient_data of saved-analysis records"""
+        return cls.from_patients(PatientData.from_dict(record.get("patient_data") or {}) for record in records)
+
+    def __len__(self) -> int:
+        return len(self.age)
+
+    def append(self, patient: PatientData):
+        row = len(self.age)
+        self.age.append(int(patient.age) if patient.age else MISSING)
+        for field, column in self.text.items():
+            column.append(getattr(patient, field) or "")
+
+        vital_signs = patient.vital_signs or {}
+        for key in vital_signs:
+            if key not in self.vitals:
+                # A vital first seen now is absent for every earlier row
+                self.vitals[key] = StringColumn(codes=array("i", [MISSING]) * row)
+        for key, column in self.vitals.items():
+            column.append(vital_signs.get(key))
+        typed = parse_vitals(vital_signs)
+        for vital, column in self.numeric.items():
+            value = getattr(typed, vital)
+            column.append(_missing(column) if value is None else value)
+
+        codes = self.medications.codes
+        for medication in patient.medications or []:
+            codes.append(self.medications.encode(medication))
+        self.medication_offsets.append(len(codes))
+
+    def extend(self, patients: Iterable[PatientData]):
+        for patient in patients:
+            self.append(patient)
+
+    def __getitem__(self, row: int) -> PatientData:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("PatientTable index out of range")
+        fields = {field: column[row] for field, column in self.text.items()}
+        start, end = self.medication_offsets[row], self.medication_offsets[row + 1]
+        values = self.medications.values
+        return PatientData(
+            age=max(self.age[row], 0),
+            medications=[values[code] for code in self.medications.codes[start:end]],
+            vital_signs={key: column[row] for key, column in self.vitals.items() if column.codes[row] >= 0},
+            **fields,
+        )
+
+    def __iter__(self) -> Iterator[PatientData]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def _buffers(self) -> Dict[str, array]:
+        """Every array in the table under a stable name"""
+        buffers = {"age": self.age}
+        buffers.update((f"text.{field}", column.codes) for field, column in self.text.items())
+        buffers.update((f"vital.{key}", column.codes) for key, column in self.vitals.items())
+        buffers.update((f"numeric.{vital}", values) for vital, values in self.numeric.items())
+        buffers["medications"] = self.medications.codes
+        buffers["medication_offsets"] = self.medication_offsets
+        return buffers
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays (vocabulary strings not included)"""
+        return sum(values.itemsize * len(values) for values in self._buffers().values())
+
+    def to_pandas(self):
+        """
+        One row per patient; numeric and code columns are views of the table's arrays.
+
+        Text columns and the vitals as written (``<vital>_raw``) are
+        categoricals with NaN for absent values; age and the parsed
+        systolic, diastolic and heart_rate columns keep MISSING (-1) and
+        temperature_c is NaN when unreadable. While the frame is alive the
+        table cannot grow: array.append raises BufferError on a shared
+        buffer.
+        """
+        import numpy as np
+        import pandas as pd
+
+        columns = {"age": np.frombuffer(self.age, dtype=np.intc)}
+        for field, column in self.text.items():
+            columns[field] = column.to_categorical()
+        for key, column in self.vitals.items():
+            columns[f"{key}_raw"] = column.to_categorical()
+        for vital, values in self.numeric.items():
+            columns[vital] = np.frombuffer(values, dtype=values.typecode)
+        columns["medication_count"] = np.diff(np.frombuffer(self.medication_offsets, dtype=np.uintc))
+        return pd.DataFrame(columns, copy=False)
+
+    def vital_values(self, vital: str):
+        """float64 numpy copy of a typed vital column with NaN wherever it is missing"""
+        import numpy as np
+
+        values = np.frombuffer(self.numeric[vital], dtype=self.numeric[vital].typecode).astype(np.float64)
+        values[values == MISSING] = np.nan
+        return values
+
+    def medications_frame(self):
+        """Long format: one (patient, medication) row per medication entry"""
+        import numpy as np
+        import pandas as pd
+
+        offsets = np.frombuffer(self.medication_offsets, dtype=np.uintc)
+        patient = np.repeat(np.arange(len(self)), np.diff(offsets))
+        return pd.DataFrame({"patient": patient, "medication": self.medications.to_categorical()}, copy=False)
+
+    def to_bytes(self) -> bytes:
+        buffers = self._buffers()
+        header = {
+            "rows": len(self),
+            "byteorder": sys.byteorder,
+            "vocabularies": {
+                **{f"text.{field}": column.values for field, column in self.text.items()},
+                **{f"vital.{key}": column.values for key, column in self.vitals.items()},
+                "medications": self.medications.values,
+            },
+            "buffers": [[name, values.typecode, values.itemsize * len(values)] for name, values in buffers.items()],
+        }
+        encoded = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return b"".join([_HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)), encoded,
+                         *(values.tobytes() for values in buffers.values())])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PatientTable":
+        magic, version, header_length = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a PatientTable buffer (bad magic or unsupported version)")
+        offset = _HEADER.size
+        header = json.loads(bytes(data[offset:offset + header_length]))
+        offset += header_length
+
+        view = memoryview(data)
+        buffers = {}
+        for name, typecode, size in header["buffers"]:
+            values = array(typecode)
+            values.frombytes(view[offset:offset + size])
+            if header["byteorder"] != sys.byteorder:
+                values.byteswap()
+            buffers[name] = values
+            offset += size
+
+        vocabularies = header["vocabularies"]
+        table = cls()
+        table.age = buffers["age"]
+        table.text = {field: StringColumn(vocabularies[f"text.{field}"], buffers[f"text.{field}"])
+                      for field in TEXT_FIELDS}
+        table.vitals = {name[len("vital."):]: StringColumn(vocabularies[name], values)
+                        for name, values in buffers.items() if name.startswith("vital.")}
+        table.numeric = {vital: buffers[f"numeric.{vital}"] for vital in NUMERIC_VITALS}
+        table.medications = StringColumn(vocabularies["medications"], buffers["medications"])
+        table.medication_offsets = buffers["medication_offsets"]
+        if len(table.age) != header["rows"]:
+            raise ValueError("Truncated PatientTable buffer")
+        return table
+
+    def save(self, path):
+        pathlib.Path(path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path) -> "PatientTable":
+        return cls.from_bytes(pathlib.Path(path).read_bytes())
+
+
+def _missing(column: array):
+    return float("nan") if column.typecode == "f" else MISSING
@@ -0,0 +1,374 @@
+# app/src/healthform/decoding.py
+"""
+Decoding of model analysis replies.
+
+Replies are meant to be one JSON object of four category arrays, but
+models wrap it in prose or ```json fences, leave trailing commas, use
+single quotes or Python literals, label categories their own way
+("CRITICAL ALERTS", "Drug Interactions") and get cut off at max_tokens.
+AnalysisDecoder handles all of these in bounded time:
+
+  1. a brace-balanced scanner finds each top-level object in one linear
+     pass over the structural characters (no backtracking regex);
+  2. json.loads, and on failure one linear repair pass (quotes, trailing
+     commas, comments, bare words, unterminated strings and brackets);
+  3. category keys are matched by their letters only, so case, spacing
+     and separators do not matter, plus a few common synonyms;
+  4. items are coerced (bare strings, severity spellings) and checked
+     against ANALYSIS_SCHEMA by a validator compiled once; items that
+     still fail are dropped instead of failing the whole reply.
+
+Only when no object with a known category is found (or an object nests
+too deeply to parse) does the reply fall back to a single text alert.
+
+Usage:
+    decoder = AnalysisDecoder(CATEGORY_LABELS)
+    analysis = decoder.decode(ai_content)
+"""
+import re
+import json
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .instrumentation import event
+from .severity import SEVERITIES, normalize_severity
+
+# Analysis categories and the section names the model uses for them
+CATEGORY_LABELS = {
+    "critical_alerts": "CRITICAL ALERTS",
+    "drug_interactions": "DRUG INTERACTIONS",
+    "missing_info": "MISSING INFORMATION",
+    "recommendations": "CLINICAL RECOMMENDATIONS",
+}
+
+# Category names models use instead of ours, by analysis key
+CATEGORY_SYNONYMS = {
+    "critical_alerts": ("alerts", "critical", "safety_alerts", "critical_findings"),
+    "drug_interactions": ("interactions", "medication_interactions", "contraindications"),
+    "missing_info": ("missing", "missing_data", "missing_fields"),
+    "recommendations": ("clinical_recommendations", "next_steps"),
+}
+
+# Keys an item's text may arrive under instead of "message"
+_MESSAGE_KEYS = ("message", "text", "description", "detail", "alert", "finding", "recommendation")
+
+ANALYSIS_ITEM_SCHEMA = {
+    "type": "object",
+    "required": ["severity", "message"],
+    "properties": {
+        "severity": {"enum": list(SEVERITIES)},
+        "message": {"type": "string", "minLength": 1},
+    },
+}
+
+# Characters that can change the scanner state; everything else is skipped in bulk
+_STRUCTURAL_RE = re.compile(r'[{}\[\]"\\]')
+_NON_LETTERS_RE = re.compile(r"[^a-z]+")
+
+# Repair tokens: strings in either quote style (possibly unterminated), comments, bare words
+_DOUBLE_QUOTED_RE = re.compile(r'"(?:[^"\\]|\\.)*("?)', re.DOTALL)
+_SINGLE_QUOTED_RE = re.compile(r"'(?:[^'\\]|\\.)*('?)", re.DOTALL)
+_LINE_COMMENT_RE = re.compile(r"//[^\n]*")
+_BLOCK_COMMENT_RE = re.compile(r"/\*.*?(?:\*/|\Z)", re.DOTALL)
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_SPACE_RE = re.compile(r"\s+")
+_BAD_ESCAPE_RE = re.compile(r'\\(?!["\\/bfnrtu])')
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def object_end(text: str, start: int) -> int:
+    """Index just past the JSON object opening at text[start], or -1 if it never closes"""
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    for match in _STRUCTURAL_RE.finditer(text, start):
+        i = match.start()
+        char = match.group(0)
+        if i == escaped_at:
+            continue
+        if in_string:
+            if char == "\\":
+                escaped_at = i + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def iter_objects(text: str) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each top-level JSON object in text; end is -1 for one that never closes"""
+    start = text.find("{")
+    while start >= 0:
+        end = object_end(text, start)
+        yield start, end
+        if end < 0:
+            return
+        start = text.find("{", end)
+
+
+def _drop_trailing_comma(out: List[str]):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _previous_token(out: List[str]) -> str:
+    # The non-space token before the last one
+    for token in reversed(out[:-1]):
+        if not token.isspace():
+            return token
+    return ""
+
+
+def repair_json(fragment: str) -> str:
+    """
+    Best-effort rewrite of model JSON into valid JSON, in one pass.
+
+    Single-quoted strings become double-quoted, invalid escapes are
+    doubled, comments are removed, Python literals are translated, other
+    bare words are quoted, stray closers and trailing commas are dropped,
+    and whatever is still open at the end (string, array, object) is
+    closed.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    i, n = 0, len(fragment)
+    while i < n:
+        char = fragment[i]
+        if char == '"' or char == "'":
+            match = (_DOUBLE_QUOTED_RE if char == '"' else _SINGLE_QUOTED_RE).match(fragment, i)
+            body = fragment[i + 1:match.end() - len(match.group(1))]
+            if char == "'":
+                body = body.replace("\\'", "'").replace('"', '\\"')
+            out.append('"' + _BAD_ESCAPE_RE.sub(r"\\\\", body) + '"')
+            i = match.end()
+        elif char == "/" and fragment.startswith(("//", "/*"), i):
+            i = (_LINE_COMMENT_RE if fragment[i + 1] == "/" else _BLOCK_COMMENT_RE).match(fragment, i).end()
+        elif char in "{[":
+            stack.append(_CLOSERS[char])
+            out.append(char)
+            i += 1
+        elif char in "}]":
+            if stack and stack[-1] == char:
+                _drop_trailing_comma(out)
+                out.append(stack.pop())
+            i += 1
+        elif char in ",:":
+            out.append(char)
+            i += 1
+        elif char.isspace():
+            match = _SPACE_RE.match(fragment, i)
+            out.append(match.group(0))
+            i = match.end()
+        elif char == "-" or char.isdigit():
+            match = _NUMBER_RE.match(fragment, i)
+            if match:
+                out.append(match.group(0))
+                i = match.end()
+            else:
+                i += 1
+        else:
+            match = _WORD_RE.match(fragment, i)
+            if match:
+                word = match.group(0)
+                out.append(_LITERALS.get(word) or json.dumps(word))
+                i = match.end()
+            else:
+                i += 1
+    # Truncated reply: drop a dangling separator, give a dangling key or colon a value, close the rest
+    _drop_trailing_comma(out)
+    if out and out[-1] == ":":
+        out.append("null")
+    elif stack and stack[-1] == "}" and out and out[-1].startswith('"') and _previous_token(out) in ("{", ","):
+        out.append(": null")
+    while stack:
+        _drop_trailing_comma(out)
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def loads_lenient(fragment: str) -> Tuple[Any, bool]:
+    """
+    (value, repaired): json.loads, retried once on the repaired text.
+    Raises ValueError if both fail, or if the value nests deeper than the
+    parser can recurse
+    """
+    try:
+        try:
+            return json.loads(fragment, strict=False), False
+        except json.JSONDecodeError:
+            return json.loads(repair_json(fragment), strict=False), True
+    except RecursionError:
+        raise ValueError("JSON nested too deeply") from None
+
+
+def _letters(key: str) -> str:
+    return _NON_LETTERS_RE.sub("", str(key).lower())
+
+
+def _coerce_severity(value) -> Any:
+    if not isinstance(value, str):
+        return value
+    # Analyses carry three levels; critical is reported as high
+    level = normalize_severity(value)
+    if level == "critical":
+        return "high"
+    return level or value.strip().lower()
+
+
+def _coerce_item(item) -> Any:
+    """A finding in our item shape where the model's shape is unambiguous; anything else as is"""
+    if isinstance(item, str):
+        return {"severity": "medium", "message": item.strip()}
+    if not isinstance(item, dict):
+        return item
+    item = dict(item)
+    if "message" not in item:
+        for key in _MESSAGE_KEYS[1:]:
+            if isinstance(item.get(key), str):
+                item["message"] = item.pop(key)
+                break
+    item["severity"] = _coerce_severity(item.get("severity", item.pop("level", "medium")))
+    return item
+
+
+def _plainly_valid(item) -> bool:
+    # Common case, a strict subset of ANALYSIS_ITEM_SCHEMA: skips the validator's ~1 ms walk
+    return (type(item) is dict and item.get("severity") in SEVERITIES
+            and type(item.get("message")) is str and item["message"] != "")
+
+
+class AnalysisDecoder:
+    """
+    Reply decoder for one set of analysis categories.
+
+    ``categories`` maps analysis keys to the labels the model may use
+    instead (e.g. "critical_alerts" -> "CRITICAL ALERTS").
+    """
+
+    def __init__(self, categories: Dict[str, str], synonyms: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.categories = tuple(categories)
+        self._key_for: Dict[str, str] = {}
+        for key, label in categories.items():
+            for name in (key, label, *(CATEGORY_SYNONYMS if synonyms is None else synonyms).get(key, ())):
+                self._key_for[_letters(name)] = key
+        self.schema = {
+            "type": "object",
+            "required": list(self.categories),
+            "properties": {key: {"type": "array", "items": ANALYSIS_ITEM_SCHEMA} for key in self.categories},
+        }
+        self._validator = None
+
+    @property
+    def validator(self):
+        """The schema's jsonschema validator, checked and compiled on first use"""
+        if self._validator is None:
+            from jsonschema.validators import validator_for  # ~150 ms to import; only needed once a reply arrives
+            cls = validator_for(self.schema)
+            cls.check_schema(self.schema)
+            self._validator = cls(self.schema)
+        return self._validator
+
+    def category_for(self, key: str) -> Optional[str]:
+        return self._key_for.get(_letters(key))
+
+    def normalize(self, raw: Dict) -> Dict:
+        """Category arrays under our analysis keys, whatever the model called them"""
+        analysis: Dict[str, List] = {key: [] for key in self.categories}
+        for raw_key, items in raw.items():
+            key = self.category_for(raw_key)
+            if key is None:
+                continue
+            if isinstance(items, list):
+                analysis[key].extend(items)
+            elif items:
+                analysis[key].append(items)
+        return analysis
+
+    def _analysis_object(self, value) -> Optional[Dict]:
+        """The dict holding the categories: the value itself or one wrapper level down"""
+        if not isinstance(value, dict):
+            return None
+        if any(self.category_for(key) for key in value):
+            return value
+        for inner in value.values():
+            if isinstance(inner, dict) and any(self.category_for(key) for key in inner):
+                return inner
+        return None
+
+    def clean(self, analysis: Dict) -> Tuple[Dict, int]:
+        """(analysis with items coerced and schema-invalid items removed, number removed)"""
+        analysis = {key: [_coerce_item(item) for item in analysis.get(key, [])] for key in self.categories}
+        if all(map(_plainly_valid, itertools.chain.from_iterable(analysis.values()))):
+            return analysis, 0
+        invalid = set()
+        for error in self.validator.iter_errors(analysis):
+            path = list(error.absolute_path)
+            if len(path) >= 2:
+                invalid.add((path[0], path[1]))
+        if invalid:
+            analysis = {key: [item for index, item in enumerate(items) if (key, index) not in invalid]
+                        for key, items in analysis.items()}
+        return analysis, len(invalid)
+
+    def _decode_object(self, fragment: str) -> Optional[Tuple[Dict, bool, int]]:
+        """(cleaned analysis, repaired, items dropped) from one JSON object's text"""
+        try:
+            value, repaired = loads_lenient(fragment)
+        except ValueError:
+            return None
+        raw = self._analysis_object(value)
+        if raw is None:
+            return None
+        analysis, dropped = self.clean(self.normalize(raw))
+        if repaired:
+            event("decode_repaired")
+        if dropped:
+            event("decode_dropped_items", dropped)
+        return analysis, repaired, dropped
+
+    def decode_object(self, fragment: str) -> Optional[Dict]:
+        """Cleaned analysis from one JSON object's text, or None if it holds no known category"""
+        decoded = self._decode_object(fragment)
+        return None if decoded is None else decoded[0]
+
+    def decode_checked(self, content: str) -> Tuple[Dict, List[str]]:
+        """decode() plus what had to be fixed to read the reply (empty for a clean reply)"""
+        for start, end in iter_objects(content):
+            decoded = self._decode_object(content[start:] if end < 0 else content[start:end])
+            if decoded is not None:
+                analysis, repaired, dropped = decoded
+                issues = ["repaired JSON"] if repaired else []
+                if dropped:
+                    issues.append(f"{dropped} invalid items dropped")
+                return analysis, issues
+        event("decode_fallback")
+        return self.text_analysis(content), ["no JSON analysis"]
+
+    def decode(self, content: str) -> Dict:
+        """Analysis from a model reply: the first top-level object with known categories, else a text alert"""
+        return self.decode_checked(content)[0]
+
+    def text_analysis(self, text: str) -> Dict:
+        """Non-JSON reply as a single medium alert"""
+        analysis = {key: [] for key in self.categories}
+        analysis[self.categories[0]] = [{"severity": "medium", "message": text}]
+        return analysis
+
+
+_default_decoder = AnalysisDecoder(CATEGORY_LABELS)
+
+
+def normalize_analysis(raw_analysis: Dict) -> Dict:
+    """Map model category names (e.g. "CRITICAL ALERTS", "Drug Interactions") onto our analysis keys"""
+    return _default_decoder.normalize(raw_analysis)
@@ -0,0 +1,228 @@
+# app/src/healthform/ingest.py
+"""
+Streaming split of multi-form export files.
+
+Clinic systems export batches as one text file with hundreds of forms
+back to back. iter_forms reads such a file line by line and yields each
+form as soon as the next one starts, so parsing and analysis of the first
+forms begin while the rest of the file is still being read, and memory
+holds one form at a time whatever the file size.
+
+A new form starts at:
+  - a form title line: upper-case words ending in FORM
+    ("PATIENT INTAKE FORM", "COMPREHENSIVE MEDICAL INTAKE FORM");
+  - a separator line (10 or more '=', '-', '*', '_', '#' or '~', or a
+    label between runs of 5 or more) that is followed by a form title,
+    or by a "Patient Name:" line within the next few lines when the form
+    so far already has one; a separator labelled with FORM
+    ("===== FORM 12 =====", "----- next form -----") always starts one;
+  - a form feed (page break).
+A form never ends before it has a line besides its title, so a title
+underlined with a rule stays one form. Rules inside a form (section
+underlines, dividers between sections) are kept in its text. Separators
+and blank lines between forms are dropped; line endings inside a form are
+kept as exported.
+
+Usage:
+    with open("export.txt", encoding="utf-8", newline="") as f:
+        for form in iter_forms(f, source="export.txt"):
+            patient_data = MedicalFormParser.extract_patient_data(form.text)
+
+    cd app/src
+    python -m healthform.batch ../../exports/*.txt --split -o results.jsonl
+"""
+import io
+import re
+import pathlib
+from collections import deque
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from .instrumentation import event
+
+# Longest line read at once, and longest form kept before it is cut (no boundary found)
+MAX_LINE_CHARS = 64 * 1024
+DEFAULT_MAX_FORM_CHARS = 1024 * 1024
+
+FORM_TITLE_RE = re.compile(r"[ \t]*[A-Z][A-Z0-9 &/,.'()-]*\bFORM[ \t]*:?[ \t]*(?:\r\n|\r|\n)?\Z")
+SEPARATOR_CHARS = frozenset("=-*_#~")
+PATIENT_NAME_RE = re.compile(r"[ \t]*Patient Name[ \t]*:", re.IGNORECASE)
+_FORM_LABEL_RE = re.compile(r"\bFORM\b", re.IGNORECASE)
+# Non-blank lines read after a separator, looking for the start of a new form, before deciding it is a section rule
+FORM_START_LOOKAHEAD = 8
+
+
+@dataclass
+class SplitForm:
+    """One form cut from a multi-form file; ``line`` is where it starts (1-based)"""
+    path: str
+    index: int
+    line: int
+    text: str
+
+    @property
+    def source(self) -> str:
+        return f"{self.path}:{self.line}"
+
+
+def is_separator(line: str) -> bool:
+    """A line made of, or bracketed by, runs of 5+ separator characters (10+ in all)"""
+    line = line.strip()
+    return len(line) >= 10 and SEPARATOR_CHARS.issuperset(line[:5]) and SEPARATOR_CHARS.issuperset(line[-5:])
+
+
+def _is_form_label(line: str) -> bool:
+    """A separator whose label names a form ("===== FORM 12 =====")"""
+    return bool(_FORM_LABEL_RE.search(line.strip().strip("".join(SEPARATOR_CHARS))))
+
+
+def _separator_ends_form(after: List[str], form_has_name: bool) -> Optional[bool]:
+    """
+    Whether a separator followed by ``after`` ends the form before it:
+    True at a form title or page break, or at a second "Patient Name:";
+    False at another separator (that one is decided on its own) or once
+    FORM_START_LOOKAHEAD lines show neither; None until then
+    """
+    seen = 0
+    for line in after:
+        if not line.strip():
+            continue
+        if "\f" in line or FORM_TITLE_RE.match(line) or (form_has_name and PATIENT_NAME_RE.match(line)):
+            return True
+        if is_separator(line):
+            if seen:
+                return False
+            continue  # a double rule
+        seen += 1
+        if seen >= FORM_START_LOOKAHEAD:
+            return False
+    return None
+
+
+def _read_lines(stream: IO[str]) -> Iterator[str]:
+    # readline with a limit: a file without line breaks still arrives in bounded pieces
+    return iter(lambda: stream.readline(MAX_LINE_CHARS), "")
+
+
+def iter_forms(stream: IO[str], source: str = "", max_form_chars: int = DEFAULT_MAX_FORM_CHARS
+               ) -> Iterator[SplitForm]:
+    """Yield each form of a multi-form text stream as soon as its end is seen"""
+    lines: List[str] = []
+    size = 0
+    start_line = 0
+    index = 0
+    has_body = has_name = False  # the form so far has a line besides its title / a patient name
+    # A separator and the lines after it, held until they show whether it ends the form
+    pending: List[Tuple[int, str]] = []
+    # Lines taken back out of pending to be read again
+    replay: "deque[Tuple[int, str]]" = deque()
+
+    def flush():
+        nonlocal lines, size, index, has_body, has_name
+        text = "".join(lines).strip()
+        lines, size = [], 0
+        has_body = has_name = False
+        if text:
+            index += 1
+            return SplitForm(source, index, start_line, text)
+        return None
+
+    def add(number: int, line: str):
+        nonlocal size, start_line, has_body, has_name
+        if not lines:
+            if not line.strip():
+                return
+            start_line = number
+        lines.append(line)
+        size += len(line)
+        if line.strip() and not FORM_TITLE_RE.match(line) and not is_separator(line):
+            has_body = True
+            has_name = has_name or bool(PATIENT_NAME_RE.match(line))
+
+    def replayed():
+        while replay:
+            yield replay.popleft()
+
+    def numbered_lines():
+        for item in enumerate(_read_lines(stream), 1):
+            yield item
+            yield from replayed()
+
+    def settle(ends_form: bool):
+        # Resolve the pending separator; the lines after it are read again
+        nonlocal pending
+        (number, separator), after = pending[0], pending[1:]
+        pending = []
+        replay.extendleft(reversed(after))
+        if ends_form:
+            return flush()
+        add(number, separator)
+        return None
+
+    items = numbered_lines()
+    while True:
+        item = next(items, None)
+        if item is None:
+            if not pending:
+                break
+            # End of input: a separator with only blank lines after it ends the last form
+            form = settle(not any(line.strip() for _, line in pending[1:]))
+            if form is not None:
+                yield form
+            items = replayed()
+            continue
+        line_number, line = item
+        if pending:
+            pending.append(item)
+            ends_form = _separator_ends_form([text for _, text in pending[1:]], has_name)
+            if ends_form is not None:
+                form = settle(ends_form)
+                if form is not None:
+                    yield form
+            continue
+        if "\f" in line:
+            *pages, line = line.split("\f")
+            for page in pages:
+                if not lines:
+                    start_line = line_number
+                lines.append(page)
+                form = flush()
+                if form is not None:
+                    yield form
+        elif is_separator(line):
+            if not has_body:
+                # Between forms (dropped), or a title's underline
+                if lines:
+                    add(line_number, line)
+            elif _is_form_label(line):
+                form = flush()
+                if form is not None:
+                    yield form
+            else:
+                pending = [item]
+            continue
+        elif has_body and FORM_TITLE_RE.match(line):
+            form = flush()
+            if form is not None:
+                yield form
+        elif size + len(line) > max_form_chars:
+            event("form_split_oversize")
+            form = flush()
+            if form is not None:
+                yield form
+        add(line_number, line)
+    form = flush()
+    if form is not None:
+        yield form
+
+
+def open_text(upload) -> IO[str]:
+    """Text stream over a binary file-like (e.g. a Streamlit upload), keeping line endings as they are"""
+    return io.TextIOWrapper(upload, encoding="utf-8", errors="replace", newline="")
+
+
+def iter_form_files(paths: Iterable[pathlib.Path]) -> Iterator[SplitForm]:
+    """Forms of every multi-form file, file by file, each read as a stream"""
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace", newline="") as f:
+            yield from iter_forms(f, source=str(path))
@@ -0,0 +1,268 @@
+# app/src/healthform/instrumentation.py
+"""
+Per-stage latency spans, counters and token totals for analyses.
+
+Every stage of an analysis (parse, rules, prompt, llm, decode, save) runs
+inside ``span(stage)``. Each finished span lands in an in-process latency
+histogram. Named events such as cache hits and mock fallbacks go to
+counters. Three modes, set with configure() or HEALTHFORM_TELEMETRY:
+
+    off      spans and events are no-ops (cost: one attribute check)
+    metrics  histograms and counters only; the production default
+    log      metrics plus one structured JSON event per span and event on
+             the "healthform.telemetry" logger (rendered by structlog when
+             installed)
+
+Usage:
+    from healthform.instrumentation import configure, span, summary
+    configure("log")
+    with span("parse"):
+        ...
+    print(summary())
+"""
+import os
+import json
+import math
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_METRICS = "metrics"
+MODE_LOG = "log"
+MODES = (MODE_OFF, MODE_METRICS, MODE_LOG)
+
+# Log-spaced histogram buckets: 10 per decade from 10 µs up to 1000 s
+_BUCKETS_PER_DECADE = 10
+_MIN_SECONDS = 1e-5
+_BUCKET_COUNT = 8 * _BUCKETS_PER_DECADE + 1
+
+
+class LatencyHistogram:
+    """Fixed log-bucket histogram; percentiles are accurate to one bucket (about 26%)"""
+
+    def __init__(self):
+        self.buckets = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        if seconds <= _MIN_SECONDS:
+            return 0
+        return min(_BUCKET_COUNT - 1, int(math.log10(seconds / _MIN_SECONDS) * _BUCKETS_PER_DECADE) + 1)
+
+    @staticmethod
+    def _upper_bound(bucket: int) -> float:
+        return _MIN_SECONDS * 10 ** (bucket / _BUCKETS_PER_DECADE)
+
+    def record(self, seconds: float):
+        self.buckets[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples, clamped to the observed range"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket, hits in enumerate(self.buckets):
+            seen += hits
+            if seen >= rank:
+                return min(max(self._upper_bound(bucket), self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+# Structured events always go out through this stdlib logger, so the application owns handlers and output
+event_logger = logging.getLogger("healthform.telemetry")
+
+
+def _stdlib_emit(event: str, **fields):
+    event_logger.info(json.dumps({"event": event, **fields}, default=str))
+
+
+def _structured_emitter():
+    """structlog JSON rendering when installed, else plain JSON lines"""
+    try:
+        import structlog
+    except ImportError:
+        return _stdlib_emit
+    log = structlog.wrap_logger(
+        event_logger,
+        processors=[structlog.processors.TimeStamper(fmt="iso"), structlog.processors.JSONRenderer(default=str)],
+    )
+    return lambda event, **fields: log.info(event, **fields)
+
+
+class Telemetry:
+    """Thread-safe collector for spans, counters and token totals"""
+
+    def __init__(self, mode: str = MODE_METRICS):
+        self._lock = threading.Lock()
+        self._emit = None
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.set_mode(mode)
+
+    def set_mode(self, mode: str):
+        if mode not in MODES:
+            raise ValueError(f"Unknown telemetry mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.enabled = mode != MODE_OFF
+        self._emit = _structured_emitter() if mode == MODE_LOG else None
+
+    def _finish(self, stage: str, fields: Dict, elapsed: float, status: str):
+        self._record(stage, elapsed)
+        if self._emit is not None:
+            self._emit("span", stage=stage, duration_ms=round(elapsed * 1000, 3), status=status, **fields)
+
+    def _record(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def observe(self, stage: str, seconds: float, **fields):
+        """Record a duration measured by the caller (for work that cannot sit inside one block)"""
+        if not self.enabled:
+            return
+        self._finish(stage, fields, seconds, "ok")
+
+    def span(self, stage: str, **fields):
+        """Time a block as one stage; callers may add fields to the yielded dict for the log event"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, fields)
+
+    def event(self, name: str, count: int = 1, **fields):
+        """Count a named occurrence (cache_hit, mock_fallback, ...)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+        if self._emit is not None:
+            self._emit(name, **fields)
+
+    def record_tokens(self, usage: Optional[Dict]):
+        """Add one analysis' prompt and completion tokens to the running totals"""
+        if not usage or not self.enabled:
+            return
+        with self._lock:
+            for key in ("prompt_tokens", "completion_tokens"):
+                self.counters[key] = self.counters.get(key, 0) + (usage.get(key) or 0)
+        if self._emit is not None:
+            self._emit("tokens", **usage)
+
+    def summary(self) -> Dict:
+        """Per-stage latency percentiles plus every counter"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "stages": {stage: h.summary() for stage, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+class _Span:
+    """Context manager timing one stage (a class rather than a generator: this runs on every stage)"""
+    __slots__ = ("telemetry", "stage", "fields", "start")
+
+    def __init__(self, telemetry: Telemetry, stage: str, fields: Dict):
+        self.telemetry = telemetry
+        self.stage = stage
+        self.fields = fields
+
+    def __enter__(self) -> Dict:
+        self.start = time.perf_counter()
+        return self.fields
+
+    def __exit__(self, exc_type, exc, tb):
+        self.telemetry._finish(self.stage, self.fields, time.perf_counter() - self.start,
+                               "ok" if exc_type is None else "error")
+        return False
+
+
+class _NullSpan:
+    """Reusable no-op context manager for disabled telemetry"""
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+_env_mode = os.getenv("HEALTHFORM_TELEMETRY", MODE_METRICS)
+if _env_mode not in MODES:
+    logger.warning("Ignoring unknown HEALTHFORM_TELEMETRY=%r", _env_mode)
+    _env_mode = MODE_METRICS
+telemetry = Telemetry(_env_mode)
+
+
+def configure(mode: str) -> Telemetry:
+    """Switch the process-wide telemetry mode ("off", "metrics" or "log")"""
+    telemetry.set_mode(mode)
+    return telemetry
+
+
+def span(stage: str, **fields):
+    return telemetry.span(stage, **fields)
+
+
+def observe(stage: str, seconds: float, **fields):
+    telemetry.observe(stage, seconds, **fields)
+
+
+def event(name: str, count: int = 1, **fields):
+    telemetry.event(name, count, **fields)
+
+
+def record_tokens(usage: Optional[Dict]):
+    telemetry.record_tokens(usage)
+
+
+def summary() -> Dict:
+    return telemetry.summary()
+
+
+def format_summary(data: Optional[Dict] = None) -> str:
+    """Human-readable table of a summary()"""
+    data = data or summary()
+    lines = [f"{'stage':<16} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for stage, stats in data["stages"].items():
+        if stats["count"]:
+            lines.append(f"{stage:<16} {stats['count']:>7} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} "
+                         f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['max_ms']:>9.3f}")
+    for name, value in data["counters"].items():
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
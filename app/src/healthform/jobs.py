@@ -0,0 +1,489 @@
+# app/src/healthform/jobs.py
+"""
+Background analysis jobs: a persistent SQLite queue and a worker pool.
+
+The UI submits a form and gets a job ID back at once; a bounded pool of
+worker threads parses, analyzes and saves it, and the UI polls (or
+waits briefly on) the job until it is done. While a job runs, its
+handler can report partial results (analysis_handler reports each
+finding as the model streams it), which the UI shows on every poll. A
+page rerun or a closed tab no longer abandons or repeats an analysis in
+flight, and however many clinicians are submitting, at most ``workers``
+model calls run at once; the rest wait in the queue.
+
+Jobs are keyed by a hash of the whitespace-normalized form text. A form
+submitted while an identical one is still queued or running joins that
+job instead of starting another (a unique index on in-flight keys
+enforces this across processes).
+
+A claimed job holds a lease that its pool renews while the worker runs
+it. Each pool periodically requeues jobs whose lease ran out (their
+process died or hung), up to ``max_attempts``; a submission never joins
+such a job, it requeues it first. Only the worker holding a job may
+report on or finish it, so a worker that lost its lease cannot overwrite
+the new owner's run (analysis_handler then stops before saving).
+Finished jobs are deleted after ``retain_seconds``.
+
+Workers can also run in their own process, sharing the queue file:
+    cd app/src
+    python -m healthform.jobs worker --db ../../data/jobs.sqlite3 --workers 8
+
+Usage:
+    queue = JobQueue("data/jobs.sqlite3")
+    pool = WorkerPool(queue, analysis_handler(clinical_ai, store), workers=8).start()
+    job_id = queue.submit(form_text)
+    job = queue.wait(job_id, timeout=1.0)   # job.finished, job.result, job.error, job.progress
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import logging
+import pathlib
+import argparse
+import functools
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from .instrumentation import event, observe, span
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+DEFAULT_WORKERS = 8
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_RETAIN_SECONDS = 24 * 3600.0
+POLL_SECONDS = 0.5
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class LeaseLost(Exception):
+    """Raised by a handler whose job was requeued (its lease ran out) and may now run elsewhere"""
+
+
+def request_key(form_text: str) -> str:
+    """Hash that identical submissions share; whitespace differences do not count"""
+    return hashlib.sha256(_WHITESPACE_RE.sub(" ", form_text).strip().encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Job:
+    """One queued analysis and, once finished, its result or error"""
+    id: str
+    status: str
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: int = 0
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    payload: Optional[Dict] = None
+    progress: Optional[Dict] = None  # latest partial result the handler reported
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+
+class JobQueue:
+    """
+    Persistent FIFO of analysis jobs in a local SQLite file (WAL mode).
+
+    Safe to share between threads; several processes may use the same
+    file. Waiting on a job is woken at once by completions in this
+    process and polls for those finished elsewhere.
+    """
+
+    def __init__(self, path, max_attempts: int = 3, retain_seconds: Optional[float] = DEFAULT_RETAIN_SECONDS):
+        self.path = pathlib.Path(path)
+        self.max_attempts = max_attempts
+        self.retain_seconds = retain_seconds
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._submitted = threading.Condition()
+        self._finished = threading.Condition()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                request_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                submitted_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                lease_expires REAL,
+                progress TEXT
+            );
+            -- At most one queued or running job per request: the coalescing guarantee
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_in_flight ON jobs (request_key)
+                WHERE status IN ('queued', 'running');
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, submitted_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_expires" not in columns:
+            # Queues created before leases were renewed: running jobs keep their original lease
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires REAL")
+            self._conn.execute("UPDATE jobs SET lease_expires = started_at + ? WHERE status = ?",
+                               (DEFAULT_LEASE_SECONDS, RUNNING))
+        if "progress" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+        self._conn.commit()
+
+    def _in_flight(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT id FROM jobs WHERE request_key = ? AND status IN (?, ?)", (key, QUEUED, RUNNING)
+        ).fetchone()
+        return row[0] if row else None
+
+    def submit(self, form_text: str) -> str:
+        """Queue an analysis of form_text and return its job ID (an identical in-flight job's, if any)"""
+        key = request_key(form_text)
+        with self._lock:
+            # A running job whose lease ran out may never finish: requeue it rather than wait on it
+            if self._requeue_expired(key):
+                self.wake_workers(1)
+            job_id = self._in_flight(key)
+            if job_id is None:
+                job_id = uuid.uuid4().hex
+                try:
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT INTO jobs (id, request_key, status, payload, submitted_at) VALUES (?, ?, ?, ?, ?)",
+                            (job_id, key, QUEUED, json.dumps({"form_text": form_text}), time.time()),
+                        )
+                except sqlite3.IntegrityError:
+                    # Another process queued the same form between our check and insert
+                    job_id = self._in_flight(key)
+                    if job_id is None:
+                        raise
+                else:
+                    event("job_submitted")
+                    self.wake_workers(1)
+                    return job_id
+            self.coalesced += 1
+        event("job_coalesced")
+        return job_id
+
+    def claim(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Job]:
+        """Oldest queued job, marked running for this worker under a lease; None when the queue is empty"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                """UPDATE jobs SET status = ?, worker = ?, started_at = ?, lease_expires = ?, attempts = attempts + 1
+                   WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY submitted_at LIMIT 1)
+                   RETURNING id, submitted_at, attempts, payload""",
+                (RUNNING, worker, now, now + lease_seconds, QUEUED),
+            ).fetchall()
+        if not row:
+            return None
+        row = row[0]
+        observe("job_wait", now - row[1])
+        return Job(row[0], RUNNING, row[1], started_at=now, attempts=row[2], payload=json.loads(row[3]))
+
+    def _finish(self, job_id: str, worker: str, status: str, result: Optional[Dict], error: Optional[str]) -> bool:
+        now = time.time()
+        with self._lock, self._conn:
+            finished = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND status = ? AND worker = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, job_id, RUNNING, worker),
+            ).rowcount
+            if self.retain_seconds is not None:
+                self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (now - self.retain_seconds,))
+        with self._finished:
+            self._finished.notify_all()
+        return bool(finished)
+
+    def report(self, job_id: str, worker: str, progress: Dict) -> bool:
+        """
+        Record a running job's partial result, replacing the one reported
+        before; False when ``worker`` no longer holds the job
+        """
+        with self._lock, self._conn:
+            return bool(self._conn.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ? AND status = ? AND worker = ?",
+                (json.dumps(progress), job_id, RUNNING, worker),
+            ).rowcount)
+
+    def complete(self, job_id: str, worker: str, result: Dict) -> bool:
+        """Finish the job with its result; False (nothing written) when ``worker`` no longer holds it"""
+        return self._finish(job_id, worker, DONE, result, None)
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        """Fail the job; False (nothing written) when ``worker`` no longer holds it"""
+        return self._finish(job_id, worker, FAILED, None, error)
+
+    def renew(self, worker_prefix: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+        """Extend the leases of jobs running on workers whose names start with worker_prefix"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE status = ? AND substr(worker, 1, ?) = ?",
+                (time.time() + lease_seconds, RUNNING, len(worker_prefix), worker_prefix),
+            ).rowcount
+
+    def _requeue_expired(self, key: Optional[str] = None) -> int:
+        # Caller holds self._lock
+        now = time.time()
+        scope, params = ("", ()) if key is None else (" AND request_key = ?", (key,))
+        with self._conn:
+            failed = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = 'worker lost too many times' "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?" + scope,
+                (FAILED, now, RUNNING, now, self.max_attempts) + params,
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, progress = NULL "
+                "WHERE status = ? AND lease_expires < ?" + scope,
+                (QUEUED, RUNNING, now) + params,
+            ).rowcount
+        if failed:
+            with self._finished:
+                self._finished.notify_all()
+        if requeued:
+            event("job_requeued", requeued)
+        return requeued + failed
+
+    def requeue_expired(self) -> int:
+        """Requeue running jobs whose lease ran out (their worker died or hung); fail those out of attempts"""
+        with self._lock:
+            expired = self._requeue_expired()
+        if expired:
+            self.wake_workers()
+        return expired
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, submitted_at, started_at, finished_at, attempts, result, error, progress "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, submitted_at, started_at, finished_at, attempts, result, error, progress = row
+        return Job(job_id, status, submitted_at, started_at, finished_at, attempts,
+                   json.loads(result) if result is not None else None, error,
+                   progress=json.loads(progress) if progress is not None and status == RUNNING else None)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """The job once finished, or as it stands when timeout runs out (None if the ID is unknown)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job.finished:
+                return job
+            remaining = POLL_SECONDS if deadline is None else min(POLL_SECONDS, deadline - time.monotonic())
+            if remaining <= 0:
+                return job
+            with self._finished:
+                self._finished.wait(remaining)
+
+    def wait_for_work(self, timeout: float):
+        """Block until a job is submitted in this process or timeout passes"""
+        with self._submitted:
+            self._submitted.wait(timeout)
+
+    def wake_workers(self, count: Optional[int] = None):
+        """Wake ``count`` workers blocked in wait_for_work (all of them by default)"""
+        with self._submitted:
+            if count is None:
+                self._submitted.notify_all()
+            else:
+                self._submitted.notify(count)
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs per status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        counts.update(rows)
+        return counts
+
+    def stats(self) -> Dict:
+        return dict(self.counts(), coalesced=self.coalesced)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WorkerPool:
+    """
+    ``workers`` daemon threads taking jobs from a JobQueue.
+
+    ``handler`` gets a job's payload and a ``report`` callable for partial
+    results (returning False once the job was taken from this worker), and
+    returns its result dict; an exception fails the job with the
+    exception's message. A lease thread renews the leases of the pool's
+    running jobs and requeues expired ones every ``lease_seconds / 4``.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Dict, Callable[[Dict], bool]], Dict],
+                 workers: int = DEFAULT_WORKERS, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    def start(self) -> "WorkerPool":
+        self.queue.requeue_expired()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{self._prefix}-{number}",),
+                                      name=f"healthform-job-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._maintain_leases, name="healthform-job-leases", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def _maintain_leases(self):
+        while not self._stopping.wait(self.lease_seconds / 4):
+            try:
+                self.queue.renew(self._prefix + "-", self.lease_seconds)
+                self.queue.requeue_expired()
+            except sqlite3.Error:
+                logger.exception("Renewing job leases failed")
+
+    def _run(self, worker: str):
+        while not self._stopping.is_set():
+            job = self.queue.claim(worker, self.lease_seconds)
+            if job is None:
+                self.queue.wait_for_work(POLL_SECONDS)
+                continue
+            try:
+                with span("job"):
+                    result = self.handler(job.payload, functools.partial(self.queue.report, job.id, worker))
+            except LeaseLost:
+                logger.warning("Job %s was requeued while %s ran it; dropping this run", job.id, worker)
+                event("job_lease_lost")
+            except Exception as e:
+                logger.exception("Job %s failed", job.id)
+                event("job_failed", reason=type(e).__name__)
+                self.queue.fail(job.id, worker, str(e) or type(e).__name__)
+            else:
+                if not self.queue.complete(job.id, worker, result):
+                    logger.warning("Job %s was requeued while %s ran it; result dropped", job.id, worker)
+                    event("job_lease_lost")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop taking jobs and wait for the running ones to finish"""
+        self._stopping.set()
+        self.queue.wake_workers()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+def analysis_handler(clinical_ai, store) -> Callable[[Dict, Callable[[Dict], bool]], Dict]:
+    """
+    Job handler that parses, analyzes and saves a form, as the UI did
+    inline. It streams the analysis, reporting the parsed patient data and
+    the findings so far ({"patient_data", "items": [[category, item], ...]})
+    each time a finding arrives. If the job was taken from this worker, it
+    raises LeaseLost instead of saving, so the form is saved only once.
+    """
+    from .parser import MedicalFormParser
+    from .streaming import ITEM
+
+    def handle(payload: Dict, report: Callable[[Dict], bool]) -> Dict:
+        form_text = payload["form_text"]
+        patient_data = MedicalFormParser.extract_patient_data(form_text)
+        progress = {"patient_data": patient_data.to_dict(), "items": []}
+        report(progress)
+        analysis = None
+        for update in clinical_ai.stream_patient_data(patient_data):
+            if update.kind == ITEM:
+                progress["items"].append([update.category, update.item])
+                report(progress)
+            else:
+                analysis = update.analysis
+        if not report(progress):
+            raise LeaseLost()
+        result = {"patient_data": progress["patient_data"], "analysis": analysis, "record_id": None}
+        # A failed save must not cost the clinician the analysis
+        try:
+            result["record_id"] = store.save(patient_data, analysis, form_text)
+        except Exception as e:
+            logger.exception("Saving analysis failed")
+            result["save_error"] = str(e)
+        return result
+
+    return handle
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m healthform.jobs", description="Run analysis job workers")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    worker_cmd = subcommands.add_parser("worker", help="Process queued analyses until interrupted")
+    worker_cmd.add_argument("--db", default=os.path.join("data", "jobs.sqlite3"), help="Job queue database")
+    worker_cmd.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent analyses")
+    worker_cmd.add_argument("--store", default=os.getenv("HEALTHFORM_STORE") or os.path.join("data", "analyses.sqlite3"),
+                            help="Where analyses are saved (open_store spec)")
+    worker_cmd.add_argument("--search-index", metavar="PATH", default=os.getenv("HEALTHFORM_SEARCH_INDEX"),
+                            help="Also add saved analyses to this search index")
+    worker_cmd.add_argument("--cache", metavar="PATH", help="Analysis cache file")
+    worker_cmd.add_argument("--reuse-similar", action="store_true",
+                            help="Reuse the analysis of a near-identical earlier form of the same patient")
+    status_cmd = subcommands.add_parser("status", help="Show job counts")
+    status_cmd.add_argument("--db", default=os.path.join("data", "jobs.sqlite3"), help="Job queue database")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.db)
+    if args.command == "status":
+        print(json.dumps(queue.counts()))
+        return 0
+
+    from .batch import create_openai_client
+    from .clinical_ai import ClinicalAI
+    from .analysis_cache import AnalysisCache
+    from .near_duplicates import NearDuplicateIndex
+    from .storage import open_store
+
+    clinical_ai = ClinicalAI(create_openai_client(), cache=AnalysisCache(args.cache) if args.cache else None,
+                             near_duplicates=NearDuplicateIndex() if args.reuse_similar else None)
+    store = open_store(args.store)
+    if args.search_index:
+        from .search import IndexedStore, SearchIndex
+        store = IndexedStore(store, SearchIndex(args.search_index))
+    pool = WorkerPool(queue, analysis_handler(clinical_ai, store), workers=args.workers).start()
+    sys.stderr.write(f"[jobs] {args.workers} workers on {args.db}\n")
+    try:
+        while True:
+            time.sleep(60)
+            sys.stderr.write(f"[jobs] {queue.counts()}\n")
+    except KeyboardInterrupt:
+        pool.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# app/src/healthform/medications.py
+"""
+Medication normalization and drug-interaction lookup.
+
+PatientData.medications entries such as "Warfarin 5mg Daily" are parsed
+into name, dose and frequency, and names are reduced to a canonical
+generic form. The drug is the longest known name (an alias, or a drug in
+the interaction table) found among the entry's words, so entries without
+a dose ("Aspirin daily"), with formulation words ("Aspirin EC 81mg") or
+dose ranges ("Warfarin 2.5-5mg") still resolve. Entries with no known
+name fall back to the text before the dose and are marked unrecognized.
+Interactions come from a local table file and are indexed by canonical
+name pair, so checking N medications costs at most N²/2 hash lookups
+regardless of how many interactions the table holds.
+"""
+import re
+import csv
+import pathlib
+from functools import lru_cache
+from itertools import combinations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+REFERENCE_DIR = pathlib.Path(__file__).resolve().parent / "reference"
+INTERACTIONS_FILE = REFERENCE_DIR / "drug_interactions.csv"
+ALIASES_FILE = REFERENCE_DIR / "drug_aliases.csv"
+
+_DOSE_UNITS = r"(?:mg|mcg|µg|g|ml|mL|l|units?|iu|meq|mmol|%|tablets?|tabs?|capsules?|caps?|puffs?|drops?|sprays?|patch(?:es)?)"
+# A number or a range such as "2.5-5" or "1 to 2", then an optional unit
+_AMOUNT = r"\d[\d.,]*(?:\s*(?:-|–|to)\s*\d[\d.,]*)?\s*" + _DOSE_UNITS + r"?"
+# Name, then a dose such as "5mg", "2.5-5mg", "0.15mg/0.03mg" or "10 mg/day", then free-text frequency
+_ENTRY_RE = re.compile(
+    r"^(?P<name>.*?)\s+"
+    r"(?P<dose>" + _AMOUNT + r"(?:\s*/\s*(?:" + _AMOUNT + r"|[a-z]+))*)"
+    r"(?:\s+(?P<frequency>.*))?$",
+    re.IGNORECASE,
+)
+_PARENTHETICAL_RE = re.compile(r"\([^)]*\)")
+_NON_NAME_RE = re.compile(r"[^a-z0-9\- ]+")
+_SPACES_RE = re.compile(r"\s+")
+
+# Salt and formulation words that do not change which drug it is
+_NAME_NOISE = frozenset({
+    "hcl", "hydrochloride", "sodium", "potassium", "calcium", "succinate", "tartrate", "besylate",
+    "maleate", "mesylate", "er", "xr", "xl", "sr", "cr", "la", "dr", "ec", "odt", "oral", "tablet", "tablets", "tab",
+    "capsule", "capsules", "cap", "chewable", "enteric", "coated", "extended", "delayed", "release",
+})
+# Salts that are the drug itself rather than a counter-ion
+_KEEP_WHOLE = frozenset({"potassium chloride", "calcium carbonate"})
+
+
+@dataclass(frozen=True)
+class Medication:
+    """One parsed medication entry"""
+    name: str
+    dose: str = ""
+    frequency: str = ""
+    raw: str = ""
+    recognized: bool = False  # name found in the alias or interaction tables
+
+
+def _load_aliases(path: pathlib.Path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    with open(path, newline="") as f:
+        return {row["alias"].strip().lower(): row["generic"].strip().lower() for row in csv.DictReader(f)}
+
+
+_default_aliases: Optional[Dict[str, str]] = None
+
+
+def default_aliases() -> Dict[str, str]:
+    """Brand and alternate names from the bundled reference table, loaded on first use"""
+    global _default_aliases
+    if _default_aliases is None:
+        _default_aliases = _load_aliases(ALIASES_FILE)
+    return _default_aliases
+
+
+def _clean(text: str) -> str:
+    return _SPACES_RE.sub(" ", _NON_NAME_RE.sub(" ", _PARENTHETICAL_RE.sub(" ", text.lower()))).strip()
+
+
+def canonical_name(name: str, aliases: Optional[Dict[str, str]] = None) -> str:
+    """Lowercase generic drug name with salts, formulation words and brand names resolved"""
+    aliases = default_aliases() if aliases is None else aliases
+    cleaned = _clean(name)
+    if cleaned in aliases:
+        return aliases[cleaned]
+    if cleaned in _KEEP_WHOLE:
+        return cleaned
+    words = [word for word in cleaned.split(" ") if word not in _NAME_NOISE]
+    stripped = " ".join(words) or cleaned
+    return aliases.get(stripped, stripped)
+
+
+_known_names: Optional[frozenset] = None
+
+
+def known_drug_names() -> frozenset:
+    """Every name the bundled tables know: aliases, their generics and the drugs in the interaction table"""
+    global _known_names
+    if _known_names is None:
+        aliases = default_aliases()
+        _known_names = frozenset(aliases) | frozenset(aliases.values()) | default_interaction_index().known_drugs
+    return _known_names
+
+
+def find_drug_name(text: str) -> Tuple[str, str]:
+    """
+    (generic name, words after it) for the longest known drug name in
+    ``text``, earliest first; ("", "") when no known name is in it
+    """
+    aliases = default_aliases()
+    known = known_drug_names()
+    words = _clean(text).split(" ")
+    for start in range(len(words)):
+        for end in range(len(words), start, -1):
+            candidate = " ".join(words[start:end])
+            if candidate in known:
+                rest = " ".join(word for word in words[end:] if word not in _NAME_NOISE)
+                return aliases.get(candidate, candidate), rest
+    return "", ""
+
+
+# Medication lists repeat the same entries across forms, so parsed entries are memoized
+@lru_cache(maxsize=8192)
+def parse_medication(entry: str) -> Medication:
+    """Split an entry like "Metformin 500mg Twice daily" into name, dose and frequency"""
+    text = entry.strip()
+    match = _ENTRY_RE.match(text)
+    if match and match.group("name"):
+        name_text, dose, frequency = match.group("name"), match.group("dose").strip(), (match.group("frequency") or "").strip()
+    else:
+        name_text, dose, frequency = text, "", ""
+    generic, rest = find_drug_name(name_text)
+    if generic:
+        # Without a dose the words after the name are the frequency ("Aspirin daily")
+        return Medication(name=generic, dose=dose, frequency=frequency or rest, raw=entry, recognized=True)
+    return Medication(name=canonical_name(name_text), dose=dose, frequency=frequency, raw=entry)
+
+
+def normalize_medications(entries: Iterable[str]) -> List[Medication]:
+    return [parse_medication(entry) for entry in entries if entry and entry.strip()]
+
+
+class InteractionIndex:
+    """Precomputed pair index over a drug-interaction table"""
+
+    def __init__(self, pairs: Dict[Tuple[str, str], Tuple[str, str]]):
+        self.pairs = pairs
+        # Drugs that take part in at least one interaction; others are skipped before pairing
+        self.known_drugs = frozenset(name for pair in pairs for name in pair)
+
+    @staticmethod
+    def _key(a: str, b: str) -> Tuple[str, str]:
+        return (a, b) if a <= b else (b, a)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, str, str]]) -> "InteractionIndex":
+        pairs = {}
+        for drug_a, drug_b, severity, message in rows:
+            pairs[cls._key(canonical_name(drug_a), canonical_name(drug_b))] = (severity.strip().lower(), message.strip())
+        return cls(pairs)
+
+    @classmethod
+    def from_csv(cls, path=INTERACTIONS_FILE) -> "InteractionIndex":
+        """Load a drug_a,drug_b,severity,message table"""
+        with open(path, newline="") as f:
+            return cls.from_rows(
+                (row["drug_a"], row["drug_b"], row["severity"], row["message"]) for row in csv.DictReader(f)
+            )
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def check_names(self, names: Iterable[str]) -> List[Dict]:
+        """Interaction alerts among canonical drug names"""
+        candidates = sorted({name for name in names if name in self.known_drugs})
+        alerts = []
+        for a, b in combinations(candidates, 2):
+            hit = self.pairs.get((a, b))
+            if hit:
+                alerts.append({"severity": hit[0], "message": hit[1], "drugs": [a, b]})
+        return alerts
+
+    def check(self, medications: Iterable[str]) -> List[Dict]:
+        """Interaction alerts for raw PatientData.medications entries"""
+        return self.check_names(med.name for med in normalize_medications(medications))
+
+
+_default_index: Optional[InteractionIndex] = None
+
+
+def default_interaction_index() -> InteractionIndex:
+    """Interaction index over the bundled reference table, loaded once"""
+    global _default_index
+    if _default_index is None:
+        _default_index = InteractionIndex.from_csv()
+    return _default_index
@@ -0,0 +1,47 @@
+# app/src/healthform/models.py
+from typing import Dict, List
+from dataclasses import dataclass, fields
+
+
+@dataclass(slots=True)
+class PatientData:
+    """Structured patient data extracted from form"""
+    name: str = ""
+    age: int = 0
+    gender: str = ""
+    weight: str = ""
+    chief_complaint: str = ""
+    medications: List[str] = None
+    allergies: str = ""
+    vital_signs: Dict[str, str] = None
+    medical_history: str = ""
+    social_history: str = ""
+
+    def __post_init__(self):
+        if self.medications is None:
+            self.medications = []
+        if self.vital_signs is None:
+            self.vital_signs = {}
+
+    def to_dict(self) -> Dict:
+        """Field dict as saved in records (same result as dataclasses.asdict, without its recursive deep copy)"""
+        return {
+            "name": self.name,
+            "age": self.age,
+            "gender": self.gender,
+            "weight": self.weight,
+            "chief_complaint": self.chief_complaint,
+            "medications": list(self.medications),
+            "allergies": self.allergies,
+            "vital_signs": dict(self.vital_signs),
+            "medical_history": self.medical_history,
+            "social_history": self.social_history,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PatientData":
+        """Rebuild from a record's patient_data, ignoring keys that are not fields"""
+        return cls(**{name: data[name] for name in FIELD_NAMES if name in data})
+
+
+FIELD_NAMES = tuple(field.name for field in fields(PatientData))
@@ -0,0 +1,246 @@
+# app/src/healthform/near_duplicates.py
+"""
+Near-duplicate reuse of recent model analyses.
+
+Follow-up visits often repeat a form almost unchanged: same medications and
+allergies, a new date, slightly different vitals. The exact-hash
+AnalysisCache misses those. NearDuplicateIndex keeps the model part of
+recent analyses, blocked on the fields that must match exactly and
+signed with a MinHash of the free text, and finds candidates through LSH
+buckets, so a lookup touches only a handful of entries however many are
+indexed.
+
+A candidate is reused only for the same patient, and only if nothing
+that can change the model's answer differs:
+  - the same patient name (case, spacing and punctuation ignored); forms
+    without a name are never matched;
+  - the same medications (canonical name, dose, frequency), allergies,
+    sex and age band;
+  - the same rule-engine outcome (route, focus, reasons and severity of
+    every rule finding), so vitals may drift only within the same
+    threshold band and no new red-flag complaint term may appear;
+  - complaint and history text at least ``threshold`` similar (estimated
+    Jaccard similarity of their word and word-pair tokens).
+Weight and exact vital readings may differ. The caller re-runs the
+rule checks on the new form and merges them into the reused model
+findings, so the changed fields are still checked.
+
+Usage:
+    index = NearDuplicateIndex()
+    ai = ClinicalAI(client, near_duplicates=index)
+"""
+import re
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .models import PatientData
+from .medications import normalize_medications
+from .rules import ANALYSIS_CATEGORIES, PreScreenResult
+
+SIGNATURE_SIZE = 64
+BANDS = 16  # 4 signature rows per band: texts above ~0.5 Jaccard usually share a bucket
+DEFAULT_THRESHOLD = 0.9
+AGE_BAND_YEARS = 5
+
+# One 32-bit hash function per signature slot, all read from a single SHAKE-128 digest per token
+_HASH_VALUES = struct.Struct(f"<{SIGNATURE_SIZE}I")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class NearDuplicate:
+    """A reusable earlier analysis and how the new form differs from it"""
+    source: str
+    similarity: float
+    changed: List[str]
+    analysis: Dict
+
+
+@dataclass
+class _Entry:
+    source: str
+    outcome: Tuple
+    signature: Tuple[int, ...]
+    fields: Dict
+    analysis: Dict
+    created_at: float = field(default_factory=time.time)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token: str) -> Tuple[int, ...]:
+    # Stable across processes, unlike hash(); tokens (drug names, common words) repeat across forms
+    return _HASH_VALUES.unpack(hashlib.shake_128(token.encode("utf-8")).digest(_HASH_VALUES.size))
+
+
+def minhash(tokens: FrozenSet[str]) -> Tuple[int, ...]:
+    """MinHash signature of a token set: the minimum of each of SIGNATURE_SIZE hash functions over the tokens"""
+    if not tokens:
+        return (0,) * SIGNATURE_SIZE
+    return tuple(map(min, zip(*map(_token_hashes, tokens))))
+
+
+def signature_similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the token sets behind two signatures"""
+    return sum(a == b for a, b in zip(left, right)) / len(left)
+
+
+def _medication_key(patient_data: PatientData) -> FrozenSet[Tuple[str, str, str]]:
+    return frozenset((med.name, med.dose.lower(), med.frequency.lower())
+                     for med in normalize_medications(patient_data.medications))
+
+
+def _normalized_fields(patient_data: PatientData) -> Dict:
+    """Field values as compared for the "changed" report; cosmetic differences removed"""
+    data = patient_data.to_dict()
+    for name in ("name", "gender", "weight", "chief_complaint", "allergies", "medical_history", "social_history"):
+        data[name] = " ".join(_words(data[name]))
+    data["medications"] = sorted(_medication_key(patient_data))
+    data["vital_signs"] = {key: value.strip() for key, value in (data["vital_signs"] or {}).items() if value}
+    return data
+
+
+def patient_key(patient_data: PatientData) -> str:
+    """Normalized patient name; analyses are only reused for the same patient"""
+    return " ".join(_words(patient_data.name))
+
+
+def outcome_key(patient_data: PatientData, screen: PreScreenResult) -> Tuple:
+    """Everything that must match exactly before an analysis can be reused"""
+    return (
+        patient_key(patient_data),
+        _medication_key(patient_data),
+        tuple(_words(patient_data.allergies)),
+        (patient_data.gender or "").lower(),
+        patient_data.age // AGE_BAND_YEARS,
+        screen.route,
+        tuple(screen.focus),
+        tuple(screen.reasons),
+        tuple((category, tuple(sorted(item.get("severity", "") for item in screen.analysis.get(category, []))))
+              for category in ANALYSIS_CATEGORIES),
+    )
+
+
+def shingles(patient_data: PatientData) -> FrozenSet[str]:
+    """Word and word-pair tokens of the free text (complaint, history) a signature is computed from"""
+    tokens = set()
+    for name in ("chief_complaint", "medical_history"):
+        words = _words(getattr(patient_data, name))
+        tokens.update(f"{name}:{word}" for word in words)
+        tokens.update(f"{name}:{a}_{b}" for a, b in zip(words, words[1:]))
+    return frozenset(tokens)
+
+
+class NearDuplicateIndex:
+    """
+    In-memory MinHash/LSH index of recent model analyses.
+
+    Holds at most ``max_entries`` analyses, dropping the oldest first, and
+    ignores entries older than ``max_age_seconds``. Safe to share between
+    threads.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_entries: int = 5000,
+                 max_age_seconds: Optional[float] = 24 * 3600):
+        if SIGNATURE_SIZE % BANDS:
+            raise ValueError("SIGNATURE_SIZE must be a multiple of BANDS")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._rows = SIGNATURE_SIZE // BANDS
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple, set] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _bands(self, block: int, signature: Tuple[int, ...]):
+        # Buckets are per outcome block: only entries that could be reused at all share one
+        rows = self._rows
+        return [(block, band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+    def _remove(self, source: str):
+        entry = self._entries.pop(source)
+        for bucket_key in self._bands(hash(entry.outcome), entry.signature):
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(source)
+                if not bucket:
+                    del self._buckets[bucket_key]
+
+    def add(self, patient_data: PatientData, screen: PreScreenResult, analysis: Dict,
+            source: Optional[str] = None) -> str:
+        """Index the model findings of an analysis (rule findings are recomputed on reuse)"""
+        fields = _normalized_fields(patient_data)
+        if source is None:
+            source = hashlib.sha256(repr(sorted(fields.items())).encode("utf-8")).hexdigest()[:16]
+        entry = _Entry(
+            source=source,
+            outcome=outcome_key(patient_data, screen),
+            signature=minhash(shingles(patient_data)),
+            fields=fields,
+            analysis={category: list(analysis.get(category, [])) for category in ANALYSIS_CATEGORIES},
+        )
+        with self._lock:
+            if source in self._entries:
+                self._remove(source)
+            self._entries[source] = entry
+            for bucket_key in self._bands(hash(entry.outcome), entry.signature):
+                self._buckets.setdefault(bucket_key, set()).add(source)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return source
+
+    def find(self, patient_data: PatientData, screen: PreScreenResult) -> Optional[NearDuplicate]:
+        """The most similar indexed analysis that can stand in for this form's, or None"""
+        if not patient_key(patient_data):
+            # No identity to match on: another anonymous form may be another patient
+            with self._lock:
+                self.misses += 1
+            return None
+        outcome = outcome_key(patient_data, screen)
+        signature = minhash(shingles(patient_data))
+        oldest = time.time() - self.max_age_seconds if self.max_age_seconds is not None else None
+        best, best_similarity = None, self.threshold
+        with self._lock:
+            candidates = set()
+            for bucket_key in self._bands(hash(outcome), signature):
+                candidates.update(self._buckets.get(bucket_key, ()))
+            for source in candidates:
+                entry = self._entries[source]
+                if entry.outcome != outcome or (oldest is not None and entry.created_at < oldest):
+                    continue
+                similarity = signature_similarity(signature, entry.signature)
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        fields = _normalized_fields(patient_data)
+        changed = [name for name, value in fields.items() if best.fields.get(name) != value]
+        analysis = {category: [dict(item) if isinstance(item, dict) else item for item in items]
+                    for category, items in best.analysis.items()}
+        return NearDuplicate(best.source, round(best_similarity, 3), changed, analysis)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,157 @@
+# app/src/healthform/parallel.py
+"""
+Multi-process form parsing for large batches.
+
+MedicalFormParser.extract_patient_data is pure-Python regex work, so
+threads share one core under the GIL. ParallelParser spreads chunks of
+forms over a process pool instead. Each worker sends its chunk back as one
+PatientTable buffer (a few arrays plus string vocabularies) rather than a
+pickled list of PatientData objects, so moving results between processes
+stays cheap next to the parsing itself. Chunks are submitted a bounded
+number at a time and collected in submission order: output order matches
+input order and memory stays flat however many forms there are.
+
+Usage:
+    from healthform.parallel import ParallelParser
+    with ParallelParser(workers=4) as parser:
+        for patient_data in parser.parse_texts(form_texts):
+            ...
+"""
+import os
+import pathlib
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .models import PatientData
+from .parser import MedicalFormParser
+from .columnar import PatientTable
+from . import instrumentation
+
+DEFAULT_CHUNK_SIZE = 256
+
+
+def _init_worker():
+    # Spans recorded in a worker process would never reach the parent's summary
+    instrumentation.configure(instrumentation.MODE_OFF)
+
+
+def _parse_items(items: List[str], read_files: bool) -> Tuple[List[PatientData], Dict[int, str]]:
+    patients = []
+    errors = {}
+    for position, item in enumerate(items):
+        try:
+            text = pathlib.Path(item).read_text(encoding="utf-8") if read_files else item
+            patients.append(MedicalFormParser.extract_patient_data(text))
+        except Exception as e:
+            errors[position] = str(e)
+            patients.append(PatientData())
+    return patients, errors
+
+
+def parse_chunk(items: List[str], read_files: bool = False) -> Tuple[bytes, Dict[int, str]]:
+    """
+    Parse a chunk of form texts (or form file paths) into a PatientTable buffer.
+
+    Returns (table bytes, {position: error}); a form that fails keeps its
+    position as an empty row so the chunk stays aligned with its input.
+    """
+    patients, errors = _parse_items(items, read_files)
+    return PatientTable.from_patients(patients).to_bytes(), errors
+
+
+class ParallelParser:
+    """Order-preserving chunked parsing over a process pool; one worker parses in-process"""
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_chunks_in_flight: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = max(1, chunk_size)
+        self.max_chunks_in_flight = max_chunks_in_flight or self.workers * 2
+        self._executor = None
+
+    def __enter__(self) -> "ParallelParser":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self._executor
+
+    def map_chunks(self, items: Iterable[str], read_files: bool = False
+                   ) -> Iterator[Tuple[List[str], Sequence[PatientData], Dict[int, str]]]:
+        """
+        Yield (chunk items, parsed rows, errors) per chunk, in input order.
+
+        Rows are a PatientTable decoded from the worker's buffer, or a plain
+        list when parsing in-process (no serialization round trip needed).
+        """
+        item_iter = iter(items)
+        chunks = iter(lambda: list(itertools.islice(item_iter, self.chunk_size)), [])
+        if self.workers == 1:
+            for chunk in chunks:
+                yield (chunk, *_parse_items(chunk, read_files))
+            return
+
+        pool = self._pool()
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(parse_chunk, chunk, read_files)))
+            if len(pending) >= self.max_chunks_in_flight:
+                yield self._collect(*pending.popleft())
+        while pending:
+            yield self._collect(*pending.popleft())
+
+    @staticmethod
+    def _collect(chunk, future) -> Tuple[List[str], PatientTable, Dict[int, str]]:
+        data, errors = future.result()
+        return chunk, PatientTable.from_bytes(data), errors
+
+    def parse_tables(self, texts: Iterable[str]) -> Iterator[PatientTable]:
+        """Parsed chunks as columnar tables, for callers that keep results in bulk"""
+        for _, rows, _ in self.map_chunks(texts):
+            yield rows if isinstance(rows, PatientTable) else PatientTable.from_patients(rows)
+
+    def parse_texts(self, texts: Iterable[str]) -> Iterator[PatientData]:
+        """PatientData for every form text, in input order"""
+        for _, rows, _ in self.map_chunks(texts):
+            yield from rows
+
+    def parse_sources(self, items: Iterable[Tuple[str, str]]
+                      ) -> Iterator[Tuple[str, Optional[PatientData], Optional[str]]]:
+        """(source, patient data, None) per (source, form text) pair in input order, or (source, None, error)"""
+        sources = deque()
+
+        def texts():
+            # Sources wait here only while their chunk is in flight
+            for source, text in items:
+                sources.append(source)
+                yield text
+
+        for chunk, rows, errors in self.map_chunks(texts()):
+            for position in range(len(chunk)):
+                source = sources.popleft()
+                if position in errors:
+                    yield source, None, errors[position]
+                else:
+                    yield source, rows[position], None
+
+    def parse_files(self, paths: Iterable[pathlib.Path]
+                    ) -> Iterator[Tuple[str, Optional[PatientData], Optional[str]]]:
+        """(path, patient data, None) per form file in input order, or (path, None, error) when it fails"""
+        for chunk, rows, errors in self.map_chunks((str(path) for path in paths), read_files=True):
+            for position, path in enumerate(chunk):
+                if position in errors:
+                    yield path, None, errors[position]
+                else:
+                    yield path, rows[position], None
@@ -0,0 +1,171 @@
+# app/src/healthform/parser.py
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .models import PatientData
+from .instrumentation import span
+
+# Medication table header used by the registered form templates
+MED_HEADER = "Medication Name | Dosage | Frequency | Prescribing Doctor"
+
+# Field labels and the field each one fills. Labels always end in ':'
+_FIELD_LABELS = {
+    "Patient Name": "name",
+    "Age": "age",
+    "Gender": "gender",
+    "Weight": "weight",
+    "Blood Pressure": "blood_pressure",
+    "Heart Rate": "heart_rate",
+    "Temperature": "temperature",
+    "Primary reason for today's visit": "chief_complaint",
+    "Drug Allergies": "allergies",
+    "Chronic Conditions": "medical_history",
+}
+
+# Every label in one alternation, compiled once at import time. Plain
+# literal branches (no named groups) let the regex engine skip ahead on
+# the branches' first characters instead of trying each label everywhere.
+_LABEL_RE = re.compile("(" + "|".join(re.escape(label) for label in _FIELD_LABELS) + "):")
+
+# Value patterns, anchored right after the label's ':'. Each has exactly one
+# capture group; templates.py reuses them inside its per-layout patterns.
+_VALUE_PATTERNS = {
+    "name": r"\s*([^\n\r]+)",
+    "age": r"\s*(\d+)",
+    "gender": r"\s*([MF])",
+    "weight": r"\s*([^\n\r]+)",
+    "chief_complaint": r"\s*\n([^-\n]+(?:\n[^-\n]+)*)",
+    "allergies": r"\s*\n([^\n\r]+)",
+    "blood_pressure": r"\s*(\d+\s*/\s*\d+)",
+    "heart_rate": r"\s*(\d+)",
+    "temperature": r"\s*([^\s\n]+)",
+    "medical_history": r"\s*\n([^\n\r]+)",
+}
+_VALUE_RES = {field: re.compile(pattern) for field, pattern in _VALUE_PATTERNS.items()}
+
+# A table header line whose first column names the medication, matched at a line start
+_MED_HEADER_RE = re.compile(r"[ \t]*(?:medications?|drugs?|medicines?)\b[^\r\n]*", re.IGNORECASE)
+
+# Consecutive table rows after the medication header, up to the first line without '|'
+_MED_TABLE_RE = re.compile(r"(?:\r\n|\n|\r)((?:[^\r\n]*\|[^\r\n]*(?:\r\n|\n|\r|$))*)")
+
+_LINE_END_RE = re.compile(r"\r\n|\n|\r")
+
+# Header cell keywords for the columns a medication entry is built from
+_MED_COLUMN_KEYWORDS = (
+    ("medication", "drug", "medicine", "name"),
+    ("dos", "strength"),
+    ("freq", "how often", "schedule", "directions"),
+)
+
+_VITAL_FIELDS = ("blood_pressure", "heart_rate", "temperature")
+
+
+@lru_cache(maxsize=64)
+def medication_columns(header: str) -> Tuple[Tuple[int, ...], int, int]:
+    """
+    Layout of a medication table from its header line.
+
+    Returns (positions of the name, dosage and frequency columns the header
+    has, name column, column count).
+    """
+    cells = [cell.strip().lower() for cell in header.split("|")]
+    positions = [
+        next((i for i, cell in enumerate(cells) if any(keyword in cell for keyword in keywords)), None)
+        for keywords in _MED_COLUMN_KEYWORDS
+    ]
+    name_column = positions[0] if positions[0] is not None else 0
+    return tuple(i for i in positions if i is not None), name_column, len(cells)
+
+
+def medication_rows(table: str, columns: Tuple[Tuple[int, ...], int, int]) -> List[str]:
+    """"name dosage frequency" for each table row with the header's column count and a name"""
+    positions, name_column, width = columns
+    medications = []
+    for line in table.splitlines():
+        parts = line.split("|")
+        if len(parts) == width and parts[name_column].strip():
+            medications.append(" ".join([parts[i].strip() for i in positions]).strip())
+    return medications
+
+
+def _find_med_table(form_text: str) -> List[str]:
+    """Medication entries from the first table under a recognisable header line, or []"""
+    # Only lines containing '|' can be a table header; str.find jumps between them
+    pipe = form_text.find("|")
+    while pipe != -1:
+        line_start = max(form_text.rfind("\n", 0, pipe), form_text.rfind("\r", 0, pipe)) + 1
+        header_match = _MED_HEADER_RE.match(form_text, line_start)
+        if header_match:
+            table_match = _MED_TABLE_RE.match(form_text, header_match.end())
+            if not table_match:
+                return []
+            return medication_rows(table_match.group(1), medication_columns(header_match.group(0)))
+        line_end = _LINE_END_RE.search(form_text, pipe)
+        pipe = form_text.find("|", line_end.end()) if line_end else -1
+    return []
+
+
+def build_patient_data(found: Dict[str, str], medications: List[str]) -> PatientData:
+    """PatientData from raw field captures (keyed by field name) and medication entries"""
+    data = PatientData()
+    data.name = (found.get("name") or "").strip()
+    if found.get("age"):
+        data.age = int(found["age"])
+    if found.get("gender"):
+        data.gender = "Male" if found["gender"] == "M" else "Female"
+    data.weight = (found.get("weight") or "").strip()
+    data.chief_complaint = (found.get("chief_complaint") or "").strip()
+    data.allergies = (found.get("allergies") or "").strip()
+    data.medical_history = (found.get("medical_history") or "").strip()
+    data.medications = medications
+
+    if any(found.get(field) is not None for field in _VITAL_FIELDS):
+        data.vital_signs = {field: found.get(field) or '' for field in _VITAL_FIELDS}
+
+    return data
+
+
+def extract_generic(form_text: str) -> PatientData:
+    """Single label-routing pass for any layout; the fallback for unrecognised templates"""
+    found = {}
+
+    # Walk the form once, routing each label hit to its precompiled
+    # value pattern. The first match of each field wins.
+    for label_match in _LABEL_RE.finditer(form_text):
+        field = _FIELD_LABELS[label_match.group(1)]
+        if field not in found:
+            value_match = _VALUE_RES[field].match(form_text, label_match.end())
+            if value_match:
+                found[field] = value_match.group(1)
+
+    return build_patient_data(found, _find_med_table(form_text))
+
+
+class MedicalFormParser:
+    """Parses medical forms and extracts structured data"""
+
+    @staticmethod
+    def extract_patient_data(form_text: str) -> PatientData:
+        """
+        Extract structured data from medical form text in a single pass.
+
+        Forms from a registered layout go through that template's compiled
+        extractor; anything else falls back to extract_generic.
+        """
+        with span("parse") as fields:
+            data, fields["template"] = _template_registry().extract(form_text)
+            return data
+
+
+_registry = None
+
+
+def _template_registry():
+    global _registry
+    if _registry is None:
+        # templates.py builds its extractors from this module's patterns
+        from .templates import default_registry
+        _registry = default_registry()
+    return _registry
@@ -0,0 +1,272 @@
+# app/src/healthform/routing.py
+"""
+Model tiers for clinical analysis: cheapest tier first, escalate flagged cases.
+
+Each form that gets past the cache goes to the cheapest tier that can
+handle it:
+
+    rules      the rule pre-screen alone (routine forms, no model call)
+    fast       a small, fast model with a tighter completion budget
+    escalated  a larger model with the full budget
+
+A form skips the fast tier when the rule screen flags it: polypharmacy,
+abnormal typed vitals or a red-flag complaint term. A fast-tier reply is
+sent on to the larger model when it is ambiguous. That means it did not
+decode as clean JSON, it hedges ("unclear", "cannot determine", ...), or
+it raises a high-severity finding that the rules did not, which the
+larger model should confirm.
+
+RoutingStats counts forms per tier and keeps per-tier latency
+percentiles, tokens and estimated cost. It also records the escalation
+rate and the reasons behind it, so the RoutingPolicy thresholds can be
+tuned against real traffic. HEALTHFORM_FAST_MODEL and
+HEALTHFORM_ESCALATION_MODEL override the default models.
+
+Usage:
+    router = TierRouter(policy=RoutingPolicy(polypharmacy=6, abnormal_vitals=2))
+    clinical_ai = ClinicalAI(client, router=router)
+    ...
+    print(format_routing_summary(router.stats.summary()))
+"""
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .instrumentation import LatencyHistogram, event
+from .rules import POLYPHARMACY_THRESHOLD, PreScreenResult
+
+TIER_RULES = "rules"
+TIER_FAST = "fast"
+TIER_ESCALATED = "escalated"
+TIERS = (TIER_RULES, TIER_FAST, TIER_ESCALATED)
+
+FAST_MODEL = os.getenv("HEALTHFORM_FAST_MODEL", "gpt-3.5-turbo")
+ESCALATION_MODEL = os.getenv("HEALTHFORM_ESCALATION_MODEL", "gpt-4o")
+# Completion ceilings: the fast tier answers tersely, the larger model gets the full allowance
+FAST_MAX_TOKENS = 800
+ESCALATION_MAX_TOKENS = 1200
+
+# USD per million (prompt, completion) tokens; models not listed are costed at zero
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+}
+
+# Wording that means the fast model could not settle the question
+HEDGE_TERMS = (
+    "unclear", "uncertain", "cannot determine", "cannot be determined", "unable to determine",
+    "unable to assess", "insufficient information", "not enough information", "difficult to assess",
+)
+
+_HEDGE_RE = re.compile("|".join(re.escape(term) for term in HEDGE_TERMS), re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """A model and the completion ceiling it is called with"""
+    name: str
+    model: str
+    max_tokens: int
+
+    def cost(self, usage: Optional[Dict]) -> float:
+        """Estimated USD for one call's token usage"""
+        if not usage:
+            return 0.0
+        prompt_price, completion_price = MODEL_PRICES.get(self.model, (0.0, 0.0))
+        return ((usage.get("prompt_tokens") or 0) * prompt_price
+                + (usage.get("completion_tokens") or 0) * completion_price) / 1e6
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """Escalation thresholds; a form meeting any screen threshold skips the fast tier"""
+    polypharmacy: int = POLYPHARMACY_THRESHOLD  # medications on the form
+    abnormal_vitals: int = 1                    # vitals outside their thresholds
+    red_flags: bool = True                      # red-flag complaint terms
+    hedging: bool = True                        # fast reply hedges
+    unconfirmed_high: bool = True               # fast reply has a high finding the rules lack
+
+
+def reason_code(reason: str) -> str:
+    """Reason category: the text before the colon ("polypharmacy: 7 medications" -> "polypharmacy")"""
+    return reason.split(":", 1)[0]
+
+
+@dataclass
+class _TierStats:
+    calls: int = 0
+    failures: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+class RoutingStats:
+    """Thread-safe per-tier call latency, tokens and cost, plus where forms ended up and why"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tiers: Dict[str, _TierStats] = {}
+        self.forms: Counter = Counter()
+        self.escalations: Counter = Counter()
+        self.reasons: Counter = Counter()
+
+    def record_call(self, tier: ModelTier, seconds: float, usage: Optional[Dict] = None, ok: bool = True):
+        with self._lock:
+            stats = self.tiers.get(tier.name)
+            if stats is None:
+                stats = self.tiers[tier.name] = _TierStats()
+            stats.calls += 1
+            stats.latency.record(seconds)
+            if not ok:
+                stats.failures += 1
+            elif usage:
+                stats.prompt_tokens += usage.get("prompt_tokens") or 0
+                stats.completion_tokens += usage.get("completion_tokens") or 0
+                stats.cost += tier.cost(usage)
+
+    def record_form(self, tier: str, escalation: Optional[str] = None, reasons: Iterable[str] = ()):
+        """Where one form's analysis came from; ``escalation`` is "screen", "reply" or "failed" """
+        with self._lock:
+            self.forms[tier] += 1
+            if escalation is not None:
+                self.escalations[escalation] += 1
+                self.reasons.update(reason_code(reason) for reason in reasons)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            model_forms = sum(count for tier, count in self.forms.items() if tier != TIER_RULES)
+            escalated = self.escalations["screen"] + self.escalations["reply"]
+            fast_replies = self.forms[TIER_FAST] + self.escalations["reply"]
+            tiers = {}
+            for name, stats in sorted(self.tiers.items(), key=lambda item: TIERS.index(item[0])):
+                tiers[name] = {
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                    "cost_usd": round(stats.cost, 6),
+                    "latency": stats.latency.summary(),
+                }
+            return {
+                "forms": dict(self.forms),
+                "escalations": dict(self.escalations),
+                # Share of model-analyzed forms answered by the larger model, and of fast replies sent on
+                "escalation_rate": round(escalated / model_forms, 4) if model_forms else 0.0,
+                "reply_escalation_rate": (round((self.escalations["reply"] + self.escalations["failed"]) / fast_replies, 4)
+                                          if fast_replies else 0.0),
+                "reasons": dict(self.reasons.most_common()),
+                "tiers": tiers,
+                "cost_usd": round(sum(stats.cost for stats in self.tiers.values()), 6),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.tiers.clear()
+            self.forms.clear()
+            self.escalations.clear()
+            self.reasons.clear()
+
+
+class TierRouter:
+    """
+    Picks the model tier for a screened form and decides whether a fast
+    reply needs the larger model. TierRouter.single sends every model
+    call to one model.
+    """
+
+    def __init__(self, fast: Optional[ModelTier] = None, escalated: Optional[ModelTier] = None,
+                 policy: Optional[RoutingPolicy] = None):
+        self.fast = fast or ModelTier(TIER_FAST, FAST_MODEL, FAST_MAX_TOKENS)
+        self.escalated = escalated or ModelTier(TIER_ESCALATED, ESCALATION_MODEL, ESCALATION_MAX_TOKENS)
+        self.policy = policy or RoutingPolicy()
+        self.stats = RoutingStats()
+
+    @classmethod
+    def single(cls, model: str, max_tokens: int = ESCALATION_MAX_TOKENS) -> "TierRouter":
+        """Every model call to one model, never escalated"""
+        router = cls(ModelTier(TIER_FAST, model, max_tokens))
+        router.escalated = None
+        return router
+
+    def screen_reasons(self, screen: Optional[PreScreenResult]) -> List[str]:
+        """Why a screened form should skip the fast tier (empty: start with the fast tier)"""
+        if screen is None:
+            return []
+        policy = self.policy
+        reasons = []
+        if screen.medication_count >= policy.polypharmacy:
+            reasons.append(f"polypharmacy: {screen.medication_count} medications")
+        if policy.abnormal_vitals and screen.abnormal_vitals >= policy.abnormal_vitals:
+            reasons.append(f"abnormal vitals: {screen.abnormal_vitals}")
+        if policy.red_flags and screen.red_flag:
+            reasons.append(f"red flag: {screen.red_flag}")
+        return reasons
+
+    def initial(self, screen: Optional[PreScreenResult]) -> Tuple[ModelTier, List[str]]:
+        """(tier for the first model call, reasons it is not the fast tier)"""
+        if self.escalated is None:
+            return self.fast, []
+        reasons = self.screen_reasons(screen)
+        if not reasons:
+            return self.fast, []
+        event("escalated", stage="screen", reason=reason_code(reasons[0]))
+        return self.escalated, reasons
+
+    def review(self, tier: ModelTier, screen: Optional[PreScreenResult], analysis: Dict,
+               issues: List[str]) -> List[str]:
+        """Why a fast-tier reply should go on to the larger model (empty: keep it)"""
+        if tier is not self.fast or self.escalated is None:
+            return []
+        reasons = [f"decode: {issue}" for issue in issues]
+        items = [item for items in analysis.values() if isinstance(items, list) for item in items]
+        if self.policy.hedging:
+            for item in items:
+                hedge = _HEDGE_RE.search(str(item.get("message", "")))
+                if hedge:
+                    reasons.append(f"hedging: {hedge.group(0).lower()}")
+                    break
+        # Without a rule screen there is nothing to confirm a high finding against
+        if self.policy.unconfirmed_high and screen is not None and not _has_high(screen.analysis) \
+                and _has_high(analysis):
+            reasons.append("unconfirmed high: high-severity finding the rules did not raise")
+        if reasons:
+            event("escalated", stage="reply", reason=reason_code(reasons[0]))
+        return reasons
+
+
+def _has_high(analysis: Dict) -> bool:
+    return any(isinstance(item, dict) and item.get("severity") == "high"
+               for items in analysis.values() if isinstance(items, list) for item in items)
+
+
+def routing_record(tier: ModelTier, reasons: List[str], cost: float, escalated_from: Optional[str] = None) -> Dict:
+    """The "routing" entry stored with an analysis"""
+    record = {"tier": tier.name, "model": tier.model, "reasons": reasons, "cost_usd": round(cost, 6)}
+    if escalated_from:
+        record["escalated_from"] = escalated_from
+    return record
+
+
+def format_routing_summary(data: Dict) -> str:
+    """Human-readable table of a RoutingStats.summary()"""
+    lines = [f"{'tier':<10} {'calls':>7} {'failed':>7} {'p50 ms':>9} {'p95 ms':>9} {'tokens':>10} {'cost $':>10}"]
+    for name, stats in data["tiers"].items():
+        latency = stats["latency"]
+        lines.append(f"{name:<10} {stats['calls']:>7} {stats['failures']:>7} {latency.get('p50_ms', 0):>9.1f} "
+                     f"{latency.get('p95_ms', 0):>9.1f} {stats['prompt_tokens'] + stats['completion_tokens']:>10} "
+                     f"{stats['cost_usd']:>10.4f}")
+    lines.append(f"forms by tier: {data['forms']}")
+    lines.append(f"escalation rate: {data['escalation_rate']:.1%} of model forms "
+                 f"({data['reply_escalation_rate']:.1%} of fast replies); {data['escalations']}")
+    if data["reasons"]:
+        lines.append(f"escalation reasons: {data['reasons']}")
+    lines.append(f"estimated cost: ${data['cost_usd']:.4f}")
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+# app/src/healthform/rules.py
+"""
+Deterministic clinical pre-screen that runs before any LLM call.
+
+The rule engine checks the drug-interaction index, numeric vital-sign
+thresholds and required fields, then decides how much of the form still
+needs the model: nothing (routine form, triaged locally), only some
+analysis categories (narrower prompt), or everything. The interaction
+table only lists pairs known to interact, so a pair it has no entry for
+is unchecked rather than safe: any form with two or more medications,
+or with a drug the tables do not recognize, has the model review its
+interactions.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .models import PatientData
+from .medications import InteractionIndex, default_interaction_index, parse_medication
+from .vitals import VITAL_THRESHOLDS, ThresholdTable, parse_vitals
+
+ROUTE_LOCAL = "local"      # rules alone are enough, no LLM call
+ROUTE_FOCUSED = "focused"  # LLM only for the categories in PreScreenResult.focus
+ROUTE_FULL = "full"        # full LLM analysis
+
+ANALYSIS_CATEGORIES = ("critical_alerts", "drug_interactions", "missing_info", "recommendations")
+
+# Complaint terms that always warrant full model review
+RED_FLAG_TERMS = (
+    "chest pain", "shortness of breath", "difficulty breathing", "syncope", "fainting", "seizure",
+    "stroke", "numbness", "slurred speech", "confusion", "suicidal", "overdose", "bleeding",
+    "vomiting blood", "severe headache", "worst headache", "anaphylaxis", "unconscious",
+)
+
+POLYPHARMACY_THRESHOLD = 5
+ELDERLY_AGE = 65
+
+_RED_FLAG_RE = re.compile("|".join(re.escape(term) for term in RED_FLAG_TERMS), re.IGNORECASE)
+
+
+@dataclass
+class PreScreenResult:
+    """Local findings plus the routing decision for the LLM"""
+    analysis: Dict
+    route: str
+    focus: List[str] = field(default_factory=list)
+    reasons: List[str] = field(default_factory=list)
+    # Form signals the model-tier router weighs
+    medication_count: int = 0
+    abnormal_vitals: int = 0
+    red_flag: Optional[str] = None
+
+    @property
+    def needs_llm(self) -> bool:
+        return self.route != ROUTE_LOCAL
+
+
+def _empty_analysis() -> Dict:
+    return {category: [] for category in ANALYSIS_CATEGORIES}
+
+
+class RuleEngine:
+    """Runs the deterministic checks and routes the form to local, focused or full analysis"""
+
+    def __init__(self, interactions: Optional[InteractionIndex] = None, vital_thresholds=VITAL_THRESHOLDS):
+        self.interactions = default_interaction_index() if interactions is None else interactions
+        self.vital_thresholds = ThresholdTable(vital_thresholds)
+
+    def check_interactions(self, medications: List[str]) -> List[Dict]:
+        """One index lookup per pair of normalized medication names"""
+        return [{"severity": alert["severity"], "message": alert["message"]}
+                for alert in self.interactions.check(medications)]
+
+    def unrecognized_medications(self, medications: List[str]) -> List[str]:
+        """Entries whose drug is in neither the alias tables nor this engine's interaction index"""
+        unrecognized = []
+        for entry in medications:
+            medication = parse_medication(entry)
+            if not (medication.recognized or medication.name in self.interactions.known_drugs):
+                unrecognized.append(entry)
+        return unrecognized
+
+    def check_vitals(self, vital_signs: Dict[str, str]) -> List[Dict]:
+        """First matching threshold per measurement, in table order (most severe rules first)"""
+        return self.vital_thresholds.evaluate(parse_vitals(vital_signs), vital_signs)
+
+    def check_missing(self, patient_data: PatientData) -> List[Dict]:
+        missing = []
+        if not patient_data.name:
+            missing.append("Patient name")
+        if not patient_data.age:
+            missing.append("Patient age")
+        if not patient_data.chief_complaint:
+            missing.append("Chief complaint")
+        if not patient_data.allergies:
+            missing.append("Drug allergies")
+        vitals = patient_data.vital_signs or {}
+        for key, label in (("blood_pressure", "Blood pressure"), ("heart_rate", "Heart rate"),
+                           ("temperature", "Temperature")):
+            if not vitals.get(key):
+                missing.append(label)
+        return [{"severity": "medium", "message": f"{label} not documented"} for label in missing]
+
+    def screen(self, patient_data: PatientData) -> PreScreenResult:
+        """Run every rule and decide which analysis categories still need the model"""
+        analysis = _empty_analysis()
+        focus = set()
+        reasons = []
+
+        if patient_data.age > ELDERLY_AGE:
+            analysis["critical_alerts"].append({
+                "severity": "medium",
+                "message": f"Elderly patient (age {patient_data.age}) requires careful monitoring"
+            })
+
+        vital_alerts = self.check_vitals(patient_data.vital_signs)
+        analysis["drug_interactions"].extend(self.check_interactions(patient_data.medications))
+        analysis["critical_alerts"].extend(vital_alerts)
+        analysis["missing_info"].extend(self.check_missing(patient_data))
+
+        # No table entry for a pair means the pair is unchecked, not cleared
+        medication_count = len(patient_data.medications)
+        if medication_count > 1:
+            focus.add("drug_interactions")
+            reasons.append(f"{medication_count} medications")
+
+        # Nor can the table say anything about a drug it does not know
+        unrecognized = self.unrecognized_medications(patient_data.medications)
+        if unrecognized:
+            focus.add("drug_interactions")
+            reasons.append(f"unrecognized medication(s): {', '.join(entry.strip() for entry in unrecognized)}")
+
+        complaint_flag = _RED_FLAG_RE.search(patient_data.chief_complaint or "")
+        if complaint_flag:
+            focus.update(("critical_alerts", "recommendations"))
+            reasons.append(f"red-flag complaint: {complaint_flag.group(0).lower()}")
+
+        if any(alert["severity"] == "high"
+               for alert in analysis["critical_alerts"] + analysis["drug_interactions"]):
+            focus.update(ANALYSIS_CATEGORIES)
+            reasons.append("high-severity rule finding")
+
+        if patient_data.medications:
+            analysis["recommendations"].append({
+                "severity": "low",
+                "message": "Complete medication reconciliation recommended"
+            })
+
+        signals = {"medication_count": medication_count, "abnormal_vitals": len(vital_alerts),
+                   "red_flag": complaint_flag.group(0).lower() if complaint_flag else None}
+        if not focus:
+            return PreScreenResult(analysis, ROUTE_LOCAL, reasons=["routine form"], **signals)
+        if focus >= set(ANALYSIS_CATEGORIES):
+            return PreScreenResult(analysis, ROUTE_FULL, list(ANALYSIS_CATEGORIES), reasons, **signals)
+        return PreScreenResult(analysis, ROUTE_FOCUSED, [c for c in ANALYSIS_CATEGORIES if c in focus], reasons,
+                               **signals)
+
+
+def merge_analyses(primary: Dict, extra: Dict) -> Dict:
+    """Add findings from extra to primary, skipping messages primary already has"""
+    merged = {category: list(primary.get(category, [])) for category in ANALYSIS_CATEGORIES}
+    for category in ANALYSIS_CATEGORIES:
+        seen = {str(item.get("message", "")).lower() for item in merged[category] if isinstance(item, dict)}
+        for item in extra.get(category, []):
+            if str(item.get("message", "")).lower() not in seen:
+                merged[category].append(item)
+    return merged
@@ -0,0 +1,376 @@
+# app/src/healthform/search.py
+"""
+Full-text and field search over saved analyses.
+
+SearchIndex keeps an inverted index, a SQLite FTS5 table in its own
+database file (WAL mode), over the fields analyses are looked up by:
+
+    name             patient name
+    medications      medication entries as written, plus their generic names
+                     ("Coumadin 5mg daily" is also found as warfarin)
+    allergies        allergies as written
+    complaint        chief complaint
+    critical, interactions, missing, recommendations
+                     alert messages, one field per analysis category
+
+The FTS5 table is contentless: it holds only the posting lists, so the
+index costs a fraction of the records it covers. A small table beside it
+maps each document to its record ID, save time, patient name and highest
+alert severity, which is all a result list shows. Matches come back newest
+first by walking the posting lists backwards and stop at the limit, so a
+query takes about a millisecond however many records are indexed; prefix
+terms and relevance order read whole posting lists and take longer.
+
+IndexedStore wraps any AnalysisStore and indexes each record as it is
+saved. SearchIndex.update adds the records a store has and the index
+lacks, such as ones saved by a separate worker process or before the
+index existed.
+
+Query syntax (terms are ANDed, case and accents ignored):
+    warfarin                 in any field
+    interactions:warfarin    in a field; alerts: covers every alert category
+    name:"jane doe"          phrase
+    metfor*                  prefix
+    medications:coumadin     brand names also match their generic name
+    -aspirin                 exclude
+    severity:high            an alert at or above this severity (severe counts as high;
+                             a floor, so it cannot be negated)
+
+Usage:
+    index = SearchIndex("data/search.sqlite3")
+    store = IndexedStore(open_store("data/analyses.sqlite3"), index)
+    index.update(store)
+    for hit in index.search("interactions:warfarin", limit=20):
+        print(hit["timestamp"], hit["patient_name"])
+
+    cd app/src
+    python -m healthform.search build --store ../../data/analyses.sqlite3 --index ../../data/search.sqlite3
+    python -m healthform.search query 'interactions:warfarin' --index ../../data/search.sqlite3
+"""
+import os
+import re
+import sys
+import sqlite3
+import pathlib
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .instrumentation import span
+from .medications import canonical_name, parse_medication
+from .severity import LEVELS, SEVERITY_SCALE_VERSION, severity_rank
+from .storage import AnalysisStore, iter_alerts, open_store
+
+# Alert category of an analysis -> its search field
+CATEGORY_FIELDS = {
+    "critical_alerts": "critical",
+    "drug_interactions": "interactions",
+    "missing_info": "missing",
+    "recommendations": "recommendations",
+}
+ALERT_FIELDS = tuple(CATEGORY_FIELDS.values())
+FIELDS = ("name", "medications", "allergies", "complaint") + ALERT_FIELDS
+
+# Field names a query may use, and the index fields each covers
+FIELD_ALIASES = {field: (field,) for field in FIELDS}
+FIELD_ALIASES.update({category: (field,) for category, field in CATEGORY_FIELDS.items()})
+FIELD_ALIASES.update({
+    "patient": ("name",),
+    "medication": ("medications",),
+    "meds": ("medications",),
+    "allergy": ("allergies",),
+    "interaction": ("interactions",),
+    "recommendation": ("recommendations",),
+    "alert": ALERT_FIELDS,
+    "alerts": ALERT_FIELDS,
+})
+ORDERS = ("newest", "relevance")
+# Matches ranked by relevance, newest first: bm25 is computed for each of them
+RELEVANCE_WINDOW = 2000
+
+# An optional "-", an optional "field:", then a "quoted phrase" (closing quote optional) or a bare word
+_TERM_RE = re.compile(r'(-?)(?:([A-Za-z_]+):)?(?:"([^"]*)"?|(\S+))')
+
+
+@dataclass(frozen=True)
+class Query:
+    """A parsed query: an FTS5 match expression (empty: match everything) and a severity floor"""
+    match: str = ""
+    min_severity: int = 0
+
+
+def _phrase(text: str, prefix: bool) -> str:
+    # Every term is quoted, so FTS5 operators and column syntax typed by the user are matched as text
+    return '"' + text.replace('"', '""') + '"' + (" *" if prefix else "")
+
+
+def parse_query(text: str) -> Query:
+    """Translate the query syntax into an FTS5 expression; raises ValueError for unknown or negated fields"""
+    include, exclude = [], []
+    min_severity = 0
+    for match in _TERM_RE.finditer(text or ""):
+        negate, field, phrase, word = match.groups()
+        value = phrase if phrase is not None else word
+        field = (field or "").lower()
+        if field == "severity":
+            if negate:
+                raise ValueError("severity: sets a minimum severity and cannot be negated")
+            rank = severity_rank(value)
+            if not rank:
+                raise ValueError(f"Unknown severity {value!r}; use one of {', '.join(reversed(LEVELS))}")
+            min_severity = max(min_severity, rank)
+            continue
+        if field and field not in FIELD_ALIASES:
+            raise ValueError(f"Unknown search field {field!r}; use one of {', '.join(sorted(FIELD_ALIASES))}")
+        prefix = value.endswith("*")
+        value = value.rstrip("*").strip()
+        if not re.search(r"\w", value):
+            continue
+        expression = _phrase(value, prefix)
+        # A brand or alternate drug name also matches the generic name records are indexed under
+        if not prefix and (not field or "medications" in FIELD_ALIASES[field]):
+            generic = canonical_name(value)
+            if generic != canonical_name(value, aliases={}):
+                expression = f"({expression} OR {_phrase(generic, False)})"
+        if field:
+            expression = "{" + " ".join(FIELD_ALIASES[field]) + "} : " + expression
+        (exclude if negate else include).append(expression)
+    if exclude and not include:
+        raise ValueError("A query needs at least one term to match besides the excluded ones")
+    expression = " AND ".join(include)
+    if exclude:
+        expression = f"({expression}) NOT ({' OR '.join(exclude)})"
+    return Query(expression, min_severity)
+
+
+def document_fields(record: Dict) -> Tuple[Dict[str, str], int]:
+    """(text of each search field, highest alert severity rank) for a saved record"""
+    patient = record.get("patient_data") or {}
+    entries = [str(entry) for entry in patient.get("medications") or [] if entry and str(entry).strip()]
+    generic = {parse_medication(entry).name for entry in entries}
+    alerts = {field: [] for field in ALERT_FIELDS}
+    max_severity = 0
+    for category, severity, message in iter_alerts(record.get("ai_analysis")):
+        alerts[CATEGORY_FIELDS.get(category, "recommendations")].append(message)
+        max_severity = max(max_severity, severity_rank(severity))
+    fields = {
+        "name": str(patient.get("name") or ""),
+        "medications": "\n".join(entries + sorted(generic)),
+        "allergies": str(patient.get("allergies") or ""),
+        "complaint": str(patient.get("chief_complaint") or ""),
+    }
+    fields.update((field, "\n".join(messages)) for field, messages in alerts.items())
+    return fields, max_severity
+
+
+class SearchIndex:
+    """Inverted index over saved analyses; safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS search_docs (
+                doc INTEGER PRIMARY KEY,
+                record_id TEXT NOT NULL UNIQUE,
+                timestamp TEXT NOT NULL DEFAULT '',
+                patient_name TEXT NOT NULL DEFAULT '',
+                max_severity INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_terms USING fts5(
+                {", ".join(FIELDS)}, content='', tokenize='unicode61 remove_diacritics 2'
+            );
+            """
+        )
+        self._conn.commit()
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SEVERITY_SCALE_VERSION:
+            self._clear()
+        self._insert_terms = (f"INSERT INTO search_terms (rowid, {', '.join(FIELDS)}) "
+                              f"VALUES (?, {', '.join('?' for _ in FIELDS)})")
+
+    def _clear(self):
+        """
+        Drop every document: the severity ranks they were indexed with are
+        out of date, and update() indexes the store again
+        """
+        with self._conn:
+            self._conn.execute("DELETE FROM search_docs")
+            self._conn.execute("INSERT INTO search_terms (search_terms) VALUES ('delete-all')")
+            self._conn.execute(f"PRAGMA user_version = {SEVERITY_SCALE_VERSION}")
+
+    def _insert(self, record_id: str, record: Dict) -> bool:
+        # Checked before the record is read, so catching up on a partly indexed store skips known IDs cheaply
+        if self._conn.execute("SELECT 1 FROM search_docs WHERE record_id = ?", (record_id,)).fetchone():
+            return False
+        fields, max_severity = document_fields(record)
+        cursor = self._conn.execute(
+            "INSERT INTO search_docs (record_id, timestamp, patient_name, max_severity) VALUES (?, ?, ?, ?)",
+            (record_id, record.get("timestamp", ""), fields["name"], max_severity),
+        )
+        self._conn.execute(self._insert_terms, (cursor.lastrowid, *(fields[field] for field in FIELDS)))
+        return True
+
+    def add(self, record_id: str, record: Dict) -> bool:
+        """Index one saved record; False if its ID is already indexed"""
+        with self._lock, self._conn:
+            return self._insert(record_id, record)
+
+    def add_many(self, records: Iterable[Tuple[str, Dict]], batch_size: int = 1000) -> int:
+        """Index (record_id, record) pairs, one transaction per batch; returns documents added"""
+        added = 0
+        batch = []
+        for item in records:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                added += self._add_batch(batch)
+                batch = []
+        if batch:
+            added += self._add_batch(batch)
+        return added
+
+    def _add_batch(self, batch) -> int:
+        with self._lock, self._conn:
+            return sum(self._insert(record_id, record) for record_id, record in batch)
+
+    def update(self, store: AnalysisStore) -> int:
+        """
+        Index the store's records that are not indexed yet; returns the
+        number added. An index that is as large as its store is taken to
+        be current, so this is a record count when nothing is missing.
+        """
+        if self.count() >= store.count():
+            return 0
+        return self.add_many((record["id"], record) for record in store.iter_records())
+
+    def search(self, query: str, limit: int = 50, min_severity: Optional[str] = None,
+               order: str = "newest") -> List[Dict]:
+        """
+        Summaries (id, timestamp, patient_name, max_severity) of the
+        records matching ``query``: newest indexed first, or best match
+        first with order="relevance". Relevance ranks only the newest
+        RELEVANCE_WINDOW matches, so a term found in most records still
+        answers in milliseconds.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order {order!r}; use one of {', '.join(ORDERS)}")
+        parsed = parse_query(query)
+        floor = max(parsed.min_severity, severity_rank(min_severity))
+        with span("search", order=order):
+            with self._lock:
+                if not parsed.match:
+                    rows = self._conn.execute(
+                        "SELECT record_id, timestamp, patient_name, max_severity FROM search_docs "
+                        "WHERE max_severity >= ? ORDER BY doc DESC LIMIT ?",
+                        (floor, limit),
+                    ).fetchall()
+                else:
+                    # Posting lists are walked newest document first and stop at the limit
+                    newest = ("SELECT d.record_id, d.timestamp, d.patient_name, d.max_severity{} "
+                              "FROM search_terms JOIN search_docs d ON d.doc = search_terms.rowid "
+                              "WHERE search_terms MATCH ? AND d.max_severity >= ? "
+                              "ORDER BY search_terms.rowid DESC LIMIT ?")
+                    if order == "relevance":
+                        rows = self._conn.execute(
+                            f"SELECT * FROM ({newest.format(', search_terms.rank')}) ORDER BY rank LIMIT ?",
+                            (parsed.match, floor, max(limit, RELEVANCE_WINDOW), limit),
+                        ).fetchall()
+                    else:
+                        rows = self._conn.execute(newest.format(""), (parsed.match, floor, limit)).fetchall()
+        return [{"id": r[0], "timestamp": r[1], "patient_name": r[2], "max_severity": r[3]} for r in rows]
+
+    def count(self) -> int:
+        # Documents are never removed, so the last document number is the count
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(doc), 0) FROM search_docs").fetchone()[0]
+
+    def optimize(self):
+        """Merge the index's b-trees into one, for the fastest queries after a bulk build"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT INTO search_terms (search_terms) VALUES ('optimize')")
+            # The merge rewrites most of the index; fold the write-ahead log back into the database file
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IndexedStore(AnalysisStore):
+    """An AnalysisStore that adds every record it saves to a SearchIndex"""
+
+    def __init__(self, store: AnalysisStore, index: SearchIndex):
+        self.store = store
+        self.index = index
+
+    def save_record(self, record: Dict, record_id: Optional[str] = None) -> str:
+        record_id = self.store.save_record(record, record_id)
+        with span("index"):
+            self.index.add(record_id, record)
+        return record_id
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        return self.store.get(record_id)
+
+    def list_recent(self, limit: int = 5) -> List[Dict]:
+        return self.store.list_recent(limit)
+
+    def count(self) -> int:
+        return self.store.count()
+
+    def iter_records(self) -> Iterator[Dict]:
+        return self.store.iter_records()
+
+    def __getattr__(self, name):
+        # Backend-specific methods such as find_by_patient or segments
+        return getattr(self.store, name)
+
+    def close(self):
+        self.store.close()
+        self.index.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m healthform.search", description="Search saved analyses")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = subcommands.add_parser("build", help="Index the store's records that are not indexed yet")
+    build_cmd.add_argument("--store", default=os.getenv("HEALTHFORM_STORE") or os.path.join("data", "analyses.sqlite3"),
+                           help="Store to index (open_store spec)")
+    build_cmd.add_argument("--optimize", action="store_true", help="Merge the index afterwards")
+    query_cmd = subcommands.add_parser("query", help="Print the records matching a query")
+    query_cmd.add_argument("query", help='e.g. \'interactions:warfarin\' or \'name:"jane doe" severity:high\'')
+    query_cmd.add_argument("--limit", type=int, default=20)
+    query_cmd.add_argument("--order", choices=ORDERS, default="newest")
+    for command in (build_cmd, query_cmd):
+        command.add_argument("--index", default=os.getenv("HEALTHFORM_SEARCH_INDEX") or os.path.join("data", "search.sqlite3"),
+                             help="Search index database path")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index)
+    if args.command == "build":
+        store = open_store(args.store)
+        added = index.update(store)
+        if args.optimize:
+            index.optimize()
+        print(f"Indexed {added} analyses into {args.index} ({index.count()} total)")
+        store.close()
+    else:
+        try:
+            hits = index.search(args.query, limit=args.limit, order=args.order)
+        except ValueError as e:
+            parser.error(str(e))
+        for hit in hits:
+            print(f"{hit['timestamp']}  {hit['max_severity']}  {hit['patient_name']:<30} {hit['id']}")
+        print(f"{len(hits)} match(es)")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# app/src/healthform/severity.py
+"""
+The one severity scale shared by decoding, storage, analytics and search.
+
+Models and older saved records spell severity many ways ("Severe",
+"WARNING", "Mild", ...). Every spelling maps onto four levels, ranked
+for indexing and filtering:
+
+    critical  4
+    high      3   severe, urgent, emergency
+    medium    2   moderate, warning, med
+    low       1   minor, mild, info, informational
+
+Analyses themselves use only high, medium and low (SEVERITIES). The
+decoder reports critical as high, but critical stays the top rank for
+saved records that carry it.
+
+Usage:
+    normalize_severity("Severe")   # "high"
+    severity_rank("WARNING")       # 2
+"""
+from typing import Dict
+
+# Levels an analysis item may carry
+SEVERITIES = ("high", "medium", "low")
+LEVELS = ("critical",) + SEVERITIES
+SEVERITY_RANKS: Dict[str, int] = {level: len(LEVELS) - i for i, level in enumerate(LEVELS)}
+
+# Other severity words models and saved records use, by level
+SEVERITY_ALIASES = {
+    "severe": "high", "urgent": "high", "emergency": "high",
+    "moderate": "medium", "warning": "medium", "med": "medium",
+    "minor": "low", "mild": "low", "info": "low", "informational": "low",
+}
+
+# Bumped whenever the mapping above changes, so ranks stored by earlier versions are recomputed
+SEVERITY_SCALE_VERSION = 1
+
+
+def normalize_severity(severity) -> str:
+    """Level of a severity word (case and spacing ignored); "" when it is not one we know"""
+    word = str(severity or "").strip().lower()
+    if word in SEVERITY_RANKS:
+        return word
+    return SEVERITY_ALIASES.get(word, "")
+
+
+def severity_rank(severity) -> int:
+    """Numeric rank of a severity word; 0 when unknown"""
+    return SEVERITY_RANKS.get(normalize_severity(severity), 0)
@@ -0,0 +1,352 @@
+# app/src/healthform/storage.py
+"""
+Storage backends for saved form analyses.
+
+SQLiteAnalysisStore is the default: one embedded database in WAL mode with
+indexes on save time, patient name and alert severity, so listing recent
+analyses stays an index walk however many records exist.
+JSONDirectoryStore keeps the original one-JSON-file-per-analysis layout.
+healthform.archive.SegmentArchive appends compressed records to
+size-rotated segment files, for long-term retention at a fraction of the
+disk space.
+
+One-time import of existing data/*.json files:
+    cd app/src
+    python -m healthform.storage import-json ../../data --db ../../data/analyses.sqlite3
+"""
+import os
+import sys
+import json
+import uuid
+import sqlite3
+import pathlib
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .models import PatientData
+from .decoding import normalize_analysis
+from .instrumentation import span
+from .severity import SEVERITY_SCALE_VERSION, severity_rank
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def new_record_id() -> str:
+    """Collision-free, roughly time-ordered record ID"""
+    return f"{datetime.now().strftime(TIMESTAMP_FORMAT + '_%f')}_{uuid.uuid4().hex[:8]}"
+
+
+def build_record(patient_data: PatientData, analysis: Dict, original_text: str,
+                 timestamp: Optional[str] = None) -> Dict:
+    """Saved-analysis record in the layout used by data/patient_form_*.json"""
+    return {
+        "timestamp": timestamp or datetime.now().strftime(TIMESTAMP_FORMAT),
+        "patient_data": patient_data.to_dict(),
+        "ai_analysis": analysis,
+        "original_form_text": original_text,
+    }
+
+
+def iter_alerts(analysis: Dict) -> Iterator[Tuple[str, str, str]]:
+    """Yield (category, severity, message) for every item in an analysis"""
+    for category, items in normalize_analysis(analysis or {}).items():
+        for item in items or []:
+            if isinstance(item, dict):
+                yield category, str(item.get("severity", "")), str(item.get("message", ""))
+            else:
+                yield category, "", str(item)
+
+
+class AnalysisStore:
+    """Interface every storage backend implements"""
+
+    def save(self, patient_data: PatientData, analysis: Dict, original_text: str) -> str:
+        """Persist an analysis and return its record ID"""
+        with span("save", store=type(self).__name__):
+            return self.save_record(build_record(patient_data, analysis, original_text))
+
+    def save_record(self, record: Dict, record_id: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        """Full saved record, or None if the ID is unknown"""
+        raise NotImplementedError
+
+    def list_recent(self, limit: int = 5) -> List[Dict]:
+        """Newest records first, as summaries with id, timestamp, patient_name and max_severity"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Every saved record, oldest first"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteAnalysisStore(AnalysisStore):
+    """Embedded SQLite store in WAL mode; safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                id TEXT PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                patient_name TEXT NOT NULL DEFAULT '',
+                max_severity INTEGER NOT NULL DEFAULT 0,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp, id);
+            CREATE INDEX IF NOT EXISTS idx_analyses_patient_name ON analyses (patient_name COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_analyses_max_severity ON analyses (max_severity, timestamp);
+
+            CREATE TABLE IF NOT EXISTS alerts (
+                analysis_id TEXT NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+                category TEXT NOT NULL,
+                severity TEXT NOT NULL,
+                severity_rank INTEGER NOT NULL,
+                message TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts (severity_rank, category);
+            CREATE INDEX IF NOT EXISTS idx_alerts_analysis ON alerts (analysis_id);
+
+            -- Row count kept by triggers so count() never scans the table
+            CREATE TABLE IF NOT EXISTS store_stats (id INTEGER PRIMARY KEY CHECK (id = 1), analyses INTEGER NOT NULL);
+            INSERT OR IGNORE INTO store_stats (id, analyses) SELECT 1, COUNT(*) FROM analyses;
+            CREATE TRIGGER IF NOT EXISTS trg_analyses_insert AFTER INSERT ON analyses
+                BEGIN UPDATE store_stats SET analyses = analyses + 1 WHERE id = 1; END;
+            CREATE TRIGGER IF NOT EXISTS trg_analyses_delete AFTER DELETE ON analyses
+                BEGIN UPDATE store_stats SET analyses = analyses - 1 WHERE id = 1; END;
+            """
+        )
+        self._conn.commit()
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SEVERITY_SCALE_VERSION:
+            self._rerank()
+
+    def _rerank(self):
+        """Recompute stored severity ranks after the shared severity scale changed"""
+        self._conn.create_function("severity_rank", 1, severity_rank, deterministic=True)
+        with self._conn:
+            self._conn.execute("UPDATE alerts SET severity_rank = severity_rank(severity)")
+            self._conn.execute(
+                "UPDATE analyses SET max_severity = "
+                "COALESCE((SELECT MAX(severity_rank) FROM alerts WHERE analysis_id = analyses.id), 0)"
+            )
+            self._conn.execute(f"PRAGMA user_version = {SEVERITY_SCALE_VERSION}")
+
+    def _insert(self, record: Dict, record_id: str) -> bool:
+        alerts = [(record_id, category, severity, severity_rank(severity), message)
+                  for category, severity, message in iter_alerts(record.get("ai_analysis"))]
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO analyses (id, timestamp, patient_name, max_severity, record) VALUES (?, ?, ?, ?, ?)",
+            (
+                record_id,
+                record.get("timestamp", ""),
+                (record.get("patient_data") or {}).get("name", ""),
+                max((alert[3] for alert in alerts), default=0),
+                json.dumps(record),
+            ),
+        )
+        if cursor.rowcount == 0:
+            return False
+        self._conn.executemany(
+            "INSERT INTO alerts (analysis_id, category, severity, severity_rank, message) VALUES (?, ?, ?, ?, ?)",
+            alerts,
+        )
+        return True
+
+    def save_record(self, record: Dict, record_id: Optional[str] = None) -> str:
+        record_id = record_id or new_record_id()
+        with self._lock, self._conn:
+            self._insert(record, record_id)
+        return record_id
+
+    def import_records(self, records: Iterator[Tuple[str, Dict]], batch_size: int = 1000) -> int:
+        """Bulk insert (record_id, record) pairs; existing IDs are skipped. Returns rows added"""
+        added = 0
+        batch = []
+        for item in records:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                added += self._import_batch(batch)
+                batch = []
+        if batch:
+            added += self._import_batch(batch)
+        return added
+
+    def _import_batch(self, batch) -> int:
+        with self._lock, self._conn:
+            return sum(self._insert(record, record_id) for record_id, record in batch)
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM analyses WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        record["id"] = record_id
+        return record
+
+    def list_recent(self, limit: int = 5) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, timestamp, patient_name, max_severity FROM analyses ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [{"id": r[0], "timestamp": r[1], "patient_name": r[2], "max_severity": r[3]} for r in rows]
+
+    def find_by_patient(self, name: str, limit: int = 50) -> List[Dict]:
+        """Saved records for a patient name (case-insensitive), newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM analyses WHERE patient_name = ? COLLATE NOCASE ORDER BY timestamp DESC LIMIT ?",
+                (name, limit),
+            ).fetchall()
+        return [self.get(r[0]) for r in rows]
+
+    def find_by_severity(self, min_severity: str = "high", limit: int = 50) -> List[Dict]:
+        """Summaries of records with an alert at or above the given severity, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, timestamp, patient_name, max_severity FROM analyses "
+                "WHERE max_severity >= ? ORDER BY timestamp DESC LIMIT ?",
+                (severity_rank(min_severity), limit),
+            ).fetchall()
+        return [{"id": r[0], "timestamp": r[1], "patient_name": r[2], "max_severity": r[3]} for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT analyses FROM store_stats WHERE id = 1").fetchone()[0]
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict]:
+        # Keyset pages on rowid: the lock is held per page, not for the whole walk
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, id, record FROM analyses WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            for rowid, record_id, text in rows:
+                record = json.loads(text)
+                record["id"] = record_id
+                yield record
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JSONDirectoryStore(AnalysisStore):
+    """One pretty-printed JSON file per analysis, the original data/ layout"""
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, record_id: str) -> pathlib.Path:
+        return self.directory / f"patient_form_{record_id}.json"
+
+    def save_record(self, record: Dict, record_id: Optional[str] = None) -> str:
+        record_id = record_id or new_record_id()
+        # Exclusive create: never overwrite an existing analysis
+        with open(self._path(record_id), "x") as f:
+            json.dump(record, f, indent=2)
+        return record_id
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(record_id)) as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        record["id"] = record_id
+        return record
+
+    def list_recent(self, limit: int = 5) -> List[Dict]:
+        summaries = []
+        for path in sorted(self.directory.glob("patient_form_*.json"), reverse=True)[:limit]:
+            record = self.get(path.stem[len("patient_form_"):])
+            summaries.append({
+                "id": record["id"],
+                "timestamp": record.get("timestamp", ""),
+                "patient_name": (record.get("patient_data") or {}).get("name", ""),
+                "max_severity": max((severity_rank(s) for _, s, _ in iter_alerts(record.get("ai_analysis"))),
+                                    default=0),
+            })
+        return summaries
+
+    def count(self) -> int:
+        return sum(1 for _ in self.directory.glob("patient_form_*.json"))
+
+    def iter_records(self) -> Iterator[Dict]:
+        for path in sorted(self.directory.glob("patient_form_*.json")):
+            record = self.get(path.stem[len("patient_form_"):])
+            if record is not None:
+                yield record
+
+
+def open_store(spec: str) -> AnalysisStore:
+    """
+    Open a backend from a spec string: ``sqlite:PATH`` (default scheme),
+    ``json:DIRECTORY`` or ``archive:DIRECTORY`` (compressed segment
+    archive). A bare path is treated as a SQLite database file.
+    """
+    scheme, sep, location = spec.partition(":")
+    if sep and scheme == "json":
+        return JSONDirectoryStore(location)
+    if sep and scheme == "archive":
+        from .archive import SegmentArchive
+        return SegmentArchive(location)
+    if sep and scheme == "sqlite":
+        return SQLiteAnalysisStore(location)
+    return SQLiteAnalysisStore(spec)
+
+
+def iter_json_records(data_dir) -> Iterator[Tuple[str, Dict]]:
+    """Yield (record_id, record) for every data/patient_form_*.json file"""
+    for path in sorted(pathlib.Path(data_dir).glob("patient_form_*.json")):
+        with open(path) as f:
+            record = json.load(f)
+        # File stem keeps re-imports idempotent: the same file always maps to the same ID
+        yield f"legacy_{path.stem[len('patient_form_'):]}", record
+
+
+def import_json_directory(store: SQLiteAnalysisStore, data_dir) -> int:
+    """One-time import of existing per-form JSON files; returns the number of new records"""
+    return store.import_records(iter_json_records(data_dir))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m healthform.storage", description="Manage the analysis store")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_cmd = subcommands.add_parser("import-json", help="Import data/patient_form_*.json files")
+    import_cmd.add_argument("data_dir", help="Directory holding patient_form_*.json files")
+    import_cmd.add_argument("--db", default=os.path.join("data", "analyses.sqlite3"), help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    store = SQLiteAnalysisStore(args.db)
+    added = import_json_directory(store, args.data_dir)
+    print(f"Imported {added} analyses into {args.db} ({store.count()} total)")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
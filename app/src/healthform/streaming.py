@@ -0,0 +1,139 @@
+# app/src/healthform/streaming.py
+"""
+Incremental parsing of a streamed analysis JSON.
+
+The model returns one JSON object whose values are arrays of
+{"severity", "message"} objects. IncrementalAnalysisParser is fed the
+completion text chunk by chunk and hands back each array item as soon
+as its closing brace arrives, so alerts can be shown long before the
+completion finishes. Text before the first "{" (e.g. a ```json fence)
+and anything after the closing "}" is ignored.
+"""
+import re
+import json
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Characters that can change the scanner state; everything else is skipped in bulk
+_STRUCTURAL_RE = re.compile(r'[{}\[\]"\\]')
+
+ITEM = "item"
+DONE = "done"
+
+
+@dataclass
+class StreamEvent:
+    """One update from a streaming analysis: a finished item, or the final analysis"""
+    kind: str
+    category: Optional[str] = None
+    item: Optional[Dict] = None
+    analysis: Optional[Dict] = None
+
+
+class IncrementalAnalysisParser:
+    """
+    Brace-balanced scanner that yields complete category items from partial JSON.
+
+    ``categories`` maps analysis keys to the labels the model may use
+    instead (e.g. "critical_alerts" -> "CRITICAL ALERTS"); either spelling
+    is accepted and items are reported under the analysis key.
+    """
+
+    def __init__(self, categories: Dict[str, str]):
+        self._key_for = {label: key for key, label in categories.items()}
+        self._key_for.update({key: key for key in categories})
+        self.analysis: Dict[str, List[Dict]] = {key: [] for key in categories}
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped_at = -1
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._category: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self.finished = False
+
+    def feed(self, text: str) -> List[Tuple[str, Dict]]:
+        """Consume the next chunk; returns (category, item) for every item it completed"""
+        if self.finished or not text:
+            return []
+        if self._depth == 0:
+            # Drop any preamble so the buffer only ever holds the JSON object
+            start = text.find("{")
+            if start < 0:
+                return []
+            text = text[start:]
+        self._buffer += text
+        completed = []
+        for match in _STRUCTURAL_RE.finditer(self._buffer, self._pos):
+            i = match.start()
+            char = match.group(0)
+            if i == self._escaped_at:
+                continue
+            if self._in_string:
+                if char == "\\":
+                    self._escaped_at = i + 1
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = self._buffer[self._string_start:i + 1]
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2:
+                    self._category = self._category_for(self._last_key)
+                elif char == "{" and self._depth == 3 and self._category:
+                    self._item_start = i
+            elif char in "}]":
+                if char == "}" and self._depth == 3 and self._item_start is not None:
+                    item = self._decode(self._buffer[self._item_start:i + 1])
+                    if item is not None:
+                        self.analysis[self._category].append(item)
+                        completed.append((self._category, item))
+                    self._item_start = None
+                self._depth -= 1
+                if self._depth <= 1:
+                    self._category = None
+                if self._depth <= 0:
+                    self.finished = True
+                    break
+        self._pos = len(self._buffer)
+        return completed
+
+    def _category_for(self, raw_key: Optional[str]) -> Optional[str]:
+        if raw_key is None:
+            return None
+        try:
+            return self._key_for.get(json.loads(raw_key))
+        except json.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def _decode(fragment: str) -> Optional[Dict]:
+        try:
+            item = json.loads(fragment)
+        except (json.JSONDecodeError, RecursionError):
+            return None
+        return item if isinstance(item, dict) else None
+
+
+def iter_analysis_items(analysis: Dict, categories: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+    """(category, item) pairs of a complete analysis, in category order"""
+    for category in categories:
+        for item in analysis.get(category) or []:
+            if isinstance(item, dict):
+                yield category, item
+
+
+def delta_content(chunk) -> str:
+    """Text carried by one chat completion stream chunk (new client objects or old-client dicts)"""
+    choices = chunk["choices"] if isinstance(chunk, dict) else getattr(chunk, "choices", None)
+    if not choices:
+        return ""
+    delta = choices[0]["delta"] if isinstance(choices[0], dict) else choices[0].delta
+    content = delta.get("content") if isinstance(delta, dict) else getattr(delta, "content", None)
+    return content or ""
@@ -0,0 +1,169 @@
+# app/src/healthform/templates.py
+"""
+Form template registry: fingerprint a form's layout, then extract it in one match.
+
+Forms arrive from several clinic systems, each with its own fixed layout.
+A layout is recognised from its first few section headers (short upper-case
+lines such as "PATIENT INTAKE FORM" or "CURRENT MEDICATIONS:"), which only
+needs a scan of the top of the form. Each registered FormTemplate compiles
+its labels, in the order the layout prints them, into a single anchored
+pattern with one named group per field plus the medication table rows, so a
+recognised form is extracted by one regex match. Every step is an atomic
+group that skips straight to the next occurrence of its label: a form that
+drifts from its layout fails in linear time and falls back to
+parser.extract_generic, as does any form with an unknown fingerprint.
+
+Usage:
+    from healthform.templates import default_registry
+    patient_data, template_name = default_registry().extract(form_text)
+"""
+import re
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from .models import PatientData
+from .parser import (MED_HEADER, _FIELD_LABELS, _VALUE_PATTERNS, build_patient_data, extract_generic,
+                     medication_columns, medication_rows)
+from . import instrumentation
+
+# Name reported for forms handled by the generic extractor
+GENERIC = "generic"
+
+# Layout marker for the position of the medication table
+MEDICATIONS = "medications"
+
+# Section headers that make up a fingerprint, and how far into the form to look for them
+FINGERPRINT_HEADERS = 2
+FINGERPRINT_WINDOW = 2048
+
+# A line of upper-case words, optionally followed by a parenthetical note and a ':'
+_HEADER_RE = re.compile(
+    r"^[ \t]*([A-Z][A-Z0-9 &/,.'-]*[A-Z0-9])(?:[ \t]*\([^)\r\n]*\))?[ \t]*:?[ \t]*(?=\r|\n|\Z)",
+    re.MULTILINE,
+)
+_SPACES_RE = re.compile(r"\s+")
+
+
+def fingerprint(form_text: str, headers: int = FINGERPRINT_HEADERS) -> Tuple[str, ...]:
+    """The first section headers near the top of a form, whitespace-normalised"""
+    found = []
+    for match in _HEADER_RE.finditer(form_text, 0, FINGERPRINT_WINDOW):
+        found.append(_SPACES_RE.sub(" ", match.group(1)))
+        if len(found) == headers:
+            break
+    return tuple(found)
+
+
+def _skip_to(literal: str) -> str:
+    """
+    Pattern consuming text up to the next occurrence of a literal.
+
+    The unrolled form [^x]*(?:x(?!rest)[^x]*)* runs in the regex engine's
+    character-class loop, where a lazy .*? would try the literal at every
+    position.
+    """
+    first, rest = re.escape(literal[0]), re.escape(literal[1:])
+    return f"[^{first}]*(?:{first}(?!{rest})[^{first}]*)*"
+
+
+class FormTemplate:
+    """One known form layout: its fingerprint and a single compiled extraction pattern"""
+
+    def __init__(self, name: str, fingerprint: Sequence[str], layout: Sequence[str],
+                 medication_header: str = MED_HEADER):
+        self.name = name
+        self.fingerprint = tuple(fingerprint)
+        self.layout = tuple(layout)
+        self.medication_header = medication_header
+        self._columns = medication_columns(medication_header)
+        self._pattern = re.compile("".join(self._step(item) for item in self.layout))
+
+    def _step(self, item: str) -> str:
+        # Skip ahead to the item, atomically: once a step matches it is never retried
+        if item == MEDICATIONS:
+            return ("(?>" + _skip_to(self.medication_header) + r"(?<![^\r\n])" + re.escape(self.medication_header)
+                    + r"[ \t]*(?:\r\n|\n|\r)(?P<medications>(?:[^\r\n]*\|[^\r\n]*(?:\r\n|\n|\r|$))*))")
+        if item not in _FIELD_LABELS:
+            raise ValueError(f"Unknown label {item!r} in template {self.name!r}")
+        field = _FIELD_LABELS[item]
+        # Every value pattern's first '(' opens its one capture group
+        value = _VALUE_PATTERNS[field].replace("(", f"(?P<{field}>", 1)
+        return f"(?>{_skip_to(item + ':')}{re.escape(item)}:{value})"
+
+    def extract(self, form_text: str) -> Optional[PatientData]:
+        """PatientData for a form in this layout, or None when the form does not follow it"""
+        match = self._pattern.match(form_text)
+        if match is None:
+            return None
+        found = match.groupdict()
+        return build_patient_data(found, medication_rows(found.pop(MEDICATIONS) or "", self._columns))
+
+
+class TemplateRegistry:
+    """Fingerprint -> FormTemplate dispatch with a generic fallback"""
+
+    def __init__(self, templates: Sequence[FormTemplate] = (),
+                 fallback: Callable[[str], PatientData] = extract_generic):
+        self.fallback = fallback
+        self._templates: Dict[Tuple[str, ...], FormTemplate] = {}
+        self._sizes: Tuple[int, ...] = ()
+        for template in templates:
+            self.register(template)
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def register(self, template: FormTemplate):
+        if not template.fingerprint or len(template.fingerprint) > FINGERPRINT_HEADERS:
+            raise ValueError(f"Template {template.name!r} needs 1 to {FINGERPRINT_HEADERS} fingerprint headers")
+        existing = self._templates.get(template.fingerprint)
+        if existing is not None:
+            raise ValueError(f"Templates {existing.name!r} and {template.name!r} share a fingerprint")
+        self._templates[template.fingerprint] = template
+        self._sizes = tuple(sorted({len(key) for key in self._templates}, reverse=True))
+
+    def match(self, form_text: str) -> Optional[FormTemplate]:
+        """The registered template with the longest fingerprint matching the form, if any"""
+        found = fingerprint(form_text)
+        for size in self._sizes:
+            template = self._templates.get(found[:size]) if len(found) >= size else None
+            if template is not None:
+                return template
+        return None
+
+    def extract(self, form_text: str) -> Tuple[PatientData, str]:
+        """(PatientData, name of the template that produced it, or GENERIC)"""
+        template = self.match(form_text)
+        if template is not None:
+            data = template.extract(form_text)
+            if data is not None:
+                return data, template.name
+            # Recognised header but the body drifted from the layout
+            instrumentation.event("template_fallback", template=template.name)
+        return self.fallback(form_text), GENERIC
+
+
+# Layouts of the clinic systems we receive forms from
+BUILTIN_TEMPLATES = (
+    FormTemplate(
+        "mercy_general_intake",
+        ("PATIENT INTAKE FORM", "MERCY GENERAL HOSPITAL"),
+        ("Patient Name", "Age", "Gender", "Weight", "Primary reason for today's visit", MEDICATIONS,
+         "Drug Allergies", "Chronic Conditions", "Blood Pressure", "Heart Rate", "Temperature"),
+    ),
+    FormTemplate(
+        "comprehensive_intake",
+        ("COMPREHENSIVE MEDICAL INTAKE FORM", "CURRENT MEDICATIONS"),
+        ("Patient Name", "Age", "Gender", "Weight", "Primary reason for today's visit", MEDICATIONS,
+         "Drug Allergies", "Blood Pressure", "Heart Rate", "Temperature", "Chronic Conditions"),
+    ),
+)
+
+_default_registry: Optional[TemplateRegistry] = None
+
+
+def default_registry() -> TemplateRegistry:
+    """Registry of the built-in templates, built on first use"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = TemplateRegistry(BUILTIN_TEMPLATES)
+    return _default_registry
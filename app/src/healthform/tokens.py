@@ -0,0 +1,56 @@
+# app/src/healthform/tokens.py
+"""
+Local token counting for prompt budgeting.
+
+Uses tiktoken's encoding for the model when tiktoken is installed and
+falls back to a four-characters-per-token estimate otherwise, so budgets
+work the same way (if less precisely) without the optional dependency.
+"""
+from functools import lru_cache
+from typing import Optional
+
+TRUNCATION_MARKER = " [truncated]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Token count of text for the model, exact when tiktoken is available"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo",
+                       marker: Optional[str] = TRUNCATION_MARKER) -> str:
+    """Cut text to at most max_tokens tokens (marker included), ending on a word boundary where possible"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    marker = marker or ""
+    keep = max(max_tokens - count_tokens(marker, model), 0)
+    encoding = _encoding(model)
+    if encoding is None:
+        cut = text[:keep * 4]
+    else:
+        cut = encoding.decode(encoding.encode(text)[:keep])
+    if " " in cut.strip():
+        cut = cut[:cut.rstrip().rfind(" ")]
+    return cut.rstrip() + marker
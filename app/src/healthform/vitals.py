@@ -0,0 +1,158 @@
+# app/src/healthform/vitals.py
+"""
+Typed vital signs and threshold evaluation.
+
+The parser keeps vitals as written on the form ("145/92", "99.2°F"). This
+module turns them into numbers once: blood pressure into systolic and
+diastolic integers, heart rate into an integer, and temperature into
+degrees Celsius. The unit is taken from the text (°F, F, °C, C,
+Fahrenheit, Celsius) and otherwise inferred from the value, since no human
+temperature is both a plausible Celsius and a plausible Fahrenheit reading.
+Values outside physiologically possible ranges are treated as unreadable
+rather than alerted on.
+
+Thresholds are a table of (vital, comparison, limit, severity, message)
+rows. ThresholdTable compiles it once, grouped by measurement, and
+evaluates every measurement in one pass, reporting the first matching row
+for each (rows are ordered most severe first).
+"""
+import re
+import operator
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Typed vital name -> the PatientData.vital_signs entry it is read from
+VITAL_SOURCES = {
+    "systolic": "blood_pressure",
+    "diastolic": "blood_pressure",
+    "heart_rate": "heart_rate",
+    "temperature_c": "temperature",
+}
+
+# Numeric vital-sign thresholds: (vital, comparison, limit, severity, message template).
+# Templates are formatted with the form's raw vital strings and the typed values.
+VITAL_THRESHOLDS = (
+    ("systolic", ">=", 180, "high", "HYPERTENSIVE CRISIS: Blood pressure {blood_pressure} requires immediate attention"),
+    ("diastolic", ">=", 120, "high", "HYPERTENSIVE CRISIS: Blood pressure {blood_pressure} requires immediate attention"),
+    ("systolic", ">=", 140, "medium", "Elevated blood pressure {blood_pressure}"),
+    ("systolic", "<", 90, "high", "HYPOTENSION: Blood pressure {blood_pressure}"),
+    ("heart_rate", ">", 120, "high", "TACHYCARDIA: Heart rate {heart_rate} bpm"),
+    ("heart_rate", ">", 100, "medium", "Elevated heart rate {heart_rate} bpm"),
+    ("heart_rate", "<", 50, "medium", "Bradycardia: heart rate {heart_rate} bpm"),
+    ("temperature_c", ">=", 40.0, "high", "HYPERPYREXIA: Temperature {temperature} ({temperature_c:.1f} °C)"),
+    ("temperature_c", ">=", 38.0, "medium", "Fever: temperature {temperature} ({temperature_c:.1f} °C)"),
+    ("temperature_c", "<", 35.0, "high", "HYPOTHERMIA: Temperature {temperature} ({temperature_c:.1f} °C)"),
+)
+
+# Readings outside these ranges are transcription errors, not patients
+PLAUSIBLE_RANGES = {
+    "systolic": (40, 300),
+    "diastolic": (20, 200),
+    "heart_rate": (20, 300),
+    "temperature_c": (25.0, 46.0),
+}
+
+COMPARISONS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+_BP_RE = re.compile(r"(\d{2,3})\s*/\s*(\d{2,3})")
+_INT_RE = re.compile(r"\d+")
+_TEMPERATURE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:°|deg(?:rees)?)?\s*(fahrenheit|celsius|[fc])?\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True, slots=True)
+class VitalSigns:
+    """Numeric vitals read from a form; None where absent or unreadable"""
+    systolic: Optional[int] = None
+    diastolic: Optional[int] = None
+    heart_rate: Optional[int] = None
+    temperature_c: Optional[float] = None
+
+    def values(self) -> Dict[str, float]:
+        """Readable vitals only, keyed by typed vital name"""
+        return {name: getattr(self, name) for name in VITAL_SOURCES if getattr(self, name) is not None}
+
+
+def _plausible(vital: str, value):
+    low, high = PLAUSIBLE_RANGES[vital]
+    return value if low <= value <= high else None
+
+
+def parse_blood_pressure(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """(systolic, diastolic) from text like "145/92" or "180 / 110 mmHg"""
+    match = _BP_RE.search(text or "")
+    if not match:
+        return None, None
+    systolic = _plausible("systolic", int(match.group(1)))
+    diastolic = _plausible("diastolic", int(match.group(2)))
+    if systolic is None or diastolic is None or diastolic >= systolic:
+        return None, None
+    return systolic, diastolic
+
+
+def parse_heart_rate(text: str) -> Optional[int]:
+    match = _INT_RE.search(text or "")
+    return _plausible("heart_rate", int(match.group(0))) if match else None
+
+
+def fahrenheit_to_celsius(value: float) -> float:
+    return (value - 32.0) * 5.0 / 9.0
+
+
+def parse_temperature(text: str) -> Optional[float]:
+    """Degrees Celsius from text like "99.2°F", "37.5 C" or a bare "98.8" (unit inferred)"""
+    match = _TEMPERATURE_RE.search(text or "")
+    if not match:
+        return None
+    value = float(match.group(1))
+    unit = (match.group(2) or "").lower()[:1]
+    if unit == "f" or (not unit and value > PLAUSIBLE_RANGES["temperature_c"][1]):
+        value = fahrenheit_to_celsius(value)
+    return _plausible("temperature_c", round(value, 2))
+
+
+def parse_vitals(vital_signs: Dict[str, str]) -> VitalSigns:
+    """Typed vitals from PatientData.vital_signs"""
+    vital_signs = vital_signs or {}
+    systolic, diastolic = parse_blood_pressure(vital_signs.get("blood_pressure", ""))
+    return VitalSigns(
+        systolic=systolic,
+        diastolic=diastolic,
+        heart_rate=parse_heart_rate(vital_signs.get("heart_rate", "")),
+        temperature_c=parse_temperature(vital_signs.get("temperature", "")),
+    )
+
+
+class ThresholdTable:
+    """Compiled threshold rows, grouped by the measurement they alert on"""
+
+    def __init__(self, rows: Sequence[Tuple] = VITAL_THRESHOLDS):
+        groups: Dict[str, List[Tuple]] = {}
+        for vital, comparison, limit, severity, template in rows:
+            if vital not in VITAL_SOURCES:
+                raise ValueError(f"Unknown vital {vital!r} in threshold table; expected one of {', '.join(VITAL_SOURCES)}")
+            if comparison not in COMPARISONS:
+                raise ValueError(f"Unknown comparison {comparison!r} in threshold table")
+            groups.setdefault(VITAL_SOURCES[vital], []).append(
+                (vital, COMPARISONS[comparison], limit, severity, template))
+        self.rows = tuple(rows)
+        self._groups = tuple(tuple(group) for group in groups.values())
+
+    def evaluate(self, vitals: VitalSigns, raw: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """One alert per measurement: the first row, in table order, whose condition holds"""
+        alerts = []
+        fields = None
+        for rules in self._groups:
+            for vital, compare, limit, severity, template in rules:
+                value = getattr(vitals, vital)
+                if value is not None and compare(value, limit):
+                    if fields is None:
+                        fields = {**{source: "" for source in VITAL_SOURCES.values()}, **(raw or {}),
+                                  **vitals.values()}
+                    alerts.append({"severity": severity, "message": template.format(**fields)})
+                    break
+        return alerts
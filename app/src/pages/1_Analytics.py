@@ -0,0 +1,57 @@
+# app/src/pages/1_Analytics.py
+import os
+import pathlib
+
+import streamlit as st
+
+from healthform.analytics import AnalysisCorpus, DEFAULT_PERCENTILES
+from healthform.storage import open_store
+
+DATA_DIR = pathlib.Path("data")
+
+
+@st.cache_resource
+def get_analysis_store():
+    """Same store the main page saves to (HEALTHFORM_STORE overrides the SQLite default)"""
+    return open_store(os.getenv("HEALTHFORM_STORE") or str(DATA_DIR / "analyses.sqlite3"))
+
+
+@st.cache_resource(max_entries=1)
+def load_corpus(record_count: int) -> AnalysisCorpus:
+    """Columnar load of every saved analysis; reloaded only when the record count changes"""
+    return AnalysisCorpus.from_store(get_analysis_store())
+
+
+def main():
+    st.set_page_config(page_title="Analytics - HealthForm AI Validator", page_icon="🏥", layout="wide")
+    st.title("Saved Analysis Analytics")
+    store = get_analysis_store()
+    corpus = load_corpus(store.count())
+    if not len(corpus):
+        st.info("No saved analyses yet. Analyze a form on the main page to start collecting statistics.")
+        return
+
+    col1, col2 = st.columns(2)
+    col1.metric("Saved analyses", f"{len(corpus):,}")
+    col2.metric("Findings", f"{corpus.alert_count:,}")
+
+    st.header("Findings by Severity")
+    distribution = corpus.severity_distribution()
+    st.dataframe(distribution, use_container_width=True)
+    st.bar_chart(distribution)
+
+    st.header("Most Frequent Drug Interactions")
+    limit = st.slider("Messages to show", min_value=5, max_value=50, value=10, step=5)
+    interactions = corpus.top_interactions(limit)
+    if interactions.empty:
+        st.write("No drug interactions recorded")
+    else:
+        st.dataframe(interactions, hide_index=True, use_container_width=True)
+
+    st.header("Vital Signs by Age Band")
+    percentiles = st.multiselect("Percentiles", [5, 10, 25, 50, 75, 90, 95, 99], default=list(DEFAULT_PERCENTILES))
+    if percentiles:
+        st.dataframe(corpus.vital_percentiles(sorted(percentiles)), use_container_width=True)
+
+
+main()
@@ -0,0 +1,84 @@
+# app/src/pages/2_Search.py
+import time
+
+import streamlit as st
+
+from healthform.decoding import normalize_analysis
+from healthform.models import PatientData
+from healthform.search import ORDERS
+from healthform.severity import LEVELS, SEVERITY_RANKS
+from streamlit_app import get_analysis_store, render_analysis, render_patient_data
+
+SEVERITY_FILTERS = ("any",) + tuple(reversed(LEVELS))
+SEVERITY_LABELS = {rank: level for level, rank in SEVERITY_RANKS.items()}
+
+QUERY_HELP = """
+| Query | Finds |
+| --- | --- |
+| `warfarin` | the word in any field |
+| `interactions:warfarin` | a drug-interaction alert mentioning it |
+| `medications:coumadin` | a medication; brand names also match the generic name |
+| `name:"jane doe"` | a phrase in the patient name |
+| `alerts:bleed*` | a word starting with "bleed" in any alert |
+| `aspirin -warfarin` | aspirin but not warfarin |
+| `complaint:chest severity:high` | a complaint word on forms with a high or critical alert ("severe" counts as high) |
+
+Fields: `name`, `medications`, `allergies`, `complaint`, `critical`, `interactions`, `missing`,
+`recommendations`, and `alerts` for every alert category. Terms are combined with AND.
+"""
+
+
+def main():
+    st.set_page_config(page_title="Search - HealthForm AI Validator", page_icon="🏥", layout="wide")
+    st.title("Search Saved Analyses")
+    store = get_analysis_store()
+    index = store.index
+    # Analyses saved by worker processes or imported since the index was last updated
+    missing = store.count() - index.count()
+    if missing > 0:
+        with st.spinner(f"Indexing {missing:,} saved analyses"):
+            index.update(store)
+
+    query = st.text_input("Search", placeholder='interactions:warfarin   name:"jane doe"   complaint:chest')
+    col1, col2, col3 = st.columns(3)
+    min_severity = col1.selectbox("Minimum alert severity", SEVERITY_FILTERS)
+    order = col2.radio("Order", ORDERS, horizontal=True, format_func=str.title)
+    limit = col3.slider("Results", min_value=10, max_value=200, value=50, step=10)
+    with st.expander("Query syntax"):
+        st.markdown(QUERY_HELP)
+
+    if not query.strip() and min_severity == "any":
+        st.caption(f"{index.count():,} analyses indexed")
+        return
+    start = time.perf_counter()
+    try:
+        hits = index.search(query, limit=limit, order=order,
+                            min_severity=None if min_severity == "any" else min_severity)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    elapsed = time.perf_counter() - start
+    st.caption(f"{len(hits)} result(s) in {elapsed * 1e3:.1f} ms across {index.count():,} analyses")
+    if not hits:
+        st.info("No saved analyses match this search")
+        return
+
+    st.dataframe(
+        [{"Saved": hit["timestamp"], "Patient": hit["patient_name"],
+          "Highest severity": SEVERITY_LABELS.get(hit["max_severity"], ""), "ID": hit["id"]} for hit in hits],
+        hide_index=True, use_container_width=True,
+    )
+    hit = st.selectbox("Open analysis", hits, format_func=lambda h: f"{h['timestamp']}  {h['patient_name']}")
+    record = store.get(hit["id"])
+    if record is None:
+        st.warning("This analysis is no longer in the store")
+        return
+    render_patient_data(PatientData.from_dict(record.get("patient_data") or {}))
+    # Older records keep the model's category labels ("CRITICAL ALERTS", ...)
+    analysis = record.get("ai_analysis") or {}
+    render_analysis(dict(analysis, **normalize_analysis(analysis)))
+    with st.expander("Original form text"):
+        st.text(record.get("original_form_text", ""))
+
+
+main()
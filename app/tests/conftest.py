@@ -0,0 +1,23 @@
+# app/tests/conftest.py
+"""Shared fixtures: the healthform package from app/src and the sample records in data/"""
+import json
+import pathlib
+import sys
+
+import pytest
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+DATA_DIR = pathlib.Path(__file__).resolve().parents[2] / "data"
+
+
+@pytest.fixture(scope="session")
+def sample_records():
+    """(record_id, record) for every data/patient_form_*.json file"""
+    records = []
+    for path in sorted(DATA_DIR.glob("patient_form_*.json")):
+        with open(path) as f:
+            records.append((path.stem, json.load(f)))
+    assert records, f"no sample records in {DATA_DIR}"
+    return records
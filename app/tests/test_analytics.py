@@ -0,0 +1,26 @@
+# app/tests/test_analytics.py
+from healthform.analytics import UNSPECIFIED, AnalysisCorpus
+
+
+def test_severity_distribution_uses_shared_levels(sample_records):
+    corpus = AnalysisCorpus.from_records(record for _, record in sample_records)
+    distribution = corpus.severity_distribution()
+    # Every spelling in data/ ("Severe", "CRITICAL", "WARNING", ...) is one of the four levels, most severe first
+    assert list(distribution.columns) == ["critical", "high", "medium", "low"]
+    assert int(distribution.to_numpy().sum()) == corpus.alert_count
+
+
+def test_unknown_severities_sort_last():
+    corpus = AnalysisCorpus.from_records([{"patient_data": {"name": "A"}, "ai_analysis": {"critical_alerts": [
+        {"severity": "Severe", "message": "a"}, {"severity": "", "message": "b"},
+        {"severity": "mild", "message": "c"}]}}])
+    assert list(corpus.severity_distribution().columns) == ["high", "low", UNSPECIFIED]
+
+
+def test_unrecorded_age_is_left_out_of_age_bands():
+    vitals = {"blood_pressure": "120/80", "heart_rate": "72"}
+    corpus = AnalysisCorpus.from_records([{"patient_data": {"name": "A", "age": 0, "vital_signs": vitals}},
+                                          {"patient_data": {"name": "B", "age": 10, "vital_signs": vitals}}])
+    assert list(corpus.patients.age) == [-1, 10]
+    assert corpus.patients[0].age == 0
+    assert corpus.vital_percentiles()[("heart_rate", "count")].to_dict()["0-17"] == 1
@@ -0,0 +1,96 @@
+# app/tests/test_archive.py
+import pytest
+
+from healthform.archive import SegmentArchive
+
+FRAME_HEADER_BYTES = 8  # length and crc32, both u32
+
+
+@pytest.fixture
+def archived(tmp_path, sample_records):
+    """Archive directory holding the first three sample records, closed; plus their (id, record) pairs"""
+    records = sample_records[:3]
+    archive = SegmentArchive(tmp_path, codec="gzip")
+    archive.import_records(iter(records))
+    archive.close()
+    return tmp_path, records
+
+
+def segment_files(directory):
+    (segment,) = directory.glob("segment_*.hfa")
+    return segment, segment.with_suffix(".idx")
+
+
+def index_lines(index):
+    return index.read_bytes().splitlines(keepends=True)
+
+
+def frame_end(index_line):
+    """End offset of the frame an index line points to"""
+    _, offset, length = index_line.decode("utf-8").split("\t")[:3]
+    return int(offset) + FRAME_HEADER_BYTES + int(length)
+
+
+def reopen(directory):
+    archive = SegmentArchive(directory, codec="gzip")
+    ids = sorted(record["id"] for record in archive.iter_records())
+    return archive, ids
+
+
+def test_torn_index_line_is_truncated_and_its_frame_reindexed(archived):
+    directory, records = archived
+    _, index = segment_files(directory)
+    lines = index_lines(index)
+    index.write_bytes(b"".join(lines[:2]) + lines[2][:5])
+    archive, _ = reopen(directory)
+    assert archive.count() == 3
+    assert archive.get(records[2][0])["id"] == records[2][0]
+    archive.close()
+    assert index_lines(index) == lines
+
+
+def test_frames_past_the_index_are_reindexed(archived):
+    directory, records = archived
+    _, index = segment_files(directory)
+    lines = index_lines(index)
+    index.write_bytes(lines[0])
+    archive, ids = reopen(directory)
+    assert ids == sorted(record_id for record_id, _ in records)
+    assert [archive.get(record_id)["id"] for record_id, _ in records] == [record_id for record_id, _ in records]
+    archive.close()
+    assert index_lines(index) == lines
+
+
+def test_segment_is_cut_at_the_first_bad_checksum(archived):
+    directory, records = archived
+    segment, index = segment_files(directory)
+    lines = index_lines(index)
+    data = bytearray(segment.read_bytes())
+    data[frame_end(lines[0]) + FRAME_HEADER_BYTES] ^= 0xFF  # first payload byte of the second frame
+    segment.write_bytes(bytes(data))
+    index.write_bytes(lines[0])
+    archive, ids = reopen(directory)
+    assert ids == [records[0][0]]
+    assert archive.get(records[1][0]) is None
+    archive.close()
+    assert segment.stat().st_size == frame_end(lines[0])
+
+
+def test_reopening_after_a_torn_write_keeps_every_complete_record(archived, sample_records):
+    directory, records = archived
+    segment, index = segment_files(directory)
+    lines = index_lines(index)
+    with open(segment, "r+b") as f:
+        f.truncate(frame_end(lines[2]) - 10)  # crash midway through the third frame
+    index.write_bytes(b"".join(lines[:2]))
+    archive, ids = reopen(directory)
+    assert ids == sorted(record_id for record_id, _ in records[:2])
+    added_id, added = sample_records[3]
+    archive.save_record(added, added_id)
+    archive.close()
+
+    archive, ids = reopen(directory)
+    assert ids == sorted([records[0][0], records[1][0], added_id])
+    assert archive.get(added_id)["id"] == added_id
+    archive.close()
+    assert len(index_lines(index)) == 3
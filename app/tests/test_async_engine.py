@@ -0,0 +1,148 @@
+# app/tests/test_async_engine.py
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from healthform.async_engine import AnalysisError, AsyncClinicalEngine, TokenBudget
+from healthform.batching import BATCH_SYSTEM_PROMPT
+from healthform.models import PatientData
+
+ANALYSIS = {"critical_alerts": [{"severity": "high", "message": "Check INR"}], "drug_interactions": [],
+            "missing_info": [], "recommendations": []}
+PATIENTS = [PatientData(name="Jane Doe", age=40, medications=["Warfarin 5mg Daily"]),
+            PatientData(name="John Roe", age=52, medications=["Lisinopril 10mg Daily"])]
+
+
+class StatusError(Exception):
+    """API error with an HTTP status and, optionally, a Retry-After header"""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={} if retry_after is None else {"retry-after": retry_after})
+
+
+class StubClient:
+    """Async chat client answering each request with ``respond(batch, messages)``: reply text or an exception"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        batch = messages[0]["content"] == BATCH_SYSTEM_PROMPT
+        self.calls.append("batch" if batch else "single")
+        outcome = self.respond(batch, messages)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+
+def scripted(*outcomes):
+    """respond callable returning the given outcomes in turn, then the plain analysis"""
+    remaining = list(outcomes)
+    return lambda batch, messages: remaining.pop(0) if remaining else json.dumps(ANALYSIS)
+
+
+def engine(respond, **options):
+    options = {"base_delay": 0, "tokens_per_minute": None, **options}
+    client = StubClient(respond)
+    return client, AsyncClinicalEngine(client, **options)
+
+
+def test_retryable_errors_are_retried():
+    client, clinical = engine(scripted(StatusError(503), asyncio.TimeoutError()))
+    result = asyncio.run(clinical.analyze(PATIENTS[0]))
+    assert result.attempts == 3
+    assert result.analysis["critical_alerts"] == ANALYSIS["critical_alerts"]
+    assert client.calls == ["single"] * 3
+
+
+def test_other_errors_fail_without_retrying():
+    client, clinical = engine(scripted(StatusError(400)))
+    (result,) = asyncio.run(clinical.analyze_many(PATIENTS[:1]))
+    assert result.error == "StatusError: HTTP 400"
+    assert result.attempts == 1
+    assert client.calls == ["single"]
+
+
+def test_retries_run_out():
+    client, clinical = engine(lambda batch, messages: StatusError(429), max_retries=2)
+    with pytest.raises(AnalysisError) as raised:
+        asyncio.run(clinical.analyze(PATIENTS[0]))
+    assert raised.value.retryable
+    assert raised.value.attempts == 3
+    assert len(client.calls) == 3
+
+
+def test_backoff_honors_retry_after_up_to_max_delay():
+    _, clinical = engine(scripted(), base_delay=0.5, max_delay=4.0)
+    assert clinical._backoff_delay(1, StatusError(429, retry_after="2")) == 2.0
+    assert clinical._backoff_delay(1, StatusError(429, retry_after="120")) == 4.0
+    for attempt in range(1, 6):
+        assert 0 <= clinical._backoff_delay(attempt, StatusError(503)) <= min(4.0, 0.5 * 2 ** (attempt - 1))
+
+
+def test_retry_waits_as_long_as_the_server_asks():
+    _, clinical = engine(scripted(StatusError(429, retry_after="0.2")))
+
+    async def timed():
+        start = asyncio.get_running_loop().time()
+        result = await clinical.analyze(PATIENTS[0])
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(timed())
+    assert result.attempts == 2
+    assert elapsed >= 0.2
+
+
+def test_failed_request_refunds_its_tokens():
+    # 600 tokens a minute refill at 10 a second: a reservation that was not refunded would take minutes to return
+    _, clinical = engine(scripted(StatusError(400)), tokens_per_minute=600)
+
+    async def run():
+        with pytest.raises(AnalysisError):
+            await clinical.analyze(PATIENTS[0])
+        await asyncio.wait_for(clinical.budget.acquire(600), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_budget_charges_actual_usage():
+    async def run():
+        budget = TokenBudget(600)
+        reserved = await budget.acquire(500)
+        budget.settle(reserved, 15)
+        await asyncio.wait_for(budget.acquire(580), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_rejected_batch_is_analyzed_individually():
+    client, clinical = engine(lambda batch, messages: StatusError(400) if batch else json.dumps(ANALYSIS))
+    results = asyncio.run(clinical.analyze_many(PATIENTS, batch_size=2))
+    assert [result.ok for result in results] == [True, True]
+    assert [result.batch_size for result in results] == [1, 1]
+    assert client.calls == ["batch", "single", "single"]
+
+
+def test_batch_out_of_retries_fails_every_patient_without_fanning_out():
+    client, clinical = engine(lambda batch, messages: StatusError(429), max_retries=1)
+    results = asyncio.run(clinical.analyze_many(PATIENTS, batch_size=2))
+    assert [result.index for result in results] == [0, 1]
+    assert all(result.error.startswith("Gave up after 2 attempts") for result in results)
+    assert client.calls == ["batch", "batch"]
+
+
+def test_patient_missing_from_batch_reply_is_retried_alone():
+    def respond(batch, messages):
+        return json.dumps({"patients": {"P1": ANALYSIS}}) if batch else json.dumps(ANALYSIS)
+
+    client, clinical = engine(respond)
+    results = asyncio.run(clinical.analyze_many(PATIENTS, batch_size=2))
+    assert [(result.ok, result.batch_size) for result in results] == [(True, 2), (True, 1)]
+    assert client.calls == ["batch", "single"]
@@ -0,0 +1,44 @@
+# app/tests/test_batch.py
+import io
+from types import SimpleNamespace
+
+from healthform.batch import analysis_outcome, run_batch
+from healthform.clinical_ai import ClinicalAI
+from healthform.models import PatientData
+from healthform.streaming import DONE
+
+
+class DownClient:
+    """Chat client whose every call fails, as during an outage or with a revoked key"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        raise ConnectionError("API unreachable")
+
+
+def test_fallback_analysis_is_tagged():
+    patient = PatientData(name="Jane Doe", age=70, medications=["Warfarin 5mg Daily", "Aspirin 81mg Daily"])
+    analysis = ClinicalAI(DownClient()).analyze_patient_data(patient)
+    assert analysis["fallback"] == "ConnectionError: API unreachable"
+    assert analysis["drug_interactions"]
+    final = [update for update in ClinicalAI(DownClient()).stream_patient_data(patient) if update.kind == DONE]
+    assert final[0].analysis["fallback"] == "ConnectionError: API unreachable"
+
+
+def test_batch_counts_fallbacks_as_degraded(tmp_path, sample_records):
+    for stem, record in sample_records:
+        (tmp_path / f"{stem}.txt").write_text(record["original_form_text"], encoding="utf-8")
+    sink = io.StringIO()
+    summary = run_batch(sorted(tmp_path.glob("*.txt")), ClinicalAI(DownClient()), sink, workers=2, progress_every=0)
+    assert summary["forms"] == len(sample_records)
+    assert summary["degraded"] == len(sample_records)
+    assert summary["model_answered"] == 0
+
+
+def test_analysis_outcome():
+    assert analysis_outcome({}) is None
+    assert analysis_outcome({"ai_analysis": {"fallback": "TimeoutError: "}}) == "fallback"
+    assert analysis_outcome({"ai_analysis": {"triage": {"route": "local", "reasons": []}}}) == "local"
+    assert analysis_outcome({"ai_analysis": {"triage": {"route": "full", "reasons": []}}}) == "model"
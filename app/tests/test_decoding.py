@@ -0,0 +1,77 @@
+# app/tests/test_decoding.py
+import asyncio
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from healthform.async_engine import AsyncClinicalEngine
+from healthform.clinical_ai import CATEGORY_LABELS, parse_ai_response
+from healthform.decoding import AnalysisDecoder, loads_lenient
+from healthform.models import PatientData
+from healthform.streaming import IncrementalAnalysisParser
+
+ALERT = {"severity": "high", "message": "Bleeding risk"}
+
+
+@pytest.mark.parametrize("reply", [
+    '{"critical_alerts": [{"severity": "high", "message": "Bleeding risk"},]}',
+    "{'critical_alerts': [{'severity': 'HIGH', 'message': 'Bleeding risk'}]}",
+    'Here you go:\n```json\n{"CRITICAL ALERTS": [{"severity": "Severe", "message": "Bleeding risk"}]}\n```',
+    '{"critical_alerts": [{"severity": "high", "message": "Bleeding risk"}], "recommendations": [{"sev',
+])
+def test_replies_are_repaired(reply):
+    assert AnalysisDecoder(CATEGORY_LABELS).decode(reply)["critical_alerts"] == [ALERT]
+
+
+def test_deep_nesting_is_a_value_error():
+    with pytest.raises(ValueError):
+        loads_lenient("[" * 100000)
+    with pytest.raises(ValueError):
+        loads_lenient("[" * 100000 + "]" * 100000)
+
+
+def test_deeply_nested_reply_falls_back_to_text():
+    reply = '{"critical_alerts": ' + "[" * 100000
+    analysis = parse_ai_response(reply)
+    assert analysis["critical_alerts"] == [{"severity": "medium", "message": reply}]
+
+
+def test_streamed_deep_item_is_skipped():
+    parser = IncrementalAnalysisParser(CATEGORY_LABELS)
+    items = parser.feed('{"critical_alerts": [{"x": ' + "[" * 100000 + "]" * 100000 + '}, '
+                        + json.dumps(ALERT) + "]}")
+    assert items == [("critical_alerts", ALERT)]
+
+
+class FakeClient:
+    """Async chat client answering each prompt with one alert naming the patient"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        name = "John Roe" if "John Roe" in messages[-1]["content"] else "other"
+        message = SimpleNamespace(content=json.dumps({"critical_alerts": [{"severity": "high", "message": name}]}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+
+class LockedCache:
+    """Cache whose writes fail for John Roe's analysis"""
+
+    def get(self, key):
+        return None
+
+    def put(self, key, analysis):
+        if analysis["critical_alerts"][0]["message"] == "John Roe":
+            raise sqlite3.OperationalError("database is locked")
+
+
+def test_unexpected_error_fails_only_its_form():
+    engine = AsyncClinicalEngine(FakeClient(), tokens_per_minute=None, cache=LockedCache())
+    patients = [PatientData(name=name, age=40) for name in ("Jane Doe", "John Roe", "Ann Poe")]
+    results = asyncio.run(engine.analyze_many(patients))
+    assert [result.ok for result in results] == [True, False, True]
+    assert "database is locked" in results[1].error
@@ -0,0 +1,41 @@
+# app/tests/test_ingest.py
+import io
+
+from healthform.ingest import iter_forms
+
+FORM_A = "PATIENT INTAKE FORM\nPatient Name: Jane Doe\nAge: 40\n"
+FORM_B = "PATIENT INTAKE FORM\nPatient Name: John Roe\nAge: 52\n"
+UNTITLED_A = "MERCY GENERAL HOSPITAL\nPatient Name: Jane Doe\nAge: 40\n"
+UNTITLED_B = "MERCY GENERAL HOSPITAL\nDate: 03/15/2024\nPatient Name: John Roe\nAge: 52\n"
+RULE = "=" * 40 + "\n"
+
+
+def split(text):
+    return [form.text for form in iter_forms(io.StringIO(text, newline=""), source="export.txt")]
+
+
+def test_records_split_on_titles_rules_and_page_breaks():
+    text = FORM_A + "\n" + FORM_B + RULE + FORM_A + "\f" + FORM_B + "----- next form -----\n" + FORM_A
+    assert split(text) == [FORM_A.strip(), FORM_B.strip(), FORM_A.strip(), FORM_B.strip(), FORM_A.strip()]
+
+
+def test_underlined_title_stays_with_its_form():
+    underlined = "PATIENT INTAKE FORM\n===================\nPatient Name: Jane Doe\n"
+    forms = split(RULE + underlined + RULE + underlined)
+    assert forms == [underlined.strip(), underlined.strip()]
+
+
+def test_section_rules_stay_inside_the_form():
+    form = ("PATIENT INTAKE FORM\nPatient Name: Jane Doe\n\nVITAL SIGNS\n----------------\nHeart Rate: 72\n"
+            + RULE + "CURRENT MEDICATIONS\nAspirin | 81mg | Daily | Self\n")
+    assert split(form + RULE + form) == [form.strip(), form.strip()]
+
+
+def test_untitled_records_split_at_a_second_patient():
+    assert split(UNTITLED_A + RULE + UNTITLED_B) == [UNTITLED_A.strip(), UNTITLED_B.strip()]
+
+
+def test_trailing_rule_is_dropped_and_start_lines_are_kept():
+    forms = list(iter_forms(io.StringIO("\n" + FORM_A + RULE + FORM_B + RULE + "\n"), source="export.txt"))
+    assert [form.text for form in forms] == [FORM_A.strip(), FORM_B.strip()]
+    assert [form.source for form in forms] == ["export.txt:2", "export.txt:6"]
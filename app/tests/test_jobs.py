@@ -0,0 +1,115 @@
+# app/tests/test_jobs.py
+import threading
+import time
+
+from healthform.jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, WorkerPool
+
+
+def test_expired_lease_is_requeued(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.submit("form")
+    queue.claim("dead-0", lease_seconds=0.01)
+    time.sleep(0.02)
+    assert queue.requeue_expired() == 1
+    assert queue.get(job_id).status == QUEUED
+    assert queue.claim("live-0").attempts == 2
+
+
+def test_renewed_lease_is_kept(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.submit("form")
+    queue.claim("pool-0", lease_seconds=0.01)
+    assert queue.renew("pool-", lease_seconds=60) == 1
+    time.sleep(0.02)
+    assert queue.requeue_expired() == 0
+    assert queue.get(job_id).status == RUNNING
+
+
+def test_submission_does_not_join_expired_job(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.submit("form")
+    queue.claim("dead-0", lease_seconds=0.01)
+    time.sleep(0.02)
+    assert queue.submit("form") == job_id
+    assert queue.get(job_id).status == QUEUED
+
+
+def test_submission_replaces_job_out_of_attempts(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", max_attempts=1)
+    job_id = queue.submit("form")
+    queue.claim("dead-0", lease_seconds=0.01)
+    time.sleep(0.02)
+    new_id = queue.submit("form")
+    assert new_id != job_id
+    assert queue.get(job_id).status == FAILED
+    assert queue.get(new_id).status == QUEUED
+
+
+def test_running_pool_recovers_lost_job(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.submit("form")
+    # Another process claimed the job and died after the pool started
+    queue.claim("dead-0", lease_seconds=0.3)
+    pool = WorkerPool(queue, lambda payload, report: {"text": payload["form_text"]}, workers=1, lease_seconds=0.3).start()
+    try:
+        job = queue.wait(job_id, timeout=5)
+    finally:
+        pool.stop()
+    assert (job.status, job.attempts, job.result) == (DONE, 2, {"text": "form"})
+
+
+def test_pool_renews_leases_of_long_jobs(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    calls = []
+    lock = threading.Lock()
+
+    def slow(payload, report):
+        with lock:
+            calls.append(payload)
+        time.sleep(0.6)
+        return {}
+
+    pool = WorkerPool(queue, slow, workers=2, lease_seconds=0.2).start()
+    try:
+        job = queue.wait(queue.submit("form"), timeout=5)
+    finally:
+        pool.stop()
+    assert (job.status, job.attempts, len(calls)) == (DONE, 1, 1)
+
+
+def test_progress_is_visible_while_running(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    reported, release = threading.Event(), threading.Event()
+
+    def streaming(payload, report):
+        report({"items": [["critical_alerts", {"severity": "high", "message": "a"}]]})
+        reported.set()
+        release.wait(5)
+        return {"done": True}
+
+    pool = WorkerPool(queue, streaming, workers=1).start()
+    try:
+        job_id = queue.submit("form")
+        assert reported.wait(5)
+        assert queue.get(job_id).progress == {"items": [["critical_alerts", {"severity": "high", "message": "a"}]]}
+        release.set()
+        job = queue.wait(job_id, timeout=5)
+    finally:
+        pool.stop()
+    assert (job.status, job.result, job.progress) == (DONE, {"done": True}, None)
+
+
+def test_worker_that_lost_its_lease_cannot_finish_the_job(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.submit("form")
+    queue.claim("old-0", lease_seconds=0.01)
+    time.sleep(0.02)
+    queue.requeue_expired()
+    queue.claim("new-0")
+    assert not queue.report(job_id, "old-0", {"items": []})
+    assert not queue.complete(job_id, "old-0", {"from": "old"})
+    assert not queue.fail(job_id, "old-0", "late")
+    assert queue.get(job_id).status == RUNNING
+    assert queue.report(job_id, "new-0", {"items": []})
+    assert queue.complete(job_id, "new-0", {"from": "new"})
+    assert queue.get(job_id).result == {"from": "new"}
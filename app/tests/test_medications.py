@@ -0,0 +1,35 @@
+# app/tests/test_medications.py
+import pytest
+
+from healthform.medications import default_interaction_index, parse_medication
+
+
+@pytest.mark.parametrize("entry, name, dose, frequency", [
+    ("Warfarin 5mg Daily", "warfarin", "5mg", "Daily"),
+    ("Aspirin  Daily", "aspirin", "", "daily"),
+    ("Aspirin EC 81mg daily", "aspirin", "81mg", "daily"),
+    ("Warfarin 2.5-5mg daily", "warfarin", "2.5-5mg", "daily"),
+    ("Warfarin 2.5 to 5 mg daily", "warfarin", "2.5 to 5 mg", "daily"),
+    ("Coumadin 5mg", "warfarin", "5mg", ""),
+    ("Baby aspirin 81 mg once daily", "aspirin", "81 mg", "once daily"),
+    ("Metoprolol succinate ER 50mg daily", "metoprolol", "50mg", "daily"),
+    ("Toprol XL 25mg", "metoprolol", "25mg", ""),
+    ("Potassium chloride 20 mEq", "potassium chloride", "20 mEq", ""),
+])
+def test_parse_medication(entry, name, dose, frequency):
+    medication = parse_medication(entry)
+    assert (medication.name, medication.dose, medication.frequency) == (name, dose, frequency)
+    assert medication.recognized
+
+
+def test_unknown_drug_is_not_recognized():
+    medication = parse_medication("Zylotrexin 10mg daily")
+    assert medication.name == "zylotrexin"
+    assert not medication.recognized
+
+
+@pytest.mark.parametrize("aspirin", ["Aspirin  Daily", "Aspirin EC 81mg daily", "Baby aspirin 81mg"])
+@pytest.mark.parametrize("warfarin", ["Warfarin 2.5-5mg daily", "Coumadin 5mg daily", "warfarin"])
+def test_warfarin_aspirin_interaction(warfarin, aspirin):
+    alerts = default_interaction_index().check([warfarin, aspirin])
+    assert [(alert["drugs"], alert["severity"]) for alert in alerts] == [(["aspirin", "warfarin"], "high")]
@@ -0,0 +1,38 @@
+# app/tests/test_near_duplicates.py
+import dataclasses
+
+from healthform.near_duplicates import NearDuplicateIndex
+from healthform.models import PatientData
+from healthform.rules import RuleEngine
+
+ANALYSIS = {"critical_alerts": [], "drug_interactions": [], "missing_info": [],
+            "recommendations": [{"severity": "low", "message": "Follow up in 4 weeks"}]}
+
+
+def visit(name):
+    return PatientData(name=name, age=52, gender="Female", chief_complaint="Follow-up for hypertension",
+                       medical_history="Hypertension, well controlled", allergies="Penicillin",
+                       medications=["Lisinopril 10mg Daily"],
+                       vital_signs={"blood_pressure": "128/82", "heart_rate": "72", "temperature": "98.6"})
+
+
+def indexed(patient):
+    index = NearDuplicateIndex()
+    index.add(patient, RuleEngine().screen(patient), ANALYSIS)
+    return index
+
+
+def test_same_patient_is_reused():
+    follow_up = dataclasses.replace(visit("JANE  DOE"), vital_signs=dict(visit("").vital_signs, heart_rate="75"))
+    match = indexed(visit("Jane Doe")).find(follow_up, RuleEngine().screen(follow_up))
+    assert match is not None and "vital_signs" in match.changed
+
+
+def test_other_patient_is_not_reused():
+    other = visit("John Roe")
+    assert indexed(visit("Jane Doe")).find(other, RuleEngine().screen(other)) is None
+
+
+def test_anonymous_forms_are_not_reused():
+    anonymous = visit("")
+    assert indexed(anonymous).find(anonymous, RuleEngine().screen(anonymous)) is None
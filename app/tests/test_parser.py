@@ -0,0 +1,27 @@
+# app/tests/test_parser.py
+from healthform.parser import MedicalFormParser, extract_generic
+from healthform.templates import GENERIC, default_registry
+
+
+def test_every_sample_matches_a_builtin_template(sample_records):
+    registry = default_registry()
+    for stem, record in sample_records:
+        assert registry.extract(record["original_form_text"])[1] != GENERIC, stem
+
+
+def test_templates_agree_with_the_generic_parser(sample_records):
+    registry = default_registry()
+    for stem, record in sample_records:
+        text = record["original_form_text"]
+        for variant in (text, text.replace("\n", "\r\n")):
+            assert registry.extract(variant)[0] == extract_generic(variant), stem
+
+
+def test_parser_reproduces_saved_patient_data(sample_records):
+    for stem, record in sample_records:
+        parsed = MedicalFormParser.extract_patient_data(record["original_form_text"]).to_dict()
+        saved = dict(record["patient_data"])
+        # The oldest records were saved before medication tables were parsed
+        if not saved["medications"]:
+            saved["medications"] = parsed["medications"]
+        assert parsed == saved, stem
@@ -0,0 +1,28 @@
+# app/tests/test_rules.py
+from healthform.models import PatientData
+from healthform.rules import ROUTE_FOCUSED, ROUTE_LOCAL, RuleEngine
+
+VITALS = {"blood_pressure": "120/80", "heart_rate": "72", "temperature": "98.6"}
+
+
+def patient(medications):
+    return PatientData(name="Jane Doe", age=40, chief_complaint="Sprained ankle", allergies="None",
+                       medications=medications, vital_signs=dict(VITALS))
+
+
+def test_routine_form_with_one_known_medication_is_local():
+    screen = RuleEngine().screen(patient(["Lisinopril 10mg Daily"]))
+    assert screen.route == ROUTE_LOCAL
+
+
+def test_known_medications_without_a_table_entry_need_the_model():
+    screen = RuleEngine().screen(patient(["Ibuprofen 400mg", "Lisinopril 10mg Daily"]))
+    assert screen.route == ROUTE_FOCUSED
+    assert screen.focus == ["drug_interactions"]
+
+
+def test_unrecognized_medication_needs_the_model():
+    screen = RuleEngine().screen(patient(["Lisinopril 10mg Daily", "Zylotrexin 10mg daily"]))
+    assert screen.route == ROUTE_FOCUSED
+    assert screen.focus == ["drug_interactions"]
+    assert any("Zylotrexin 10mg daily" in reason for reason in screen.reasons)
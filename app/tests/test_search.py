@@ -0,0 +1,88 @@
+# app/tests/test_search.py
+import sqlite3
+
+import pytest
+
+from healthform.search import SearchIndex, parse_query
+from healthform.severity import severity_rank
+from healthform.storage import iter_alerts
+
+
+@pytest.fixture
+def index(tmp_path, sample_records):
+    index = SearchIndex(tmp_path / "search.sqlite3")
+    assert index.add_many(sample_records) == len(sample_records)
+    yield index
+    index.close()
+
+
+def records_at_or_above(sample_records, level):
+    return {record_id for record_id, record in sample_records
+            if max((severity_rank(severity) for _, severity, _ in iter_alerts(record["ai_analysis"])), default=0)
+            >= severity_rank(level)}
+
+
+def ids(hits):
+    return {hit["id"] for hit in hits}
+
+
+def test_severity_filters_follow_shared_scale(index, sample_records):
+    high = records_at_or_above(sample_records, "high")
+    assert high
+    assert ids(index.search("severity:high")) == high
+    assert ids(index.search("severity:severe")) == high
+    assert ids(index.search("", min_severity="high")) == high
+    assert ids(index.search("severity:critical")) == records_at_or_above(sample_records, "critical")
+    assert ids(index.search("severity:medium")) == records_at_or_above(sample_records, "medium")
+
+
+def test_severe_only_records_count_as_high(index, sample_records):
+    # Records in data/ whose most severe alert is spelled "Severe"
+    severe_only = {record_id for record_id, record in sample_records
+                   if {severity.lower() for _, severity, _ in iter_alerts(record["ai_analysis"])} & {"severe"}
+                   and not {severity.lower() for _, severity, _ in iter_alerts(record["ai_analysis"])}
+                   & {"critical", "high"}}
+    assert severe_only
+    assert severe_only <= ids(index.search("severity:high"))
+    assert not severe_only & ids(index.search("severity:critical"))
+
+
+def test_field_queries(index, sample_records):
+    interactions = {record_id for record_id, record in sample_records
+                    if any(category == "drug_interactions" and "warfarin" in message.lower()
+                           for category, _, message in iter_alerts(record["ai_analysis"]))}
+    assert interactions and ids(index.search("interactions:warfarin")) == interactions
+    # Brand names match the generic name records are indexed under
+    assert ids(index.search("medications:coumadin")) == ids(index.search("medications:warfarin"))
+    assert ids(index.search('name:"sarah chen"')) == {record_id for record_id, record in sample_records
+                                                      if record["patient_data"]["name"] == "Sarah Chen"}
+    assert not ids(index.search("name:warfarin"))
+    assert ids(index.search("aspirin -warfarin")).isdisjoint(ids(index.search("warfarin")))
+
+
+@pytest.mark.parametrize("query", ["bp:140", "severity:extreme", "-severity:high", "-aspirin"])
+def test_invalid_queries(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+def test_user_syntax_is_quoted():
+    assert parse_query('a OR NEAR(b) "c d"').match == '"a" AND "OR" AND "NEAR(b)" AND "c d"'
+
+
+def test_index_from_older_scale_is_rebuilt(tmp_path, sample_records):
+    path = tmp_path / "search.sqlite3"
+    index = SearchIndex(path)
+    index.add_many(sample_records)
+    index.close()
+    conn = sqlite3.connect(str(path))
+    conn.execute("UPDATE search_docs SET max_severity = 0")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    index = SearchIndex(path)
+    assert index.count() == 0 and index.search("warfarin") == []
+    index.add_many(sample_records)
+    assert ids(index.search("severity:high")) == records_at_or_above(sample_records, "high")
+    index.close()
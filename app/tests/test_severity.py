@@ -0,0 +1,62 @@
+# app/tests/test_severity.py
+import sqlite3
+
+import pytest
+
+from healthform.decoding import AnalysisDecoder
+from healthform.clinical_ai import CATEGORY_LABELS
+from healthform.severity import normalize_severity, severity_rank
+from healthform.storage import SQLiteAnalysisStore
+
+
+@pytest.mark.parametrize("word, level", [
+    ("CRITICAL", "critical"), ("Severe", "high"), ("urgent", "high"), ("Emergency", "high"), ("HIGH", "high"),
+    ("Moderate", "medium"), ("WARNING", "medium"), ("minor", "low"), ("Mild", "low"), (" low ", "low"),
+    ("whatever", ""), (None, ""),
+])
+def test_normalize_severity(word, level):
+    assert normalize_severity(word) == level
+
+
+def test_ranks_order_levels():
+    assert severity_rank("critical") > severity_rank("severe") == severity_rank("high") > severity_rank("moderate") \
+        > severity_rank("mild") > severity_rank("unknown") == 0
+
+
+def test_decoder_uses_shared_scale():
+    analysis = AnalysisDecoder(CATEGORY_LABELS).decode(
+        '{"critical_alerts": [{"severity": "Severe", "message": "a"}, {"severity": "CRITICAL", "message": "b"}],'
+        ' "recommendations": [{"severity": "mild", "message": "c"}]}')
+    assert [item["severity"] for item in analysis["critical_alerts"]] == ["high", "high"]
+    assert analysis["recommendations"][0]["severity"] == "low"
+
+
+def test_sqlite_store_ranks_sample_severities(tmp_path, sample_records):
+    store = SQLiteAnalysisStore(tmp_path / "analyses.sqlite3")
+    store.import_records(iter(sample_records))
+    high = {summary["id"] for summary in store.find_by_severity("high", limit=100)}
+    # Records whose only top-level alerts are spelled "Severe" must count as high
+    severe = {record_id for record_id, record in sample_records
+              if any(isinstance(item, dict) and str(item.get("severity", "")).lower() == "severe"
+                     for items in record["ai_analysis"].values() if isinstance(items, list) for item in items)}
+    assert severe and severe <= high
+    store.close()
+
+
+def test_sqlite_store_reranks_rows_saved_by_older_versions(tmp_path, sample_records):
+    path = tmp_path / "analyses.sqlite3"
+    store = SQLiteAnalysisStore(path)
+    store.import_records(iter(sample_records))
+    expected = store.find_by_severity("medium", limit=100)
+    store.close()
+    # Simulate a database written before "Severe" and "Mild" were ranked
+    conn = sqlite3.connect(str(path))
+    conn.execute("UPDATE alerts SET severity_rank = 0 WHERE lower(severity) IN ('severe', 'mild')")
+    conn.execute("UPDATE analyses SET max_severity = 0")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteAnalysisStore(path)
+    assert store.find_by_severity("medium", limit=100) == expected
+    store.close()
@@ -0,0 +1,55 @@
+# app/tests/test_streaming.py
+import json
+from types import SimpleNamespace
+
+from healthform.clinical_ai import ClinicalAI
+from healthform.models import PatientData
+from healthform.routing import TierRouter
+from healthform.streaming import DONE, ITEM
+
+FAST_REPLY = json.dumps({"critical_alerts": [{"severity": "Severe", "message": "Possible bleed"}]})
+ESCALATED_REPLY = json.dumps({"recommendations": [{"severity": "low", "message": "Recheck INR"}]})
+
+PATIENT = PatientData(name="Jane Doe", age=40, chief_complaint="Bruising", allergies="None",
+                      medications=["Zylotrexin 10mg daily"],
+                      vital_signs={"blood_pressure": "120/80", "heart_rate": "72", "temperature": "98.6"})
+
+
+class StreamingClient:
+    """Streams a canned reply per model in small chunks; ``fail_after`` chunks then raises"""
+
+    def __init__(self, replies, fail_after=None):
+        self.replies = replies
+        self.fail_after = fail_after
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, **kwargs):
+        reply = self.replies[model]
+        for number, start in enumerate(range(0, len(reply), 7)):
+            if self.fail_after is not None and number >= self.fail_after:
+                raise ConnectionError("stream reset")
+            yield {"choices": [{"delta": {"content": reply[start:start + 7]}}]}
+
+
+def final_analysis(client):
+    updates = list(ClinicalAI(client).stream_patient_data(PATIENT))
+    assert updates[-1].kind == DONE and all(update.kind == ITEM for update in updates[:-1])
+    return updates[-1].analysis
+
+
+def test_escalated_stream_keeps_the_cleaned_fast_items():
+    router = TierRouter()
+    analysis = final_analysis(StreamingClient({router.fast.model: FAST_REPLY,
+                                               router.escalated.model: ESCALATED_REPLY}))
+    assert analysis["routing"]["tier"] == router.escalated.name
+    assert {"severity": "high", "message": "Possible bleed"} in analysis["critical_alerts"]
+    assert {"severity": "low", "message": "Recheck INR"} in analysis["recommendations"]
+
+
+def test_broken_stream_keeps_its_items_cleaned():
+    router = TierRouter()
+    # The connection drops once the first item has closed
+    partial = FAST_REPLY[:-2] + ', {"severity": "low", "mess'
+    analysis = final_analysis(StreamingClient({router.fast.model: partial + " " * 7}, fail_after=len(partial) // 7 + 1))
+    assert analysis["fallback"] == "ConnectionError: stream reset"
+    assert {"severity": "high", "message": "Possible bleed"} in analysis["critical_alerts"]